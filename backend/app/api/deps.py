@@ -1,52 +1,124 @@
 from typing import AsyncGenerator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.config import settings
-from app.core import security
 from app.db.database import get_async_session
 from app.models.user import User
 from app.schemas.token import TokenPayload
 from app.models.enums import RoleEnum
+from app.services.token_service import Principal, token_service
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"/auth/login"
 )
 
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"/auth/login",
+    auto_error=False
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async for session in get_async_session():
         yield session
 
 
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+def _decode_token(token: str) -> dict:
+    try:
+        claims = token_service.decode(token)
+        token_data = TokenPayload(**claims)
+    except (JWTError, ValidationError):
+        raise _credentials_error()
+    if not token_data.sub or claims.get("type") == "refresh":
+        raise _credentials_error()
+    return claims
+
+
+async def get_token_claims(token: str = Depends(reusable_oauth2)) -> dict:
+    """Verified claims of the bearer token, rejecting revoked tokens known to Redis."""
+    claims = _decode_token(token)
+    if await token_service.check(claims) is False:
+        raise _credentials_error()
+    return claims
+
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
+    claims: dict = Depends(get_token_claims),
 ) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    
     # Async DB query
-    result = await db.execute(select(User).where(User.id == int(token_data.sub)))
+    result = await db.execute(select(User).where(User.id == int(claims["sub"])))
     user = result.scalars().first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if user.session_version != claims.get("sv", 0):
+        raise _credentials_error()
     return user
 
 
+async def get_current_principal(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(reusable_oauth2),
+) -> Principal:
+    """
+    The active caller, for routes that only need its id and role. The user row is not
+    loaded while Redis can vouch for the token's session version; deactivation bumps
+    that version, so it still takes effect immediately.
+    """
+    claims = _decode_token(token)
+    user_id = int(claims["sub"])
+    current = await token_service.check(claims)
+    if current is False:
+        raise _credentials_error()
+    if current and claims.get("role"):
+        return Principal(id=user_id, role=claims["role"], session_version=claims.get("sv", 0), jti=claims.get("jti"))
+
+    result = await db.execute(
+        select(User.role, User.is_active, User.session_version).where(User.id == user_id)
+    )
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    if row.session_version != claims.get("sv", 0):
+        raise _credentials_error()
+    if not row.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    await token_service.store_session_version(user_id, row.session_version, only_if_missing=True)
+    return Principal(id=user_id, role=row.role, session_version=row.session_version, jti=claims.get("jti"))
+
+
+async def get_current_instructor_principal(
+    principal: Principal = Depends(get_current_principal),
+) -> Principal:
+    if principal.role not in [RoleEnum.instructor, RoleEnum.admin]:
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return principal
+
+
+async def get_current_superuser_principal(
+    principal: Principal = Depends(get_current_principal),
+) -> Principal:
+    if principal.role != RoleEnum.admin:
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return principal
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -73,3 +145,22 @@ async def get_current_instructor(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_viewer_id(
+    request: Request,
+    token: Optional[str] = Depends(optional_oauth2),
+) -> str:
+    """
+    Identify the caller for de-duplicated counters on public endpoints:
+    the user id when a valid token is sent, otherwise the client address.
+    No database lookup is made.
+    """
+    if token:
+        try:
+            payload = token_service.decode(token)
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple
+
+logger = logging.getLogger("app.background")
+
+
+class BackgroundTaskManager:
+    """
+    Runs long-lived worker loops and periodic jobs alongside the API process.
+    Jobs are registered at import time and started/stopped with the app lifecycle.
+    """
+    def __init__(self):
+        self._jobs: List[Tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, loop_factory: Callable[[], Awaitable[None]]):
+        """Register a coroutine function that runs until cancelled."""
+        self._jobs.append((name, loop_factory))
+
+    def register_periodic(self, name: str, func: Callable[[], Awaitable[None]], interval_seconds: float):
+        """Register a coroutine function to be called every `interval_seconds`."""
+        async def _periodic():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Periodic job '{name}' failed: {e}", exc_info=True)
+
+        self._jobs.append((name, _periodic))
+
+    async def start(self):
+        for name, loop_factory in self._jobs:
+            self._tasks.append(asyncio.create_task(self._supervise(name, loop_factory), name=name))
+        logger.info(f"Started {len(self._tasks)} background jobs")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped background jobs")
+
+    async def _supervise(self, name: str, loop_factory: Callable[[], Awaitable[None]]):
+        # Restart crashed loops with a small backoff so one bad batch can't kill a worker for good.
+        while True:
+            try:
+                await loop_factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background job '{name}' crashed: {e}", exc_info=True)
+                await asyncio.sleep(5)
+
+
+background_tasks = BackgroundTaskManager()
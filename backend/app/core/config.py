@@ -12,11 +12,20 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "production"  # development | staging | production
     DEBUG: bool = False
 
+    # Per-request SQL/Redis/LLM accounting, reported in the Server-Timing header
+    PROFILING_ENABLED: bool = True
+    # Raise instead of logging when a route exceeds its @statement_budget (tests)
+    PROFILING_ENFORCE_STATEMENT_BUDGETS: bool = False
+    # Prometheus metrics at /metrics; see app/core/metrics.py for multi-worker setup
+    METRICS_ENABLED: bool = True
+
     DATABASE_URL: str
 
     DB_POOL_SIZE: int = 10
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_TIMEOUT: int = 30  # seconds
+    # Connections one QueryBatch may hold at once (independent dashboard aggregates)
+    QUERY_BATCH_CONCURRENCY: int = 4
 
     REDIS_URL: str
     REDIS_MAX_CONNECTIONS: int = 20
@@ -35,14 +44,98 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
 
     ALLOWED_ORIGINS: str = "http://localhost:5173"
+
+    # Per client IP and worker; load tests run the server with a much higher limit
+    RATE_LIMIT_MAX_REQUESTS: int = 100
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
     
     UPLOADS_DIR: str = Field(default="uploads")
     MAX_UPLOAD_SIZE_BYTES: int = 25 * 1024 * 1024  # 25MB default
+    MAX_RESUMABLE_UPLOAD_SIZE_BYTES: int = 4 * 1024 * 1024 * 1024  # 4GB, lecture recordings
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024  # read/write granularity while streaming to disk
+    UPLOAD_SESSION_TTL_SECONDS: int = 60 * 60 * 24  # idle resumable uploads expire after this
+    UPLOAD_CLEANUP_INTERVAL_SECONDS: int = 60 * 60
+
+    # Content-addressed blob storage for uploads
+    BLOB_STORAGE_BACKEND: str = "local"  # local | s3
+    BLOB_STORAGE_DIR: str = "storage/blobs"  # not under static/: blobs are only served through signed /files URLs
+    BLOB_S3_BUCKET: Optional[str] = None
+    BLOB_S3_ENDPOINT_URL: Optional[str] = None  # S3-compatible stores such as MinIO
+    BLOB_S3_REGION: Optional[str] = None
+    BLOB_S3_ACCESS_KEY: Optional[str] = None
+    BLOB_S3_SECRET_KEY: Optional[str] = None
+    BLOB_GC_INTERVAL_SECONDS: int = 60 * 60
+    BLOB_GC_GRACE_SECONDS: int = 60 * 60 * 24  # unreferenced blobs are kept this long
+
+    # Signed blob delivery under /files
+    FILE_URL_SIGNING_KEY: Optional[str] = None  # defaults to SECRET_KEY
+    FILE_URL_TTL_SECONDS: int = 60 * 60 * 6
+    FILE_URL_TTL_BUCKET_SECONDS: int = 60 * 60  # expiries round up to this, so URLs stay cacheable within a window
+    FILE_DELIVERY_ACCEL_PREFIX: Optional[str] = None  # e.g. "/_blobs/": let nginx send the bytes via X-Accel-Redirect
+
+    # Media processing (thumbnails, avatar sizes, PDF/video metadata)
+    MEDIA_PROCESSING_WORKERS: int = 2  # processes per API worker
+    MEDIA_PROCESSING_MAX_PIXELS: int = 80_000_000  # refuse decompression bombs
+    MEDIA_PROCESSING_CLAIM_IDLE_MS: int = 10 * 60 * 1000  # large videos can take minutes
+    MEDIA_PROCESSING_MAX_DELIVERIES: int = 3  # then the blob is marked failed
+    MEDIA_REQUEUE_INTERVAL_SECONDS: int = 15 * 60
+    MEDIA_REQUEUE_GRACE_SECONDS: int = 30 * 60  # blobs pending this long without a queue entry are queued again
 
     AUTO_CREATE_DB: bool = False
 
+    # Password hashing pool (per API worker); logins beyond workers + queue get a 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Token verification cache and revocation
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # verified tokens kept per API worker
+    AUTH_SESSION_VERSION_TTL_SECONDS: int = 60 * 60 * 24  # Redis mirror of users.session_version
+
     WORKER_COUNT: int = 2
 
+    # Submission ingestion queue
+    SUBMISSION_QUEUE_BATCH_SIZE: int = 100
+    SUBMISSION_QUEUE_BLOCK_MS: int = 1000
+    SUBMISSION_QUEUE_CLAIM_IDLE_MS: int = 60000  # reclaim entries stuck on a dead consumer
+    SUBMISSION_QUEUE_MAX_DELIVERIES: int = 5  # then the entry is dead-lettered and its receipt rejected
+    SUBMISSION_RECEIPT_TTL_SECONDS: int = 60 * 60 * 24
+
+    # Community feeds
+    FEED_MAX_POSTS_PER_COMMUNITY: int = 1000
+    FEED_HOME_CACHE_SECONDS: int = 60
+
+    # Comment threads
+    COMMENT_THREAD_MAX_DEPTH: int = 50  # deepest reply allowed; the path column fits ~90 levels
+    COMMENT_THREAD_DEFAULT_DEPTH: int = 5  # reply levels returned with each page of comments
+
+    # Post view counters (buffered in Redis, flushed to the database)
+    VIEW_COUNT_FLUSH_INTERVAL_SECONDS: int = 10
+    VIEW_COUNT_FLUSH_BATCH_SIZE: int = 500
+
+    # Denormalized community counters are recomputed from source tables on this interval
+    COUNTER_RECONCILE_INTERVAL_SECONDS: int = 60 * 60
+
+    # Course statistics rollup (course_stats), refreshed from a Redis dirty set
+    COURSE_STATS_REFRESH_INTERVAL_SECONDS: int = 30
+    COURSE_STATS_REFRESH_BATCH_SIZE: int = 200
+    COURSE_STATS_MAX_AGE_SECONDS: int = 15 * 60  # rows older than this are recomputed so the 24h/7d windows move
+
+    # Activity time series (buffered in Redis, flushed into hourly/daily buckets)
+    ACTIVITY_FLUSH_INTERVAL_SECONDS: int = 30
+    ACTIVITY_FLUSH_BATCH_SIZE: int = 500
+    ACTIVITY_HOURLY_RETENTION_DAYS: int = 90  # daily buckets are kept forever
+
+    # Class scheduler (reminders and status changes due at Classroom.start_time/end_time)
+    CLASS_REMINDER_LEAD_MINUTES: int = 10
+    CLASS_REMINDER_CHUNK_SIZE: int = 1000  # students notified per insert
+    CLASS_OVERRUN_GRACE_MINUTES: int = 15  # live classes are completed this long after end_time
+    CLASS_SCHEDULE_HORIZON_HOURS: int = 24  # how far ahead the periodic sync re-schedules from the database
+    CLASS_SCHEDULE_SYNC_INTERVAL_SECONDS: int = 5 * 60
+    CLASS_SCHEDULER_POLL_SECONDS: float = 5  # longest sleep between checks of the schedule
+
+    # Feedback analytics cache (invalidated on every feedback write)
+    FEEDBACK_ANALYSIS_CACHE_SECONDS: int = 300
+
     # Email
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = Field(587, env="SMTP_PORT")
@@ -55,6 +148,9 @@ class Settings(BaseSettings):
     # OTP Settings
     OTP_EXPIRY_MINUTES: int = 10
     OTP_MAX_ATTEMPTS: int = 5
+    OTP_RATE_WINDOW_SECONDS: int = 15 * 60
+    OTP_ISSUE_LIMIT: int = 3  # forgot-password requests per email and window
+    OTP_VERIFY_LIMIT: int = 10  # verify/reset calls per email and window
     
     # Frontend URL for links
     FRONTEND_URL: str = "http://localhost:5173"
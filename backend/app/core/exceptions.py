@@ -74,3 +74,19 @@ class DatabaseError(MindporiumException):
     """Raised when database operation fails."""
     def __init__(self, message: str = "Database operation failed", details: Optional[Any] = None):
         super().__init__(message, status_code=500, details=details)
+
+
+class PayloadTooLargeError(MindporiumException):
+    """Raised when an upload exceeds the allowed size."""
+    def __init__(self, limit: int, message: str = "Upload exceeds the maximum allowed size"):
+        super().__init__(message, status_code=413, details={"max_bytes": limit})
+
+
+class ServiceOverloadedError(MindporiumException):
+    """Raised when a bounded worker pool is saturated and the request is shed."""
+    def __init__(self, pool: str):
+        super().__init__(
+            "Server is busy. Please try again shortly.",
+            status_code=503,
+            details={"pool": pool}
+        )
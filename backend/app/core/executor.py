@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core import metrics
+from app.core.exceptions import ServiceOverloadedError
+
+logger = logging.getLogger("app.executor")
+
+T = TypeVar("T")
+
+# Queue waits above this are logged (at most once per interval); they mean the pool
+# is undersized for the load.
+SLOW_WAIT_SECONDS = 1.0
+SLOW_WAIT_LOG_INTERVAL_SECONDS = 10.0
+
+
+def _timed(fn: Callable[..., T], *args) -> tuple:
+    started = time.perf_counter()
+    result = fn(*args)
+    return started, time.perf_counter(), result
+
+
+class BoundedExecutor:
+    """
+    A fixed-size thread pool for blocking CPU work (e.g. bcrypt, whose C code releases
+    the GIL) with a bounded queue: once `max_workers + max_queue` calls are in flight
+    further calls are rejected with 503 instead of piling up latency. Counters are kept
+    on the event loop thread, so they need no locking.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self._last_warned = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            metrics.EXECUTOR_REJECTED.labels(self.name).inc()
+            raise ServiceOverloadedError(self.name)
+
+        self.in_flight += 1
+        self.submitted += 1
+        queued_at = time.perf_counter()
+        try:
+            started, finished, result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _timed, fn, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+        wait = started - queued_at
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.run_seconds_total += finished - started
+        metrics.EXECUTOR_QUEUE_WAIT.labels(self.name).observe(wait)
+        if wait > SLOW_WAIT_SECONDS and finished - self._last_warned > SLOW_WAIT_LOG_INTERVAL_SECONDS:
+            self._last_warned = finished
+            logger.warning(f"{self.name}: call waited {wait:.2f}s in queue ({self.in_flight} in flight)")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.max_workers, 0),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_seconds_total / completed * 1000, 2),
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 2),
+            "avg_run_ms": round(self.run_seconds_total / completed * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
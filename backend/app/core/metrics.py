@@ -0,0 +1,151 @@
+"""
+Prometheus metrics, served by GET /metrics.
+
+With several API workers (WORKER_COUNT), point PROMETHEUS_MULTIPROC_DIR at an empty
+directory shared by the workers and clear it before every server start; each worker
+then writes its samples there and /metrics, whichever worker answers, reports the sum
+across all of them. Without the variable every worker reports only its own samples.
+"""
+import os
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+NAMESPACE = "mindporium"
+
+# Fast calls (Redis, pool checkout, executor queues) and slow ones (LLM) get their own buckets.
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    namespace=NAMESPACE,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    namespace=NAMESPACE,
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Database connections currently checked out",
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+)
+REDIS_CALL_DURATION = Histogram(
+    "redis_call_duration_seconds",
+    "Redis round trips (single commands or whole pipelines)",
+    namespace=NAMESPACE,
+    buckets=FAST_BUCKETS,
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "LLM API calls",
+    namespace=NAMESPACE,
+    buckets=SLOW_BUCKETS,
+)
+EXECUTOR_QUEUE_WAIT = Histogram(
+    "executor_queue_wait_seconds",
+    "Time calls wait for a thread in a bounded executor (e.g. password hashing)",
+    ["executor"],
+    namespace=NAMESPACE,
+    buckets=FAST_BUCKETS,
+)
+EXECUTOR_REJECTED = Counter(
+    "executor_rejected",
+    "Calls rejected because a bounded executor was full",
+    ["executor"],
+    namespace=NAMESPACE,
+)
+WS_CONNECTIONS = Gauge(
+    "ws_connections",
+    "Open classroom WebSocket connections",
+    ["classroom_id"],
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+)
+NOTIFICATIONS_SENT = Counter(
+    "notifications_sent",
+    "Notifications created, counted per recipient",
+    ["notification_type"],
+    namespace=NAMESPACE,
+)
+SUBMISSIONS_GRADED = Counter(
+    "submissions_graded",
+    "Test submissions graded and stored",
+    ["source"],  # "direct" (POST /submissions/) or "queue" (ingestion worker)
+    namespace=NAMESPACE,
+)
+
+_CALL_HISTOGRAMS = {"redis": REDIS_CALL_DURATION, "llm": LLM_CALL_DURATION}
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def observe_call(kind: str, seconds: float):
+    """Record one external call ("redis" or "llm") of `seconds`."""
+    histogram = _CALL_HISTOGRAMS.get(kind)
+    if histogram is not None:
+        histogram.observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """The exposition payload and its content type."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Observes the latency of every HTTP request, labelled with the matched route
+    template (`/courses/{course_id}`) rather than the raw path so label values stay
+    bounded; unmatched paths (404s) share one label.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - started
+            )
@@ -48,7 +48,10 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
     async def dispatch(self, request: Request, call_next):
         # Skip rate limiting for health checks and static files
-        if request.url.path in ["/", "/health", "/docs", "/redoc", "/openapi.json"]:
+        if request.url.path in ["/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        # Signed file URLs are already gated, and one video playback is many range requests
+        if request.url.path.startswith("/files/"):
             return await call_next(request)
             
         client_ip = request.client.host if request.client else "unknown"
@@ -76,3 +79,57 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         self.requests[client_ip].append((current_time, 1))
         
         return await call_next(request)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies larger than `max_bytes` on the given paths with 413.
+    Content-Length is checked up front and the body is counted as it streams in,
+    so an oversized upload is cut off before it is spooled to disk.
+    Plain ASGI rather than BaseHTTPMiddleware so it can wrap `receive`.
+    """
+    def __init__(self, app, max_bytes: int, paths: list):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def _reject(self, send):
+        response = JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": "Upload exceeds the maximum allowed size", "max_bytes": self.max_bytes}
+        )
+        await response({"type": "http"}, None, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                return await self._reject(send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    if not rejected:
+                        rejected = True
+                        await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # Once the 413 is out, whatever the app tries to send is dropped.
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
@@ -0,0 +1,155 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger("app.profiling")
+
+MAX_RECORDED_STATEMENTS = 50  # kept per request to explain a blown budget
+
+
+@dataclass
+class RequestProfile:
+    """What one request spent on SQL, Redis and LLM calls. Times are in milliseconds."""
+    db_statements: int = 0
+    db_ms: float = 0.0
+    redis_calls: int = 0
+    redis_ms: float = 0.0
+    llm_calls: int = 0
+    llm_ms: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+    def add(self, kind: str, elapsed_ms: float):
+        if kind == "db":
+            self.db_statements += 1
+            self.db_ms += elapsed_ms
+        elif kind == "redis":
+            self.redis_calls += 1
+            self.redis_ms += elapsed_ms
+        elif kind == "llm":
+            self.llm_calls += 1
+            self.llm_ms += elapsed_ms
+
+    def server_timing(self, total_ms: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="SQL x{self.db_statements}"',
+            f'redis;dur={self.redis_ms:.1f};desc="Redis x{self.redis_calls}"',
+            f'llm;dur={self.llm_ms:.1f};desc="LLM x{self.llm_calls}"',
+            f"total;dur={total_ms:.1f}",
+        ])
+
+
+class StatementBudgetExceeded(AssertionError):
+    """Raised in enforcing mode when a route runs more SQL statements than it declared."""
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """The profile of the request being handled, None outside requests (background jobs)."""
+    return _current.get()
+
+
+@contextmanager
+def track(kind: str):
+    """
+    Time the wrapped call as one `kind` ("redis", "llm") call: observed in the metrics
+    histograms, and attributed to the current request if there is one.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if settings.METRICS_ENABLED:
+            metrics.observe_call(kind, elapsed)
+        profile = _current.get()
+        if profile is not None:
+            profile.add(kind, elapsed * 1000)
+
+
+def statement_budget(max_statements: int) -> Callable:
+    """
+    Declare how many SQL statements a route may run per request:
+
+        @router.get("/overview")
+        @statement_budget(25)
+        async def overview(...): ...
+
+    Going over is logged; with PROFILING_ENFORCE_STATEMENT_BUDGETS (tests) it raises.
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__statement_budget__ = max_statements
+        return endpoint
+    return decorator
+
+
+def install_sqlalchemy_hooks(engine: AsyncEngine):
+    """Count every statement run through `engine` against the current request."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        started = conn.info.get("profiling_started")
+        if profile is None or not started:
+            return
+        profile.add("db", (time.perf_counter() - started.pop()) * 1000)
+        if len(profile.statements) < MAX_RECORDED_STATEMENTS:
+            profile.statements.append(" ".join(statement.split())[:200])
+
+
+class ProfilingMiddleware:
+    """
+    Collects a RequestProfile per HTTP request, reports it in a `Server-Timing` header
+    and checks it against the route's `statement_budget`. Plain ASGI so the header can
+    be added to the response start and the context variable covers the whole request.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+        # The router leaves the matched endpoint in the scope.
+        budget = getattr(scope.get("endpoint"), "__statement_budget__", None)
+        if budget is not None and profile.db_statements > budget:
+            detail = (
+                f"{scope.get('method')} {scope.get('path')} ran {profile.db_statements} SQL statements, "
+                f"budget is {budget}"
+            )
+            if settings.PROFILING_ENFORCE_STATEMENT_BUDGETS:
+                raise StatementBudgetExceeded(detail + ":\n" + "\n".join(profile.statements))
+            logger.warning(detail)
@@ -2,17 +2,38 @@ import json
 import logging
 from typing import Optional
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from app.core import profiling
 from app.core.config import settings
 
 logger = logging.getLogger("app.redis")
 
+
+class _ProfiledPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with profiling.track("redis"):
+            return await super().execute(raise_on_error)
+
+
+class ProfiledRedis(redis.Redis):
+    """Redis client whose round trips (commands, whole pipelines) are timed; see profiling.track."""
+
+    async def execute_command(self, *args, **options):
+        with profiling.track("redis"):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return _ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
 class RedisManager:
     def __init__(self):
         self.redis: Optional[redis.Redis] = None
 
     async def connect(self):
         if not self.redis:
-            self.redis = redis.from_url(
+            client = ProfiledRedis if settings.PROFILING_ENABLED or settings.METRICS_ENABLED else redis.Redis
+            self.redis = client.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
                 decode_responses=True,
@@ -34,6 +55,20 @@ class RedisManager:
     async def delete(self, key: str):
         await self.redis.delete(key)
         
+    async def get_json(self, key: str):
+        value = await self.redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set_json(self, key: str, value, expire: int = None):
+        await self.redis.set(key, json.dumps(value, default=str), ex=expire or settings.REDIS_DEFAULT_TTL)
+
+    async def acquire_lock(self, key: str, ttl: int) -> bool:
+        """Best-effort cross-process lock (SET NX EX). Expires on its own if the holder dies."""
+        return bool(await self.redis.set(key, "1", nx=True, ex=ttl))
+
+    async def release_lock(self, key: str):
+        await self.redis.delete(key)
+        
     async def publish(self, channel: str, message: str):
         await self.redis.publish(channel, message)
 
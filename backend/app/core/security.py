@@ -2,36 +2,69 @@ from datetime import datetime, timedelta
 from typing import Optional, Any, Union
 import secrets
 import string
+from uuid import uuid4
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.executor import BoundedExecutor
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt costs 100-300ms of CPU per call; in async code run it here, never on the event loop.
+password_executor = BoundedExecutor(
+    "password-hashing",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_executor.run(get_password_hash, password)
+
+def _session_claims(session_version: int, role: Optional[str]) -> dict:
+    # jti identifies the token for single-token revocation; sv ties it to the user's
+    # session version (see token_service); role lets requests skip the user lookup.
+    claims = {"jti": uuid4().hex, "sv": session_version}
+    if role is not None:
+        claims["role"] = getattr(role, "value", role)
+    return claims
+
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    session_version: int = 0,
+    role: Optional[str] = None,
+) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), **_session_claims(session_version, role)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
-def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+def create_refresh_token(
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    session_version: int = 0,
+) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", **_session_claims(session_version, None)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
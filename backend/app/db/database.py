@@ -1,5 +1,6 @@
 from typing import AsyncGenerator, Optional
 import logging
+import time
 
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
@@ -7,10 +8,11 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy import event, text
 
 from app.core.config import settings
+from app.core import metrics, profiling
 from app.db.base import Base
 
 logger = logging.getLogger("app.db")
@@ -19,12 +21,36 @@ _engine: Optional[AsyncEngine] = None
 _sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
 
 
+class _MeteredQueuePool(AsyncAdaptedQueuePool):
+    """The default async pool, observing how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+def _install_pool_metrics(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.DB_POOL_IN_USE.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        metrics.DB_POOL_IN_USE.dec()
+
+
 def _create_engine() -> AsyncEngine:
     global _engine
     if _engine is not None:
         return _engine
 
-    poolclass = None if settings.ENVIRONMENT == "production" else NullPool
+    if settings.ENVIRONMENT != "production":
+        poolclass = NullPool
+    else:
+        poolclass = _MeteredQueuePool if settings.METRICS_ENABLED else None
 
     _engine = create_async_engine(
         settings.DATABASE_URL,
@@ -37,6 +63,11 @@ def _create_engine() -> AsyncEngine:
         poolclass=poolclass,
     )
 
+    if settings.PROFILING_ENABLED:
+        profiling.install_sqlalchemy_hooks(_engine)
+    if settings.METRICS_ENABLED:
+        _install_pool_metrics(_engine)
+
     logger.info("Async SQLAlchemy engine initialized.")
     return _engine
 
@@ -56,6 +87,18 @@ def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
     return _sessionmaker
 
 
+def dialect_insert(model):
+    """
+    Return an INSERT construct for the active database dialect, so callers can use
+    `on_conflict_do_nothing` / `on_conflict_do_update` on both Postgres and SQLite.
+    """
+    if get_engine().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async_session_maker = get_sessionmaker()
     async with async_session_maker() as session:
@@ -78,6 +121,9 @@ async def init_db(create_tables: bool = True) -> None:
 
     if create_tables:
         async with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                # Required by the trigram index on search_documents.title.
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Tables created from SQLAlchemy models.")
 
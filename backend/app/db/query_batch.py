@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Result
+from sqlalchemy.sql import Executable
+
+from app.core.config import settings
+from app.db.database import get_sessionmaker
+
+
+class QueryBatch:
+    """
+    Runs independent read-only queries concurrently, each on its own pooled session,
+    and returns their results by name. Meant for dashboards that fire many unrelated
+    aggregates: latency follows the slowest query instead of the sum of all of them.
+    At most `concurrency` connections are held at once, so one request cannot drain
+    the pool.
+
+        batch = QueryBatch()
+        batch.scalar("total", select(func.count()).select_from(Enrollment))
+        batch.all("subjects", select(Subject.id, Subject.title))
+        results = await batch.run()
+
+    Only column/aggregate selects belong here: the sessions are closed before
+    `run()` returns, so ORM objects would come back detached.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = max(1, concurrency or settings.QUERY_BATCH_CONCURRENCY)
+        self._queries: List[Tuple[str, Executable, Callable[[Result], Any]]] = []
+
+    def add(self, name: str, statement: Executable, reduce: Callable[[Result], Any]) -> "QueryBatch":
+        self._queries.append((name, statement, reduce))
+        return self
+
+    def scalar(self, name: str, statement: Executable, default: Any = 0) -> "QueryBatch":
+        """First column of the first row, `default` when it is NULL or missing."""
+        def reduce(result: Result) -> Any:
+            value = result.scalar()
+            return default if value is None else value
+        return self.add(name, statement, reduce)
+
+    def first(self, name: str, statement: Executable) -> "QueryBatch":
+        return self.add(name, statement, lambda result: result.first())
+
+    def all(self, name: str, statement: Executable) -> "QueryBatch":
+        return self.add(name, statement, lambda result: result.all())
+
+    async def run(self) -> Dict[str, Any]:
+        async_session = get_sessionmaker()
+        gate = asyncio.Semaphore(self.concurrency)
+
+        async def execute(statement: Executable, reduce: Callable[[Result], Any]) -> Any:
+            async with gate:
+                async with async_session() as db:
+                    return reduce(await db.execute(statement))
+
+        values = await asyncio.gather(
+            *(execute(statement, reduce) for _, statement, reduce in self._queries)
+        )
+        return {name: value for (name, _, _), value in zip(self._queries, values)}
@@ -0,0 +1,22 @@
+"""
+Standalone ASGI app that only serves signed /files URLs, so large downloads and
+video range requests can run on their own worker pool instead of the API workers:
+
+    uvicorn app.delivery:app --workers 4
+
+Signatures are verified with the signing key alone, so this app needs no database
+or Redis connection. Route /files to it at the proxy.
+"""
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.routes import files
+
+app = FastAPI(
+    title=f"{settings.APP_NAME} files",
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+)
+
+app.include_router(files.router, prefix="/files", tags=["Files"])
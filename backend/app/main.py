@@ -1,15 +1,22 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.core.config import settings
-from app.db.database import init_db, close_db
-from app.core.middleware import LoggingMiddleware, RateLimitMiddleware
+from app.db.database import init_db, close_db, get_engine
+from app.core.middleware import LoggingMiddleware, RateLimitMiddleware, BodySizeLimitMiddleware
 from app.core.redis import redis_manager
+from app.core.background import background_tasks
 from app.core.exceptions import MindporiumException
+from app.core import metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.security import password_executor
 from app.utils.exception_handlers import (
     mindporium_exception_handler,
     validation_exception_handler,
@@ -17,6 +24,8 @@ from app.utils.exception_handlers import (
     generic_exception_handler
 )
 
+logger = logging.getLogger("app.main")
+
 app = FastAPI(
     title=settings.APP_NAME,
     description="Mindporium Backend APIs - A comprehensive learning platform",
@@ -29,6 +38,15 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
 app.add_exception_handler(Exception, generic_exception_handler)
 
+# Multipart uploads are cut off at the size limit while streaming in; registered
+# before CORS so the 413 still carries CORS headers. Resumable uploads enforce
+# their declared length themselves.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_SIZE_BYTES + 64 * 1024,  # allowance for multipart framing
+    paths=["/upload", "/upload/"],
+)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -40,7 +58,17 @@ app.add_middleware(
 
 # Custom Middleware
 app.add_middleware(LoggingMiddleware)
-app.add_middleware(RateLimitMiddleware, max_requests=100, window_seconds=60)
+app.add_middleware(
+    RateLimitMiddleware,
+    max_requests=settings.RATE_LIMIT_MAX_REQUESTS,
+    window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+# Outermost, so Server-Timing covers the other middleware and every response
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # Ensure static directory exists
 os.makedirs("static", exist_ok=True)
@@ -52,9 +80,21 @@ from app.routes import (
     auth, users, courses, enrollments, classrooms, community, posts, admin, 
     subjects, announcements, qa, tests, chatbot, resources, submissions, 
     feedback, notifications, dashboard_admin, dashboard_instructor, dashboard_student,
-    upload, attendance
+    upload, attendance, search, files
 )
 from app.ws import signaling
+from app.services.submission_service import submission_service
+from app.services.search_service import search_service
+from app.services.view_counter_service import view_counter_service
+from app.services.community_service import community_service
+from app.services.rating_summary_service import rating_summary_service
+from app.services.comment_thread_service import comment_thread_service
+from app.services.upload_service import upload_service
+from app.services.blob_store import blob_store
+from app.services.media_service import media_service
+from app.services.course_stats_service import course_stats_service
+from app.services.activity_service import activity_service
+from app.services.class_scheduler_service import class_scheduler_service
 
 app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
@@ -74,6 +114,8 @@ app.include_router(resources.router, prefix="/resources", tags=["Resources"])
 app.include_router(feedback.router, prefix="/feedback", tags=["Feedback"])
 app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
 app.include_router(upload.router, prefix="/upload", tags=["Upload"])
+app.include_router(files.router, prefix="/files", tags=["Files"])
+app.include_router(search.router, prefix="/search", tags=["Search"])
 
 # Dashboard routes
 app.include_router(dashboard_admin.router, prefix="/dashboard/admin", tags=["Dashboard - Admin"])
@@ -83,16 +125,51 @@ app.include_router(dashboard_student.router, prefix="/dashboard/student", tags=[
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(signaling.router, prefix="/ws", tags=["WebSocket"])
 
+# Background jobs
+background_tasks.register("submission-ingestion", submission_service.run_worker)
+background_tasks.register("search-backfill", search_service.ensure_index)
+background_tasks.register("rating-summary-backfill", rating_summary_service.ensure_summaries)
+background_tasks.register("comment-path-backfill", comment_thread_service.backfill_paths)
+background_tasks.register("media-processing", media_service.run_worker)
+background_tasks.register("activity-backfill", activity_service.ensure_buckets)
+background_tasks.register("class-scheduler", class_scheduler_service.run_worker)
+background_tasks.register_periodic(
+    "post-view-flush", view_counter_service.flush, settings.VIEW_COUNT_FLUSH_INTERVAL_SECONDS
+)
+background_tasks.register_periodic(
+    "community-counter-reconcile", community_service.run_reconciliation, settings.COUNTER_RECONCILE_INTERVAL_SECONDS
+)
+background_tasks.register_periodic(
+    "upload-partial-cleanup", upload_service.cleanup_partials, settings.UPLOAD_CLEANUP_INTERVAL_SECONDS
+)
+background_tasks.register_periodic("blob-gc", blob_store.run_gc, settings.BLOB_GC_INTERVAL_SECONDS)
+background_tasks.register_periodic(
+    "media-requeue", media_service.requeue_pending, settings.MEDIA_REQUEUE_INTERVAL_SECONDS
+)
+background_tasks.register_periodic(
+    "activity-flush", activity_service.flush, settings.ACTIVITY_FLUSH_INTERVAL_SECONDS
+)
+background_tasks.register_periodic(
+    "course-stats-refresh", course_stats_service.run_refresh, settings.COURSE_STATS_REFRESH_INTERVAL_SECONDS
+)
+background_tasks.register_periodic(
+    "class-schedule-sync", class_scheduler_service.sync, settings.CLASS_SCHEDULE_SYNC_INTERVAL_SECONDS
+)
+
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
     await redis_manager.connect()
+    await background_tasks.start()
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    await background_tasks.stop()
+    password_executor.shutdown()
     await close_db()
     await redis_manager.close()
+    metrics.mark_process_dead()
 
 @app.get("/")
 async def root():
@@ -102,10 +179,52 @@ async def root():
         "status": "running"
     }
 
+HEALTH_CHECK_TIMEOUT_SECONDS = 2
+
+
+async def _check_database() -> str:
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return "connected"
+
+
+async def _check_redis() -> str:
+    if redis_manager.redis is None:
+        return "disconnected"
+    await redis_manager.redis.ping()
+    return "connected"
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(response: Response):
+    """
+    Real database and Redis round trips. 503 if the database is down; without Redis
+    the API still serves requests (with caches and queues off), so that is "degraded".
+    """
+    checks = {}
+    for name, check in (("database", _check_database), ("redis", _check_redis)):
+        try:
+            checks[name] = await asyncio.wait_for(check(), HEALTH_CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Health check of {name} failed: {e!r}")
+            checks[name] = "unavailable"
+    if checks["database"] != "connected":
+        status = "unhealthy"
+        response.status_code = 503
+    elif checks["redis"] != "connected":
+        status = "degraded"
+    else:
+        status = "healthy"
     return {
-        "status": "healthy",
-        "database": "connected",
-        "redis": "connected" if redis_manager.redis else "disconnected"
+        "status": status,
+        **checks,
+        "password_hashing": password_executor.stats(),
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    payload, content_type = metrics.render()
+    return Response(content=payload, media_type=content_type)
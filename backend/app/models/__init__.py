@@ -1,5 +1,6 @@
 from .user import User
 from .course import Course
+from .course_stats import CourseStats
 from .subject import Subject
 from .system_setting import SystemSetting
 from .community import (
@@ -10,16 +11,26 @@ from .community import (
     CommunitySubscription,
     CommunityBan
 )
+from .activity import ActivityBucket
 from .announcement import Announcement
 from .attendance import Attendance
 from .chatbot import ChatSession, ChatMessage
 from .class_message import ClassMessage
 from .classroom import Classroom
 from .enrollment import Enrollment
-from .feedback import AppFeedback, CourseFeedback, InstructorFeedback
+from .feedback import (
+    AppFeedback,
+    CourseFeedback,
+    InstructorFeedback,
+    CourseRatingSummary,
+    InstructorRatingSummary
+)
 from .links import CourseInstructor
 from .notification import Notification
 from .qa import QAQuestion, QAAnswer
 from .resource import Resource
+from .resource_completion import ResourceCompletion
+from .blob import Blob
 from .submission import Submission
 from .test import Test, TestQuestion
+from .search import SearchDocument, SearchPosting
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.db.base import Base
+
+
+class ActivityBucket(Base):
+    """
+    Event counts per time bucket, for trend charts. Rows are only ever incremented
+    (by the activity service's flush), never rewritten, and the primary key order
+    makes "one scope, one granularity, a range of buckets" a single index range scan.
+
+    scope: "user", "course" or "platform" (scope_id 0)
+    granularity: "hour" or "day"; bucket_start is the UTC start of the bucket
+    """
+    __tablename__ = "activity_buckets"
+
+    scope = Column(String(16), primary_key=True)
+    scope_id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), primary_key=True)
+    metric = Column(String(32), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
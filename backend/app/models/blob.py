@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, DateTime, JSON
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base, TimestampMixin
+
+
+class Blob(TimestampMixin, Base):
+    """
+    One stored file, named by the SHA-256 of its content. Identical uploads share a
+    blob; `ref_count` counts the resources pointing at it.
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(255), nullable=True)
+
+    backend = Column(String(32), nullable=False)  # storage backend holding the bytes
+    storage_key = Column(String(512), nullable=False)
+
+    ref_count = Column(Integer, nullable=False, default=0)
+    # Set when the last reference goes away; the blob is garbage-collected after a grace period.
+    orphaned_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Uploaded for use outside resources (avatars, thumbnails, post images), where references
+    # are not counted, so never collected.
+    is_pinned = Column(Boolean, nullable=False, default=False)
+
+    # Background media processing (see media_service): pending | processed | failed | skipped
+    processing_status = Column(String(20), nullable=True, index=True)
+    media_info = Column(JSON, nullable=True)  # width/height, page_count, duration_seconds
+    variants = Column(JSON, nullable=True)  # rendition name -> storage key, stored next to the original
+
+    resources = relationship("Resource", back_populates="blob")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, JSON, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, TimestampMixin
@@ -37,3 +37,7 @@ class Classroom(TimestampMixin, Base):
     attendances = relationship("Attendance", back_populates="classroom", cascade="all, delete-orphan")
     messages = relationship("ClassMessage", back_populates="classroom", cascade="all, delete-orphan")
     resources = relationship("Resource", back_populates="classroom")
+
+    __table_args__ = (
+        Index("ix_classrooms_status_start_time", "status", "start_time"),
+    )
@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, TimestampMixin
+from app.models.enums import ReactionTypeEnum
+
+# Denormalized per-type reaction counters on CommunityPost
+REACTION_COUNTER_FIELDS = {
+    ReactionTypeEnum.like.value: "like_count",
+    ReactionTypeEnum.dislike.value: "dislike_count",
+    ReactionTypeEnum.love.value: "love_count",
+    ReactionTypeEnum.insightful.value: "insightful_count",
+    ReactionTypeEnum.funny.value: "funny_count",
+}
 
 
 class Community(TimestampMixin, Base):
@@ -45,8 +55,12 @@ class CommunityPost(TimestampMixin, Base):
     is_deleted = Column(Boolean, nullable=False, default=False)
 
     view_count = Column(Integer, nullable=False, default=0)
+    unique_view_count = Column(Integer, nullable=False, default=0)
     like_count = Column(Integer, nullable=False, default=0)
     dislike_count = Column(Integer, nullable=False, default=0)
+    love_count = Column(Integer, nullable=False, default=0)
+    insightful_count = Column(Integer, nullable=False, default=0)
+    funny_count = Column(Integer, nullable=False, default=0)
     comment_count = Column(Integer, nullable=False, default=0)
 
     community = relationship("Community", back_populates="posts")
@@ -54,6 +68,10 @@ class CommunityPost(TimestampMixin, Base):
     comments = relationship("CommunityComment", back_populates="post", cascade="all, delete-orphan")
     reactions = relationship("CommunityReaction", back_populates="post", cascade="all, delete-orphan")
 
+    @property
+    def reaction_counts(self):
+        return {reaction_type: getattr(self, field) or 0 for reaction_type, field in REACTION_COUNTER_FIELDS.items()}
+
 
 class CommunityComment(TimestampMixin, Base):
     __tablename__ = "community_comments"
@@ -66,6 +84,13 @@ class CommunityComment(TimestampMixin, Base):
 
     content = Column(Text, nullable=False)
 
+    # Materialized path of zero-padded ancestor ids ("0000000012.0000000034"), so a
+    # thread sorts depth-first by path and a subtree is one range scan. The range and
+    # the order rely on byte order, hence the "C" collation on Postgres (linguistic
+    # collations ignore the punctuation); SQLite compares bytes already.
+    path = Column(String(1024).with_variant(String(1024, collation="C"), "postgresql"), nullable=True)
+    depth = Column(Integer, nullable=False, default=0)
+
     is_deleted = Column(Boolean, nullable=False, default=False)
     like_count = Column(Integer, nullable=False, default=0)
 
@@ -85,6 +110,10 @@ class CommunityComment(TimestampMixin, Base):
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_community_comments_post_path", "post_id", "path"),
+    )
+
 
 class CommunityReaction(TimestampMixin, Base):
     __tablename__ = "community_reactions"
@@ -97,6 +126,10 @@ class CommunityReaction(TimestampMixin, Base):
     post = relationship("CommunityPost", back_populates="reactions")
     user = relationship("User")
 
+    __table_args__ = (
+        UniqueConstraint("post_id", "user_id", "reaction_type", name="uq_community_reaction_user_type"),
+    )
+
 
 class CommunitySubscription(TimestampMixin, Base):
     __tablename__ = "community_subscriptions"
@@ -110,6 +143,10 @@ class CommunitySubscription(TimestampMixin, Base):
     community = relationship("Community", back_populates="subscriptions")
     user = relationship("User", back_populates="community_subscriptions")
 
+    __table_args__ = (
+        UniqueConstraint("community_id", "user_id", name="uq_community_subscription_user"),
+    )
+
 
 class CommunityBan(TimestampMixin, Base):
     __tablename__ = "community_bans"
@@ -31,3 +31,16 @@ class Course(TimestampMixin, Base):
     feedbacks = relationship("CourseFeedback", back_populates="course", cascade="all, delete-orphan")
     instructors = relationship("User", secondary=CourseInstructor.__table__, back_populates="teaching_courses")
     announcements = relationship("Announcement", back_populates="course")
+    # Joined so listings can show ratings without extra queries or lazy loads.
+    rating_summary = relationship(
+        "CourseRatingSummary", back_populates="course", uselist=False, lazy="joined", passive_deletes=True
+    )
+
+    @property
+    def average_rating(self):
+        summary = self.rating_summary
+        return round(summary.rating_average, 2) if summary and summary.rating_average is not None else None
+
+    @property
+    def rating_count(self) -> int:
+        return self.rating_summary.rating_count if self.rating_summary else 0
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, JSON
+
+from app.db.base import Base, TimestampMixin
+
+
+class CourseStats(TimestampMixin, Base):
+    """
+    Per-course dashboard numbers, recomputed from the source tables by the course
+    stats service whenever enrollments, classes, tests, attendance or feedback of the
+    course change (and periodically, so the 24h/7d windows keep moving).
+    """
+    __tablename__ = "course_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+
+    # Enrollments
+    total_enrollments = Column(Integer, nullable=False, default=0)
+    completed_students = Column(Integer, nullable=False, default=0)
+    recent_enrollments_7d = Column(Integer, nullable=False, default=0)
+    progress_distribution = Column(JSON, nullable=True)  # {"0-25%": n, ..., "Completed": n}
+
+    # Engagement
+    active_students = Column(Integer, nullable=False, default=0)  # ever attended a class
+    active_students_7d = Column(Integer, nullable=False, default=0)
+    recent_activity_24h = Column(Integer, nullable=False, default=0)  # resource completions
+
+    # Content
+    total_subjects = Column(Integer, nullable=False, default=0)
+    total_classes = Column(Integer, nullable=False, default=0)
+    completed_classes = Column(Integer, nullable=False, default=0)
+    live_classes = Column(Integer, nullable=False, default=0)
+    total_tests = Column(Integer, nullable=False, default=0)
+    published_tests = Column(Integer, nullable=False, default=0)
+    total_resources = Column(Integer, nullable=False, default=0)
+    subjects = Column(JSON, nullable=True)  # [{subject_id, title, description, total_classes}]
+
+    # Copied from course_rating_summaries so one row answers the whole dashboard
+    rating_average = Column(Float, nullable=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+
+    computed_at = Column(DateTime, nullable=False, index=True)
+
+    @property
+    def completion_rate(self) -> float:
+        return round(self.completed_students / self.total_enrollments * 100, 2) if self.total_enrollments else 0
+
+    @property
+    def active_student_rate(self) -> float:
+        return round(self.active_students / self.total_enrollments * 100, 2) if self.total_enrollments else 0
+
+    @property
+    def engagement_rate(self) -> float:
+        return round(self.active_students_7d / self.total_enrollments * 100, 2) if self.total_enrollments else 0
+
+    @property
+    def average_rating(self) -> float:
+        return round(float(self.rating_average), 2) if self.rating_average else 0
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, TimestampMixin
@@ -19,3 +19,7 @@ class Enrollment(TimestampMixin, Base):
     user = relationship("User", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
     resource_completions = relationship("ResourceCompletion", back_populates="enrollment")
+
+    __table_args__ = (
+        Index("ix_enrollments_course_user", "course_id", "user_id"),
+    )
@@ -31,6 +31,9 @@ class MessageTypeEnum(str, Enum):
 class ReactionTypeEnum(str, Enum):
     like = "like"
     dislike = "dislike"
+    love = "love"
+    insightful = "insightful"
+    funny = "funny"
 
 
 class CategoryEnum(str, Enum):
@@ -75,3 +78,13 @@ class ClassroomProviderEnum(str, Enum):
     google_meet = "google_meet"
     agora = "agora"
 
+
+class FeedSortEnum(str, Enum):
+    new = "new"
+    hot = "hot"
+    top = "top"
+
+
+class CourseSortEnum(str, Enum):
+    newest = "newest"
+    rating = "rating"
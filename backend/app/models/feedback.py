@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, TimestampMixin
@@ -46,3 +46,36 @@ class InstructorFeedback(TimestampMixin, Base):
     # Relationships
     instructor = relationship("User", back_populates="instructor_feedbacks", foreign_keys=[instructor_id])
     user = relationship("User", back_populates="given_instructor_feedbacks", foreign_keys=[user_id])
+
+
+class RatingSummaryMixin:
+    """
+    Running rating totals, maintained by the feedback routes in the same transaction
+    as the feedback row. `rating_average` is stored so listings can sort on it.
+    """
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_average = Column(Float, nullable=True, index=True)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+
+    @property
+    def distribution(self):
+        return {rating: getattr(self, f"rating_{rating}") or 0 for rating in range(1, 6)}
+
+
+class CourseRatingSummary(RatingSummaryMixin, TimestampMixin, Base):
+    __tablename__ = "course_rating_summaries"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+
+    course = relationship("Course", back_populates="rating_summary")
+
+
+class InstructorRatingSummary(RatingSummaryMixin, TimestampMixin, Base):
+    __tablename__ = "instructor_rating_summaries"
+
+    instructor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import (Boolean, Column, Enum, ForeignKey, Integer, String)
+from sqlalchemy import (Boolean, Column, Enum, Float, ForeignKey, Integer, String)
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, TimestampMixin
@@ -15,6 +15,12 @@ class Resource(TimestampMixin, Base):
     resource_type = Column(Enum(ResourceTypeEnum), nullable=False)
     file_url = Column(String(1024), nullable=True)
     external_link = Column(String(1024), nullable=True)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256", ondelete="SET NULL"), nullable=True, index=True)
+
+    # Copied from the processed blob so list views need no join
+    thumbnail_url = Column(String(1024), nullable=True)
+    page_count = Column(Integer, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
 
     subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=True, index=True)
     classroom_id = Column(Integer, ForeignKey("classrooms.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -25,3 +31,4 @@ class Resource(TimestampMixin, Base):
     subject = relationship("Subject", back_populates="resources")
     classroom = relationship("Classroom", back_populates="resources")
     completions = relationship("ResourceCompletion", back_populates="resource")
+    blob = relationship("Blob", back_populates="resources")
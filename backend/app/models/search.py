@@ -0,0 +1,56 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    Boolean,
+    ForeignKey,
+    Text,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+from app.db.base import Base, TimestampMixin
+
+
+class SearchDocument(TimestampMixin, Base):
+    """
+    One searchable row per course, subject, community, post or QA question.
+    On Postgres `search_vector` is a weighted tsvector (title A, body B); other
+    databases use the `search_postings` inverted index instead.
+    """
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    entity_type = Column(String(32), nullable=False)  # course, subject, community, post, question
+    entity_id = Column(Integer, nullable=False)
+    # Visibility group, e.g. "course:12" or "community:3", so publishing or hiding
+    # a parent can flip every child document in one statement.
+    scope = Column(String(64), nullable=False, index=True)
+
+    title = Column(String(500), nullable=False)
+    body = Column(Text, nullable=True)
+    is_public = Column(Boolean, nullable=False, default=True)
+
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_id", name="uq_search_document_entity"),
+        Index("ix_search_documents_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_search_documents_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
+
+class SearchPosting(Base):
+    __tablename__ = "search_postings"
+
+    term = Column(String(64), primary_key=True)
+    document_id = Column(Integer, ForeignKey("search_documents.id", ondelete="CASCADE"), primary_key=True, index=True)
+    weight = Column(Float, nullable=False, default=1.0)
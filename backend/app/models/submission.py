@@ -5,6 +5,7 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     DateTime,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -26,3 +27,7 @@ class Submission(TimestampMixin, Base):
     # Relationships
     test = relationship("Test", back_populates="submissions")
     user = relationship("User", back_populates="submissions")
+
+    __table_args__ = (
+        UniqueConstraint("test_id", "user_id", name="uq_submission_test_user"),
+    )
@@ -20,6 +20,9 @@ class User(TimestampMixin, Base):
 
     photo = Column(String, nullable=True)
     banner_image = Column(String, nullable=True)
+    # Resized renditions of photo/banner_image, filled in once the upload is processed
+    photo_thumbnail = Column(String, nullable=True)
+    banner_thumbnail = Column(String, nullable=True)
 
     # Instructor Profile
     bio = Column(String(2000), nullable=True)
@@ -28,8 +31,10 @@ class User(TimestampMixin, Base):
 
     is_active = Column(Boolean, nullable=False, default=True)
     is_verified = Column(Boolean, nullable=False, default=False)
+    # Bumped to invalidate every token issued to the user (see token_service)
+    session_version = Column(Integer, nullable=False, default=0)
 
-    # Password Reset OTP
+    # Password Reset OTP (legacy: OTP state now lives in Redis, see otp_service)
     password_reset_otp = Column(String(6), nullable=True)
     otp_created_at = Column(DateTime, nullable=True)
     otp_attempts = Column(Integer, default=0, nullable=False)
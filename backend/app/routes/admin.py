@@ -18,6 +18,9 @@ from app.schemas.system_setting import (
 )
 from app.schemas.user import UserCreateInstructor, UserResponse, UserCreateAdmin
 from app.services.user_service import user_service
+from app.services.community_service import community_service
+from app.services.rating_summary_service import rating_summary_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -27,7 +30,7 @@ async def create_instructor(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreateInstructor,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Create a new instructor and send welcome email. Admin only.
@@ -44,7 +47,7 @@ async def create_admin(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreateAdmin,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Create a new admin and send welcome email. Admin only.
@@ -61,7 +64,7 @@ async def read_instructors(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get all instructors. Admin only.
@@ -78,7 +81,7 @@ async def read_instructors(
 @router.get("/settings", response_model=List[SystemSettingResponse])
 async def read_settings(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get all system settings. Admin only.
@@ -103,7 +106,7 @@ async def create_setting(
     *,
     db: AsyncSession = Depends(deps.get_db),
     setting_in: SystemSettingCreate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Create a new system setting. Admin only.
@@ -126,7 +129,7 @@ async def update_setting(
     db: AsyncSession = Depends(deps.get_db),
     key: str,
     setting_in: SystemSettingUpdate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Update a system setting by key. Admin only.
@@ -149,7 +152,7 @@ async def update_setting(
 @router.get("/stats", response_model=SystemStats)
 async def read_system_stats(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get system statistics. Admin only.
@@ -175,3 +178,27 @@ async def read_system_stats(
         "active_classrooms": active_classrooms or 0,
         "total_communities": total_communities or 0,
     }
+
+
+@router.post("/maintenance/reconcile-counters")
+async def reconcile_counters(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
+) -> Any:
+    """
+    Recompute community member/post counts and post reaction/comment counts. Admin only.
+    """
+    fixed = await community_service.reconcile_counters(db)
+    return {"message": "Counters reconciled", "fixed": fixed}
+
+
+@router.post("/maintenance/rebuild-rating-summaries")
+async def rebuild_rating_summaries(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
+) -> Any:
+    """
+    Recompute course and instructor rating summaries from feedback. Admin only.
+    """
+    rebuilt = await rating_summary_service.rebuild(db)
+    return {"message": "Rating summaries rebuilt", "rebuilt": rebuilt}
@@ -13,6 +13,7 @@ from app.models.enrollment import Enrollment
 from app.schemas.announcement import AnnouncementCreate, AnnouncementResponse, AnnouncementUpdate
 from app.models.enums import RoleEnum
 from app.services.notification_service import notification_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -128,7 +129,7 @@ async def delete_announcement(
     *,
     db: AsyncSession = Depends(deps.get_db),
     announcement_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Delete an announcement.
@@ -9,9 +9,11 @@ from datetime import datetime
 from app.api import deps
 from app.models.attendance import Attendance
 from app.models.classroom import Classroom
-from app.models.user import User
 from app.schemas.attendance import AttendanceCreate, AttendanceResponse, AttendanceUpdate
 from app.models.enums import RoleEnum
+from app.services.activity_service import activity_service, ATTENDANCE
+from app.services.course_stats_service import course_stats_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -21,7 +23,7 @@ async def mark_attendance(
     *,
     db: AsyncSession = Depends(deps.get_db),
     attendance_in: AttendanceCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Mark attendance (e.g. when joining a class).
@@ -45,6 +47,8 @@ async def mark_attendance(
     db.add(attendance)
     await db.commit()
     await db.refresh(attendance)
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await activity_service.record(ATTENDANCE, current_user.id, subject_id=classroom.subject_id)
     
     # Populate helper title
     attendance.classroom_title = classroom.title
@@ -57,7 +61,7 @@ async def read_my_attendance(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get current user's attendance history.
@@ -84,7 +88,7 @@ async def read_my_attendance(
 async def get_classroom_attendance(
     classroom_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get attendance records for a specific classroom (Instructor).
@@ -1,4 +1,4 @@
-from datetime import timedelta, datetime
+from datetime import timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -21,8 +21,11 @@ from app.schemas.user import (
     ResetPasswordRequest,
     PasswordResetResponse
 )
+from app.services.activity_service import activity_service, LOGIN
 from app.services.user_service import user_service
 from app.services.email import email_service
+from app.services.otp_service import otp_service
+from app.services.token_service import token_service
 from jose import jwt, JWTError
 
 router = APIRouter()
@@ -41,7 +44,7 @@ async def login_access_token(
     user = result.scalars().first()
 
     # 2. Authenticate
-    if not user or not security.verify_password(form_data.password, user.password):
+    if not user or not await security.verify_password_async(form_data.password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     if not user.is_active:
@@ -49,15 +52,49 @@ async def login_access_token(
 
     # 3. Create tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    await token_service.store_session_version(user.id, user.session_version, only_if_missing=True)
+    await activity_service.record(LOGIN, user.id)
     return {
         "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id,
+            expires_delta=access_token_expires,
+            session_version=user.session_version,
+            role=user.role,
         ),
-        "refresh_token": security.create_refresh_token(user.id),
+        "refresh_token": security.create_refresh_token(user.id, session_version=user.session_version),
         "token_type": "bearer",
     }
 
 
+@router.post("/logout")
+async def logout(
+    claims: dict = Depends(deps.get_token_claims),
+) -> Any:
+    """
+    Revoke the access token used for this request.
+    """
+    if not await token_service.revoke(claims):
+        raise HTTPException(
+            status_code=503,
+            detail="Logout is temporarily unavailable, please try again",
+        )
+    return {"message": "Logged out"}
+
+
+@router.post("/logout-all")
+async def logout_all(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Revoke every token issued to the current user, on all devices.
+    """
+    token_service.bump_session_version(current_user)
+    await db.commit()
+    await token_service.store_session_version(current_user.id, current_user.session_version)
+    return {"message": "Logged out from all sessions"}
+
+
 @router.post("/register", response_model=UserResponse)
 async def register_user(
     *,
@@ -80,7 +117,7 @@ async def register_user(
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        password=security.get_password_hash(user_in.password),
+        password=await security.get_password_hash_async(user_in.password),
         role=user_in.role,
         is_active=user_in.is_active,
     )
@@ -127,7 +164,14 @@ async def forgot_password(
     """
     Request password reset - sends OTP to user's email
     """
-    # 1. Find user by email
+    # 1. Rate limit per email before touching the database
+    if not await otp_service.allow("issue", request.email, settings.OTP_ISSUE_LIMIT):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many OTP requests. Please try again later."
+        )
+
+    # 2. Find user by email
     result = await db.execute(select(User).where(User.email == request.email))
     user = result.scalars().first()
     
@@ -144,15 +188,8 @@ async def forgot_password(
             detail="Account is inactive"
         )
     
-    # 2. Generate OTP
-    otp = security.generate_otp()
-    
-    # 3. Save OTP to database
-    user.password_reset_otp = otp
-    user.otp_created_at = datetime.utcnow()
-    user.otp_attempts = 0  # Reset attempts counter
-    
-    await db.commit()
+    # 3. Generate OTP and store it (hashed, with expiry) in Redis
+    otp = await otp_service.issue(request.email, user.id)
     
     # 4. Send OTP via email
     try:
@@ -174,52 +211,36 @@ async def forgot_password(
 @router.post("/verify-otp", response_model=PasswordResetResponse)
 async def verify_otp(
     *,
-    db: AsyncSession = Depends(deps.get_db),
     request: VerifyOTPRequest,
 ) -> Any:
     """
-    Verify OTP - required before password reset
+    Verify OTP - required before password reset. Handled entirely in Redis.
     """
-    result = await db.execute(select(User).where(User.email == request.email))
-    user = result.scalars().first()
-    
-    if not user or not user.password_reset_otp:
+    if not await otp_service.allow("verify", request.email, settings.OTP_VERIFY_LIMIT):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired OTP"
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please try again later."
         )
-    
-    if not security.is_otp_valid(user.otp_created_at, settings.OTP_EXPIRY_MINUTES):
-        user.password_reset_otp = None
-        user.otp_created_at = None
-        user.otp_attempts = 0
-        await db.commit()
+
+    outcome, remaining = await otp_service.verify(request.email, request.otp)
+    if outcome == otp_service.EXPIRED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="OTP has expired. Please request a new one."
+            detail="Invalid or expired OTP"
         )
     
-    if user.otp_attempts >= settings.OTP_MAX_ATTEMPTS:
-        user.password_reset_otp = None
-        user.otp_created_at = None
-        user.otp_attempts = 0
-        await db.commit()
+    if outcome == otp_service.LOCKED:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many failed attempts. Please request a new OTP."
         )
     
-    if user.password_reset_otp != request.otp:
-        user.otp_attempts += 1
-        await db.commit()
+    if outcome == otp_service.INVALID:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid OTP. {settings.OTP_MAX_ATTEMPTS - user.otp_attempts} attempts remaining."
+            detail=f"Invalid OTP. {remaining} attempts remaining."
         )
     
-    user.is_verified = True
-    await db.commit()
-    
     return PasswordResetResponse(
         message="OTP verified successfully. You can now reset your password.",
         success=True
@@ -236,44 +257,44 @@ async def reset_password(
     """
     Reset password - requires OTP to be verified first
     """
-    result = await db.execute(select(User).where(User.email == request.email))
-    user = result.scalars().first()
-    
-    if not user or not user.password_reset_otp:
+    if not await otp_service.allow("verify", request.email, settings.OTP_VERIFY_LIMIT):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please try again later."
+        )
+
+    outcome, user_id = await otp_service.consume(request.email, request.otp)
+    if outcome == otp_service.EXPIRED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired OTP"
         )
     
-    if not user.is_verified:
+    if outcome == otp_service.UNVERIFIED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Please verify OTP first"
         )
     
-    if not security.is_otp_valid(user.otp_created_at, settings.OTP_EXPIRY_MINUTES):
-        user.password_reset_otp = None
-        user.otp_created_at = None
-        user.otp_attempts = 0
-        user.is_verified = False
-        await db.commit()
+    if outcome == otp_service.INVALID:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="OTP has expired. Please request a new one."
+            detail="Invalid OTP"
         )
     
-    if user.password_reset_otp != request.otp:
+    user = await db.get(User, user_id)
+    if not user or user.email != request.email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid OTP"
+            detail="Invalid or expired OTP"
         )
     
-    user.password = security.get_password_hash(request.new_password)
-    user.password_reset_otp = None
-    user.otp_created_at = None
-    user.otp_attempts = 0
+    user.password = await security.get_password_hash_async(request.new_password)
+    user.is_verified = True  # the OTP proved ownership of the email address
+    token_service.bump_session_version(user)
     
     await db.commit()
+    await token_service.store_session_version(user.id, user.session_version)
     
     return PasswordResetResponse(
         message="Password has been reset successfully",
@@ -10,6 +10,7 @@ from app.models.chatbot import ChatSession, ChatMessage
 from app.models.user import User
 from app.schemas.chatbot import ChatSessionResponse, ChatMessageCreate, ChatMessageResponse
 from app.services.llm_service import llm_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -19,7 +20,7 @@ async def read_sessions(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 50,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get all chat sessions for the current user.
@@ -34,7 +35,7 @@ async def read_sessions(
 async def create_session(
     *,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Create a new chat session.
@@ -50,7 +51,7 @@ async def create_session(
 async def read_session(
     session_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get a specific chat session with messages.
@@ -72,7 +73,7 @@ async def send_message(
     db: AsyncSession = Depends(deps.get_db),
     session_id: int,
     message_in: ChatMessageCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Send a message to the AI and get a response.
@@ -145,7 +146,7 @@ async def update_session(
     db: AsyncSession = Depends(deps.get_db),
     session_id: int,
     title: str,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Update chat session title.
@@ -170,7 +171,7 @@ async def delete_session(
     *,
     db: AsyncSession = Depends(deps.get_db),
     session_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Delete a chat session.
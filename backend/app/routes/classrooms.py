@@ -12,6 +12,10 @@ from app.models.class_message import ClassMessage
 from app.models.user import User
 from app.schemas.classroom import ClassroomCreate, ClassroomResponse, ClassroomUpdate, ClassMessageCreate, ClassMessageResponse
 from app.models.enums import RoleEnum, ClassroomProviderEnum
+from app.services.class_scheduler_service import class_scheduler_service
+from app.services.course_stats_service import course_stats_service
+from app.services.file_delivery_service import file_delivery_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -37,6 +41,8 @@ async def create_classroom(
     db.add(classroom)
     await db.commit()
     await db.refresh(classroom)
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await class_scheduler_service.schedule(classroom)
     return classroom
 
 
@@ -45,7 +51,7 @@ async def read_classrooms(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     List classrooms.
@@ -66,7 +72,7 @@ async def read_course_classrooms(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get classrooms for a specific course.
@@ -90,7 +96,7 @@ async def read_course_classrooms(
 async def read_classroom(
     classroom_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get classroom details.
@@ -191,7 +197,7 @@ async def join_classroom(
             "id": current_user.id,
             "name": current_user.full_name,
             "role": current_user.role,
-            "photo": current_user.photo
+            "photo": file_delivery_service.sign_url(current_user.photo)
         }
     }
 
@@ -219,6 +225,8 @@ async def start_classroom(
     db.add(classroom)
     await db.commit()
     await db.refresh(classroom)
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await class_scheduler_service.schedule(classroom)
     return classroom
 
 
@@ -244,6 +252,8 @@ async def end_classroom(
     db.add(classroom)
     await db.commit()
     await db.refresh(classroom)
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await class_scheduler_service.schedule(classroom)
     return classroom
 
 
@@ -270,6 +280,7 @@ async def update_classroom(
     if current_user.role != RoleEnum.admin and classroom.instructor_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    previous_subject_id = classroom.subject_id
     update_data = classroom_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(classroom, field, value)
@@ -277,6 +288,10 @@ async def update_classroom(
     db.add(classroom)
     await db.commit()
     await db.refresh(classroom)
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await class_scheduler_service.schedule(classroom)
+    if previous_subject_id != classroom.subject_id:
+        await course_stats_service.mark_dirty(subject_id=previous_subject_id)
     return classroom
 
 
@@ -285,7 +300,7 @@ async def delete_classroom(
     *,
     db: AsyncSession = Depends(deps.get_db),
     classroom_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
 
     """
@@ -304,6 +319,8 @@ async def delete_classroom(
 
     await db.delete(classroom)
     await db.commit()
+    await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+    await class_scheduler_service.unschedule(classroom_id)
     return {"message": "Classroom deleted successfully"}
 
 
@@ -313,7 +330,7 @@ async def read_classroom_messages(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get messages for a classroom.
@@ -340,7 +357,7 @@ async def create_classroom_message(
     classroom_id: int,
     message_in: ClassMessageCreate,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Post a message to a classroom.
@@ -3,13 +3,17 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
 from app.models.community import Community, CommunitySubscription, CommunityPost
-from app.models.user import User
 from app.schemas.community import CommunityCreate, CommunityResponse, CommunityUpdate, PostResponse
-from app.models.enums import RoleEnum
+from app.models.enums import RoleEnum, FeedSortEnum
+from app.services.search_service import search_service
+from app.services.feed_service import feed_service
+from app.services.community_service import community_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -19,7 +23,7 @@ async def create_community(
     *,
     db: AsyncSession = Depends(deps.get_db),
     community_in: CommunityCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Create a new community.
@@ -29,6 +33,8 @@ async def create_community(
         created_by=current_user.id
     )
     db.add(community)
+    await db.flush()
+    await search_service.index_community(db, community)
     await db.commit()
     await db.refresh(community)
     
@@ -58,11 +64,18 @@ async def read_communities(
     """
     List communities.
     """
-    query = select(Community).where(Community.is_active == True)
-    
     if search:
-        query = query.where(Community.name.ilike(f"%{search}%"))
-        
+        # Ranked full-text search; inactive and private communities are not public in the index.
+        community_ids = await search_service.search_ids(db, search, "community", skip=skip, limit=limit)
+        if not community_ids:
+            return []
+        result = await db.execute(
+            select(Community).where(Community.id.in_(community_ids), Community.is_active == True)
+        )
+        communities = {community.id: community for community in result.scalars().all()}
+        return [communities[community_id] for community_id in community_ids if community_id in communities]
+
+    query = select(Community).where(Community.is_active == True)
     query = query.offset(skip).limit(limit).order_by(desc(Community.member_count))
     result = await db.execute(query)
     return result.scalars().all()
@@ -87,7 +100,7 @@ async def read_community(
 async def join_community(
     community_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Join a community.
@@ -111,12 +124,18 @@ async def join_community(
     # Subscribe
     sub = CommunitySubscription(community_id=community_id, user_id=current_user.id)
     db.add(sub)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Lost a race with a concurrent join for the same user
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Already a member")
     
     # Update count
-    community.member_count += 1
-    db.add(community)
+    await community_service.adjust_counter(db, Community, community_id, "member_count", 1)
     
     await db.commit()
+    await feed_service.invalidate_home(current_user.id)
     return {"message": "Joined successfully"}
 
 
@@ -124,7 +143,7 @@ async def join_community(
 async def leave_community(
     community_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Leave a community.
@@ -139,16 +158,13 @@ async def leave_community(
     if not sub:
         raise HTTPException(status_code=400, detail="Not a member")
         
-    db.delete(sub)
+    await db.delete(sub)
     
     # Update count
-    result = await db.execute(select(Community).where(Community.id == community_id))
-    community = result.scalars().first()
-    if community and community.member_count > 0:
-        community.member_count -= 1
-        db.add(community)
+    await community_service.adjust_counter(db, Community, community_id, "member_count", -1)
         
     await db.commit()
+    await feed_service.invalidate_home(current_user.id)
     return {"message": "Left successfully"}
 
 
@@ -158,7 +174,19 @@ async def read_community_posts(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 50,
+    sort: FeedSortEnum = FeedSortEnum.new,
 ) -> Any:
+    """
+    List posts in a community. `hot` and `top` are served from the precomputed feed.
+    """
+    post_ids = await feed_service.community_post_ids(db, community_id, sort, skip, limit)
+    if post_ids is not None:
+        return await feed_service.fetch_posts(db, post_ids)
+
+    if sort == FeedSortEnum.new:
+        order_by = [desc(CommunityPost.is_pinned), desc(CommunityPost.created_at)]
+    else:
+        order_by = feed_service.fallback_order(sort)
 
     query = (
         select(CommunityPost)
@@ -169,7 +197,7 @@ async def read_community_posts(
             CommunityPost.community_id == community_id,
             CommunityPost.is_deleted == False
         )
-        .order_by(desc(CommunityPost.is_pinned), desc(CommunityPost.created_at))
+        .order_by(*order_by)
         .offset(skip)
         .limit(limit)
     )
@@ -184,7 +212,7 @@ async def update_community(
     db: AsyncSession = Depends(deps.get_db),
     community_id: int,
     community_in: CommunityUpdate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Update a community. Creator or Admin only.
@@ -197,11 +225,16 @@ async def update_community(
     if current_user.role != RoleEnum.admin and community.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    was_visible = community.is_active and not community.is_private
     update_data = community_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(community, field, value)
 
     db.add(community)
+    await search_service.index_community(db, community)
+    is_visible = community.is_active and not community.is_private
+    if is_visible != was_visible:
+        await search_service.set_scope_visibility(db, f"community:{community.id}", is_visible)
     await db.commit()
     await db.refresh(community)
     return community
@@ -212,7 +245,7 @@ async def delete_community(
     *,
     db: AsyncSession = Depends(deps.get_db),
     community_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Delete a community. Creator or Admin only.
@@ -225,6 +258,8 @@ async def delete_community(
     if current_user.role != RoleEnum.admin and community.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    await search_service.remove_scope(db, f"community:{community.id}")
     await db.delete(community)
     await db.commit()
+    await feed_service.drop_community(community_id)
     return {"message": "Community deleted successfully"}
@@ -7,10 +7,13 @@ from sqlalchemy.orm import selectinload
 
 from app.api import deps
 from app.models.course import Course
+from app.models.feedback import CourseRatingSummary
 from app.models.user import User
 from app.schemas.course import CourseCreate, CourseResponse, CourseUpdate, CourseDetailResponse
-from app.models.enums import RoleEnum
+from app.models.enums import RoleEnum, CourseSortEnum
 from app.services.notification_service import notification_service
+from app.services.search_service import search_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -21,16 +24,33 @@ async def read_courses(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
+    sort: CourseSortEnum = CourseSortEnum.newest,
 ) -> Any:
     """
     Retrieve courses. Public endpoint.
+    Search results are ordered by relevance; otherwise by `sort`.
     """
-    query = select(Course).where(Course.is_published == True)
-    
     if search:
-        query = query.where(Course.title.ilike(f"%{search}%"))
-        
-    query = query.offset(skip).limit(limit).order_by(desc(Course.created_at))
+        # Ranked full-text search; the index only holds published courses as public.
+        course_ids = await search_service.search_ids(db, search, "course", skip=skip, limit=limit)
+        if not course_ids:
+            return []
+        result = await db.execute(
+            select(Course).where(Course.id.in_(course_ids), Course.is_published == True)
+        )
+        courses = {course.id: course for course in result.scalars().all()}
+        return [courses[course_id] for course_id in course_ids if course_id in courses]
+
+    query = select(Course).where(Course.is_published == True)
+    if sort == CourseSortEnum.rating:
+        query = query.outerjoin(CourseRatingSummary, CourseRatingSummary.course_id == Course.id).order_by(
+            CourseRatingSummary.rating_average.desc().nulls_last(),
+            CourseRatingSummary.rating_count.desc().nulls_last(),
+            desc(Course.created_at),
+        )
+    else:
+        query = query.order_by(desc(Course.created_at))
+    query = query.offset(skip).limit(limit)
     result = await db.execute(query)
     return result.scalars().all()
 
@@ -50,6 +70,8 @@ async def create_course(
         created_by=current_user.id
     )
     db.add(course)
+    await db.flush()
+    await search_service.index_course(db, course)
     await db.commit()
     await db.refresh(course)
     
@@ -92,7 +114,7 @@ async def update_course(
     db: AsyncSession = Depends(deps.get_db),
     course_id: int,
     course_in: CourseUpdate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Update a course. Instructor only.
@@ -118,6 +140,7 @@ async def update_course(
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
     update_data = course_in.model_dump(exclude_unset=True)
+    was_published = course.is_published
     
     # Handle instructors assignment
     if "instructors" in update_data:
@@ -137,6 +160,9 @@ async def update_course(
         setattr(course, field, value)
 
     db.add(course)
+    await search_service.index_course(db, course)
+    if course.is_published != was_published:
+        await search_service.set_scope_visibility(db, f"course:{course.id}", course.is_published)
     await db.commit()
     await db.refresh(course)
     return course
@@ -147,7 +173,7 @@ async def delete_course(
     *,
     db: AsyncSession = Depends(deps.get_db),
     course_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Delete a course. Instructor only.
@@ -161,6 +187,7 @@ async def delete_course(
     if current_user.role != RoleEnum.admin and course.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    await search_service.remove_scope(db, f"course:{course.id}")
     await db.delete(course)
     await db.commit()
     return course
@@ -172,7 +199,7 @@ async def get_my_courses(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get all courses created by the current instructor.
@@ -198,7 +225,7 @@ async def read_all_courses_admin(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Retrieve all courses (including drafts) for admin.
@@ -1,19 +1,24 @@
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.models.user import User
+from app.core.profiling import statement_budget
+from app.services.activity_service import activity_service, window as activity_window
 from app.services.analytics_service import analytics_service
 from app.services.classroom_analytics_service import classroom_analytics_service
+from app.services.course_stats_service import course_stats_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
 
 @router.get("/overview")
+@statement_budget(15)
 async def get_admin_dashboard(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get comprehensive admin dashboard with platform overview.
@@ -22,11 +27,32 @@ async def get_admin_dashboard(
     return dashboard_data
 
 
+@router.get("/activity")
+@statement_budget(3)
+async def get_activity_trend(
+    scope: str = Query("platform", pattern="^(platform|course|user)$"),
+    scope_id: int = 0,
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
+) -> Any:
+    """
+    Activity time series (hourly or daily) for the whole platform, one course or one user.
+    Defaults to the last 30 days of all metrics.
+    """
+    start, end, metrics = activity_window(granularity, start, end, metrics)
+    scope_ids = [0] if scope == "platform" else [scope_id]
+    return await activity_service.series(db, scope, scope_ids, start, end, granularity, metrics)
+
+
 @router.get("/instructor/{instructor_id}/performance")
 async def get_instructor_performance_stats(
     instructor_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get detailed instructor performance with AI-powered insights.
@@ -40,7 +66,7 @@ async def get_instructor_performance_stats(
 async def get_instructor_monitoring(
     instructor_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Real-time monitoring of instructor activities.
@@ -53,7 +79,7 @@ async def get_instructor_monitoring(
 async def get_course_analytics(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Detailed analytics for a specific course including classroom stats.
@@ -63,20 +89,15 @@ async def get_course_analytics(
 
 
 @router.get("/course/{course_id}/tracking")
+@statement_budget(20)
 async def get_course_tracking(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
 
-    from sqlalchemy import select, func, case
-    from datetime import datetime, timedelta
+    from sqlalchemy import select
     from app.models.course import Course
-    from app.models.enrollment import Enrollment
-    from app.models.resource_completion import ResourceCompletion
-    from app.models.attendance import Attendance
-    from app.models.classroom import Classroom
-    from app.models.subject import Subject
 
     course = (
         await db.execute(select(Course).where(Course.id == course_id))
@@ -85,129 +106,33 @@ async def get_course_tracking(
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    # Total enrollments
-    total_enrolled = (
-        await db.execute(
-            select(func.count()).select_from(Enrollment)
-            .where(Enrollment.course_id == course_id)
-        )
-    ).scalar() or 0
-
-    # Active students in last 7 days
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    active_students = (
-        await db.execute(
-            select(func.count(func.distinct(Attendance.user_id)))
-            .select_from(Attendance)
-            .join(Classroom, Attendance.classroom_id == Classroom.id)
-            .join(Subject, Classroom.subject_id == Subject.id)
-            .where(
-                Subject.course_id == course_id,
-                Attendance.joined_at >= week_ago
-            )
-        )
-    ).scalar() or 0
-
-    # Completion tracking
-    completion_result = (
-        await db.execute(
-            select(
-                func.count(func.distinct(Enrollment.user_id)).label("total"),
-                func.sum(
-                    case(
-                        (Enrollment.progress_percent >= 100, 1),
-                        else_=0
-                    )
-                ).label("completed")
-            )
-            .where(Enrollment.course_id == course_id)
-        )
-    ).first()
-
-    completed_students = (
-        completion_result.completed if completion_result and completion_result.completed else 0
-    )
-
-    # Last 24-hour resource completions
-    day_ago = datetime.utcnow() - timedelta(days=1)
-    recent_activity = (
-        await db.execute(
-            select(func.count())
-            .select_from(ResourceCompletion)
-            .join(Enrollment, ResourceCompletion.enrollment_id == Enrollment.id)
-            .where(
-                Enrollment.course_id == course_id,
-                ResourceCompletion.completed_at >= day_ago
-            )
-        )
-    ).scalar() or 0
-
-    # Progress distribution grouping
-    progress_rows = (
-        await db.execute(
-            select(
-                case(
-                    (Enrollment.progress_percent < 25, "0-25%"),
-                    (Enrollment.progress_percent < 50, "25-50%"),
-                    (Enrollment.progress_percent < 75, "50-75%"),
-                    (Enrollment.progress_percent < 100, "75-100%"),
-                    else_="Completed",
-                ).label("range"),
-                func.count().label("count"),
-            )
-            .where(Enrollment.course_id == course_id)
-            .group_by("range")
-        )
-    ).all()
-
-    progress_distribution = {
-        row.range: row.count for row in progress_rows
-    }
-
-    completion_rate = round(
-        (completed_students / total_enrolled * 100)
-        if total_enrolled > 0
-        else 0,
-        2
-    )
-
-    engagement_rate = round(
-        (active_students / total_enrolled * 100)
-        if total_enrolled > 0
-        else 0,
-        2
-    )
+    stats = await course_stats_service.get(db, course_id)
 
     return {
         "course_id": course_id,
         "course_title": course.title or "",
-        "total_enrolled": total_enrolled,
-        "active_students_7d": active_students,
-        "completed_students": completed_students,
-        "completion_rate": completion_rate,
-        "recent_activity_24h": recent_activity,
-        "progress_distribution": progress_distribution or {},
-        "engagement_rate": engagement_rate
+        "total_enrolled": stats.total_enrollments,
+        "active_students_7d": stats.active_students_7d,
+        "completed_students": stats.completed_students,
+        "completion_rate": stats.completion_rate,
+        "recent_activity_24h": stats.recent_activity_24h,
+        "progress_distribution": stats.progress_distribution or {},
+        "engagement_rate": stats.engagement_rate
     }
 
 
 @router.get("/course/{course_id}/overview")
+@statement_budget(20)
 async def get_course_overview(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get comprehensive course overview for admin.
     """
-    from sqlalchemy import select, func
+    from sqlalchemy import select
     from app.models.course import Course
-    from app.models.subject import Subject
-    from app.models.enrollment import Enrollment
-    from app.models.classroom import Classroom
-    from app.models.attendance import Attendance
-    from app.models.test import Test
-    from app.models.feedback import CourseFeedback
     
     # Get course
     course_result = await db.execute(
@@ -230,102 +155,22 @@ async def get_course_overview(
         "created_at": course.created_at.isoformat() if course.created_at else None
     }
     
-    # Total enrollments
-    total_enrollments = (
-        await db.execute(
-            select(func.count()).select_from(Enrollment)
-            .where(Enrollment.course_id == course_id)
-        )
-    ).scalar() or 0
-    
-    # Active students
-    active_students = (
-        await db.execute(
-            select(func.count(func.distinct(Attendance.user_id)))
-            .select_from(Attendance)
-            .join(Classroom, Attendance.classroom_id == Classroom.id)
-            .join(Subject, Classroom.subject_id == Subject.id)
-            .where(Subject.course_id == course_id)
-        )
-    ).scalar() or 0
-    
-    # Subjects with class count
-    subjects_query = await db.execute(
-        select(
-            Subject.id,
-            Subject.title,
-            Subject.description,
-            func.count(Classroom.id).label("total_classes")
-        )
-        .outerjoin(Classroom, Classroom.subject_id == Subject.id)
-        .where(Subject.course_id == course_id)
-        .group_by(Subject.id, Subject.title, Subject.description)
-    )
-    
-    subjects = [
-        {
-            "subject_id": row.id,
-            "title": row.title,
-            "description": row.description,
-            "total_classes": row.total_classes or 0
-        }
-        for row in subjects_query.all()
-    ]
-    
-    # Total classes
-    total_classes = sum(s["total_classes"] for s in subjects)
-    
-    # Total tests
-    total_tests = (
-        await db.execute(
-            select(func.count()).select_from(Test)
-            .join(Subject, Test.subject_id == Subject.id)
-            .where(Subject.course_id == course_id)
-        )
-    ).scalar() or 0
-    
-    # Average rating and feedback count
-    feedback_stats = (
-        await db.execute(
-            select(
-                func.avg(CourseFeedback.rating).label("avg_rating"),
-                func.count().label("total_feedback")
-            )
-            .where(CourseFeedback.course_id == course_id)
-        )
-    ).first()
-    
-    average_rating = round(feedback_stats.avg_rating, 2) if feedback_stats and feedback_stats.avg_rating else 0
-    total_feedback = feedback_stats.total_feedback if feedback_stats else 0
-    
-    # Completion rate
-    completed_count = (
-        await db.execute(
-            select(func.count())
-            .select_from(Enrollment)
-            .where(
-                Enrollment.course_id == course_id,
-                Enrollment.progress_percent >= 100
-            )
-        )
-    ).scalar() or 0
-    
-    completion_rate = round((completed_count / total_enrollments * 100) if total_enrollments > 0 else 0, 2)
+    stats = await course_stats_service.get(db, course_id)
     
     return {
         "course": course_info,
         "statistics": {
-            "total_enrollments": total_enrollments,
-            "active_students": active_students,
-            "total_subjects": len(subjects),
-            "total_classes": total_classes,
-            "total_tests": total_tests,
-            "average_rating": average_rating,
-            "total_feedback": total_feedback,
-            "completion_rate": completion_rate
+            "total_enrollments": stats.total_enrollments,
+            "active_students": stats.active_students,
+            "total_subjects": stats.total_subjects,
+            "total_classes": stats.total_classes,
+            "total_tests": stats.total_tests,
+            "average_rating": stats.average_rating,
+            "total_feedback": stats.rating_count,
+            "completion_rate": stats.completion_rate
         },
-        "subjects": subjects,
+        "subjects": stats.subjects or [],
         "engagement": {
-            "active_student_rate": round((active_students / total_enrollments * 100) if total_enrollments > 0 else 0, 2)
+            "active_student_rate": stats.active_student_rate
         }
     }
@@ -1,11 +1,16 @@
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.models.user import User
-from app.services.analytics_service import analytics_service
+from app.core.profiling import statement_budget
+from app.schemas.roster import StudentRoster
+from app.services.activity_service import activity_service, window as activity_window
+from app.services.analytics_service import analytics_service, ROSTER_SORTS
 from app.services.classroom_analytics_service import classroom_analytics_service
+from app.services.course_stats_service import course_stats_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -13,7 +18,7 @@ router = APIRouter()
 @router.get("/overview")
 async def get_instructor_dashboard(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get instructor's personal dashboard with course stats and recent activity.
@@ -22,10 +27,44 @@ async def get_instructor_dashboard(
     return dashboard_data
 
 
+@router.get("/activity")
+@statement_budget(3)
+async def get_my_activity_trend(
+    course_id: Optional[int] = None,
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
+) -> Any:
+    """
+    Activity time series (hourly or daily) for one of my courses, or all of them combined.
+    Defaults to the last 30 days of all metrics.
+    """
+    from sqlalchemy import select, or_
+    from app.models.course import Course
+    from app.models.user import User
+
+    start, end, metrics = activity_window(granularity, start, end, metrics)
+
+    query = select(Course.id).where(
+        or_(Course.created_by == current_user.id, Course.instructors.any(User.id == current_user.id))
+    )
+    if course_id is not None:
+        query = query.where(Course.id == course_id)
+    course_ids = (await db.execute(query)).scalars().all()
+    if course_id is not None and not course_ids:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    return await activity_service.series(db, "course", course_ids, start, end, granularity, metrics)
+
+
 @router.get("/performance")
+@statement_budget(10)
 async def get_my_performance(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get my performance metrics with AI insights.
@@ -35,9 +74,10 @@ async def get_my_performance(
 
 
 @router.get("/students")
+@statement_budget(3)
 async def get_my_students(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get all students enrolled in my courses.
@@ -46,11 +86,50 @@ async def get_my_students(
     return students
 
 
+@router.get("/students/roster", response_model=StudentRoster)
+@statement_budget(3)
+async def get_my_student_roster(
+    q: Optional[str] = Query(None, max_length=200, description="Filter by name or email"),
+    course_id: Optional[int] = None,
+    min_progress: Optional[float] = Query(None, ge=0, le=100),
+    max_progress: Optional[float] = Query(None, ge=0, le=100),
+    sort: str = Query("name", description="name, progress, last_active or courses"),
+    order: str = Query("asc", description="asc or desc"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
+) -> Any:
+    """
+    Paginated roster of the students in my courses, sorted and filtered server-side.
+    Average progress and last activity are per student across the matching courses.
+    """
+    if sort not in ROSTER_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unknown order: {order}")
+
+    total, students = await analytics_service.get_instructor_student_roster(
+        db,
+        current_user.id,
+        skip=skip,
+        limit=limit,
+        sort=sort,
+        descending=order == "desc",
+        search=q,
+        course_id=course_id,
+        min_progress=min_progress,
+        max_progress=max_progress,
+    )
+    return StudentRoster(total=total, items=students)
+
+
 @router.get("/course/{course_id}/analytics")
+@statement_budget(20)
 async def get_my_course_analytics(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get detailed analytics for my course including all classroom sessions.
@@ -77,7 +156,7 @@ async def get_my_course_analytics(
 async def get_classroom_detailed_stats(
     classroom_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get detailed stats for a specific classroom.
@@ -135,20 +214,12 @@ async def get_classroom_detailed_stats(
 async def get_course_overview(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     
-    from sqlalchemy import select, func, case
-    from datetime import datetime, timedelta
+    from sqlalchemy import select
     
     from app.models.course import Course
-    from app.models.subject import Subject
-    from app.models.enrollment import Enrollment
-    from app.models.classroom import Classroom
-    from app.models.attendance import Attendance
-    from app.models.test import Test
-    from app.models.submission import Submission
-    from app.models.feedback import CourseFeedback
     
     # Validate ownership
     course_result = await db.execute(
@@ -173,123 +244,30 @@ async def get_course_overview(
         "created_at": course.created_at.isoformat() if course.created_at else None
     }
 
-    # Enrollment: total
-    total_enroll_result = await db.execute(
-        select(func.count()).select_from(Enrollment)
-        .where(Enrollment.course_id == course_id)
-    )
-    total_enrollments = total_enroll_result.scalar() or 0
-
-    active_students_result = await db.execute(
-        select(func.count(func.distinct(Attendance.user_id)))
-        .select_from(Attendance)
-        .join(Classroom, Attendance.classroom_id == Classroom.id)
-        .join(Subject, Classroom.subject_id == Subject.id)
-        .where(Subject.course_id == course_id)
-    )
-    active_students = active_students_result.scalar() or 0
-
-    # Subjects + class count summary
-    subjects_query = await db.execute(
-        select(
-            Subject.id,
-            Subject.title,
-            func.count(Classroom.id).label("total_classes")
-        )
-        .outerjoin(Classroom, Classroom.subject_id == Subject.id)
-        .where(Subject.course_id == course_id)
-        .group_by(Subject.id, Subject.title)
-    )
-
-    subjects = [
-        {
-            "subject_id": row.id,
-            "title": row.title,
-            "total_classes": row.total_classes,
-        }
-        for row in subjects_query
-    ]
-
-    total_classes_result = await db.execute(
-        select(func.count())
-        .select_from(Classroom)
-        .join(Subject, Subject.id == Classroom.subject_id)
-        .where(Subject.course_id == course_id)
-    )
-    total_classes = total_classes_result.scalar() or 0
-
-    total_tests_result = await db.execute(
-        select(func.count())
-        .select_from(Test)
-        .join(Subject, Test.subject_id == Subject.id)
-        .where(Subject.course_id == course_id)
-    )
-    total_tests = total_tests_result.scalar() or 0
-
-    avg_rating_result = await db.execute(
-        select(func.avg(CourseFeedback.rating))
-        .where(CourseFeedback.course_id == course_id)
-    )
-    avg_rating = avg_rating_result.scalar()
-    avg_rating = round(float(avg_rating), 2) if avg_rating else 0
-
-    total_feedback_result = await db.execute(
-        select(func.count())
-        .select_from(CourseFeedback)
-        .where(CourseFeedback.course_id == course_id)
-    )
-    total_feedback = total_feedback_result.scalar() or 0
-
-    week_ago = datetime.utcnow() - timedelta(days=7)
-
-    recent_enroll_result = await db.execute(
-        select(func.count())
-        .select_from(Enrollment)
-        .where(
-            Enrollment.course_id == course_id,
-            Enrollment.enrolled_at >= week_ago
-        )
-    )
-    recent_enrollments = recent_enroll_result.scalar() or 0
-
-
-    completed_result = await db.execute(
-        select(func.count())
-        .select_from(Enrollment)
-        .where(
-            Enrollment.course_id == course_id,
-            Enrollment.progress_percent >= 100
-        )
-    )
-    completed_students = completed_result.scalar() or 0
-
-    completion_rate = (
-        (completed_students / total_enrollments) * 100
-        if total_enrollments > 0 else 0
-    )
-    completion_rate = round(completion_rate, 2)
-
-    active_student_rate = (
-        (active_students / total_enrollments) * 100
-        if total_enrollments > 0 else 0
-    )
-    active_student_rate = round(active_student_rate, 2)
+    stats = await course_stats_service.get(db, course_id)
 
     return {
         "course": course_info,
         "statistics": {
-            "total_enrollments": total_enrollments,
-            "active_students": active_students,
-            "total_subjects": len(subjects),
-            "total_classes": total_classes,
-            "total_tests": total_tests,
-            "average_rating": avg_rating,
-            "total_feedback": total_feedback,
-            "recent_enrollments_7d": recent_enrollments,
-            "completion_rate": completion_rate
+            "total_enrollments": stats.total_enrollments,
+            "active_students": stats.active_students,
+            "total_subjects": stats.total_subjects,
+            "total_classes": stats.total_classes,
+            "total_tests": stats.total_tests,
+            "average_rating": stats.average_rating,
+            "total_feedback": stats.rating_count,
+            "recent_enrollments_7d": stats.recent_enrollments_7d,
+            "completion_rate": stats.completion_rate
         },
-        "subjects": subjects,
+        "subjects": [
+            {
+                "subject_id": subject["subject_id"],
+                "title": subject["title"],
+                "total_classes": subject["total_classes"],
+            }
+            for subject in stats.subjects or []
+        ],
         "engagement": {
-            "active_student_rate": active_student_rate
+            "active_student_rate": stats.active_student_rate
         }
     }
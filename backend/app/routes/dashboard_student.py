@@ -1,10 +1,13 @@
-from typing import Any
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.models.user import User
+from app.core.profiling import statement_budget
+from app.services.activity_service import activity_service, window as activity_window
 from app.services.student_analytics_service import student_analytics_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -12,7 +15,7 @@ router = APIRouter()
 @router.get("/overview")
 async def get_student_dashboard(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get student's personal dashboard with learning overview.
@@ -27,11 +30,28 @@ async def get_student_dashboard(
     return dashboard_data
 
 
+@router.get("/activity")
+@statement_budget(2)
+async def get_my_activity_trend(
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    My activity time series (hourly or daily). Defaults to the last 30 days of all metrics.
+    """
+    start, end, metrics = activity_window(granularity, start, end, metrics)
+    return await activity_service.series(db, "user", [current_user.id], start, end, granularity, metrics)
+
+
 @router.get("/course/{course_id}/progress")
 async def get_my_course_progress(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get detailed progress for a specific course with visualization data.
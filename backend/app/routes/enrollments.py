@@ -12,10 +12,13 @@ from app.models.course import Course
 from app.models.user import User
 from app.schemas.enrollment import EnrollmentCreate, EnrollmentResponse
 from app.schemas.enrollment import EnrollmentCreate, EnrollmentResponse
+from app.services.activity_service import activity_service, RESOURCE_COMPLETION
 from app.services.progress_service import progress_service
+from app.services.course_stats_service import course_stats_service
 from app.models.resource import Resource
 from app.models.resource_completion import ResourceCompletion
 from app.models.subject import Subject
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -25,7 +28,7 @@ async def enroll_course(
     *,
     db: AsyncSession = Depends(deps.get_db),
     enrollment_in: EnrollmentCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Enroll current user in a course.
@@ -56,6 +59,7 @@ async def enroll_course(
     db.add(enrollment)
     await db.commit()
     await db.refresh(enrollment)
+    await course_stats_service.mark_dirty(course_id=enrollment.course_id)
     
     # Reload to get course relationship if needed, or just return basic
     # For now, we return basic, but schema expects course. 
@@ -73,7 +77,7 @@ async def enroll_course(
 @router.get("/me", response_model=List[EnrollmentResponse])
 async def read_my_enrollments(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get current user's enrollments.
@@ -90,7 +94,7 @@ async def read_my_enrollments(
 async def get_course_progress(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get detailed progress for a course.
@@ -103,7 +107,7 @@ async def get_course_progress(
 async def get_course_enrollments(
     course_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get all enrollments for a specific course (admin/instructor only).
@@ -129,7 +133,7 @@ async def get_course_enrollments(
 async def complete_resource(
     resource_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Mark a resource as complete.
@@ -158,6 +162,8 @@ async def complete_resource(
     )
     db.add(completion)
     await db.commit()
+    await course_stats_service.mark_dirty(subject_id=resource.subject_id)
+    await activity_service.record(RESOURCE_COMPLETION, current_user.id, subject_id=resource.subject_id)
     
     # Update course progress
     result = await db.execute(select(Subject).where(Subject.id == resource.subject_id))
@@ -173,7 +179,7 @@ async def complete_resource(
 async def delete_enrollment(
     enrollment_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Unenroll from a course.
@@ -189,4 +195,5 @@ async def delete_enrollment(
         
     await db.delete(enrollment)
     await db.commit()
+    await course_stats_service.mark_dirty(course_id=enrollment.course_id)
     return {"message": "Unenrolled successfully"}
@@ -1,6 +1,6 @@
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -9,6 +9,7 @@ from app.api import deps
 from app.models.feedback import AppFeedback, CourseFeedback, InstructorFeedback
 from app.models.user import User
 from app.models.course import Course
+from app.models.enums import RoleEnum
 from app.schemas.feedback import (
     AppFeedbackCreate, 
     CourseFeedbackCreate, 
@@ -18,6 +19,10 @@ from app.schemas.feedback import (
     InstructorFeedbackResponse,
     FeedbackResponse
 )
+from app.services.course_stats_service import course_stats_service
+from app.services.feedback_analytics_service import feedback_analytics_service
+from app.services.rating_summary_service import rating_summary_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -39,6 +44,7 @@ async def create_app_feedback(
     db.add(feedback)
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate("app")
     return feedback
 
 
@@ -62,8 +68,11 @@ async def create_course_feedback(
         user_id=current_user.id
     )
     db.add(feedback)
+    await rating_summary_service.record_course_rating(db, feedback.course_id, new_rating=feedback.rating)
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate(f"course:{feedback.course_id}")
+    await course_stats_service.mark_dirty(course_id=feedback.course_id)
     return feedback
 
 
@@ -88,8 +97,10 @@ async def create_instructor_feedback(
         user_id=current_user.id
     )
     db.add(feedback)
+    await rating_summary_service.record_instructor_rating(db, feedback.instructor_id, new_rating=feedback.rating)
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate(f"instructor:{feedback.instructor_id}")
     return feedback
 
 
@@ -119,6 +130,7 @@ async def update_app_feedback(
     feedback.category = feedback_in.category
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate("app")
     return feedback
 
 
@@ -142,10 +154,15 @@ async def update_course_feedback(
     if feedback.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this feedback")
     
+    await rating_summary_service.record_course_rating(
+        db, feedback.course_id, old_rating=feedback.rating, new_rating=feedback_in.rating
+    )
     feedback.rating = feedback_in.rating
     feedback.review_text = feedback_in.review_text
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate(f"course:{feedback.course_id}")
+    await course_stats_service.mark_dirty(course_id=feedback.course_id)
     return feedback
 
 
@@ -169,10 +186,14 @@ async def update_instructor_feedback(
     if feedback.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this feedback")
     
+    await rating_summary_service.record_instructor_rating(
+        db, feedback.instructor_id, old_rating=feedback.rating, new_rating=feedback_in.rating
+    )
     feedback.rating = feedback_in.rating
     feedback.comments = feedback_in.comments
     await db.commit()
     await db.refresh(feedback)
+    await feedback_analytics_service.invalidate(f"instructor:{feedback.instructor_id}")
     return feedback
 
 
@@ -181,7 +202,7 @@ async def delete_app_feedback(
     *,
     db: AsyncSession = Depends(deps.get_db),
     feedback_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Delete app feedback. Only the user who created it or admin can delete.
@@ -198,6 +219,7 @@ async def delete_app_feedback(
     
     await db.delete(feedback)
     await db.commit()
+    await feedback_analytics_service.invalidate("app")
     return {"message": "Feedback deleted successfully"}
 
 
@@ -206,7 +228,7 @@ async def delete_course_feedback(
     *,
     db: AsyncSession = Depends(deps.get_db),
     feedback_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Delete course feedback. Only the user who created it or admin can delete.
@@ -220,8 +242,11 @@ async def delete_course_feedback(
     if feedback.user_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete this feedback")
     
+    await rating_summary_service.record_course_rating(db, feedback.course_id, old_rating=feedback.rating)
     await db.delete(feedback)
     await db.commit()
+    await feedback_analytics_service.invalidate(f"course:{feedback.course_id}")
+    await course_stats_service.mark_dirty(course_id=feedback.course_id)
     return {"message": "Feedback deleted successfully"}
 
 
@@ -230,7 +255,7 @@ async def delete_instructor_feedback(
     *,
     db: AsyncSession = Depends(deps.get_db),
     feedback_id: int,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Delete instructor feedback. Only the user who created it or admin can delete.
@@ -244,8 +269,10 @@ async def delete_instructor_feedback(
     if feedback.user_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete this feedback")
     
+    await rating_summary_service.record_instructor_rating(db, feedback.instructor_id, old_rating=feedback.rating)
     await db.delete(feedback)
     await db.commit()
+    await feedback_analytics_service.invalidate(f"instructor:{feedback.instructor_id}")
     return {"message": "Feedback deleted successfully"}
 
 
@@ -254,7 +281,7 @@ async def read_app_feedbacks(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Get all app feedbacks with detailed user information. Admin only.
@@ -294,51 +321,44 @@ async def read_my_feedback(
 @router.get("/app/analysis")
 async def read_app_feedback_analysis(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_superuser),
+    days: int = Query(30, ge=1, le=365),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
-    Get app feedback analysis (stats, sentiment, distribution).
+    Get app feedback analysis (stats, sentiment, distribution, trend).
     """
-    # Fetch all app feedbacks
-    result = await db.execute(select(AppFeedback))
-    feedbacks = result.scalars().all()
-    
-    total = len(feedbacks)
-    if total == 0:
-        return {
-            "total_reviews": 0,
-            "average_rating": 0,
-            "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-            "sentiment_analysis": {"positive": 0, "neutral": 0, "negative": 0}
-        }
-        
-    avg_rating = sum(f.rating for f in feedbacks) / total
-    
-    # Distribution
-    dist = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    for f in feedbacks:
-        if f.rating in dist:
-            dist[f.rating] += 1
-            
-    # Simple rule-based sentiment (mocking LLM for now)
-    # 4-5 stars: Positive
-    # 3 stars: Neutral
-    # 1-2 stars: Negative
-    sentiment = {"positive": 0, "neutral": 0, "negative": 0}
-    for f in feedbacks:
-        if f.rating >= 4:
-            sentiment["positive"] += 1
-        elif f.rating == 3:
-            sentiment["neutral"] += 1
-        else:
-            sentiment["negative"] += 1
-            
-    return {
-        "total_reviews": total,
-        "average_rating": round(avg_rating, 1),
-        "rating_distribution": dist,
-        "sentiment_analysis": sentiment
-    }
+    return await feedback_analytics_service.app_analysis(db, days=days)
+
+
+@router.get("/course/{course_id}/analysis")
+async def read_course_feedback_analysis(
+    course_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    days: int = Query(30, ge=1, le=365),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Get rating analysis and trend for a course.
+    """
+    result = await db.execute(select(Course.id).where(Course.id == course_id))
+    if not result.scalars().first():
+        raise HTTPException(status_code=404, detail="Course not found")
+    return await feedback_analytics_service.course_analysis(db, course_id, days=days)
+
+
+@router.get("/instructor/{instructor_id}/analysis")
+async def read_instructor_feedback_analysis(
+    instructor_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    days: int = Query(30, ge=1, le=365),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
+) -> Any:
+    """
+    Get rating analysis and trend for an instructor. The instructor themself or admin only.
+    """
+    if current_user.role != RoleEnum.admin and current_user.id != instructor_id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return await feedback_analytics_service.instructor_analysis(db, instructor_id, days=days)
 
 
 @router.get("/instructor", response_model=List[FeedbackResponse])
@@ -346,7 +366,7 @@ async def read_instructor_feedbacks(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get feedbacks for the current instructor.
@@ -367,7 +387,7 @@ async def read_course_feedbacks(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get feedbacks for a specific course.
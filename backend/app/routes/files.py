@@ -0,0 +1,86 @@
+import mimetypes
+import os
+import time
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.blob_store import blob_store
+from app.services.file_delivery_service import file_delivery_service
+
+router = APIRouter()
+
+# Only types browsers display without running script are served inline; anything else
+# (HTML, SVG, XML, ...) is a download, so an uploaded file cannot script the API origin.
+INLINE_PREFIXES = ("image/", "video/", "audio/")
+INLINE_TYPES = {"application/pdf"}
+SCRIPTABLE_TYPES = {"image/svg+xml"}
+
+
+def _disposition_type(media_type: str) -> str:
+    if media_type in SCRIPTABLE_TYPES:
+        return "attachment"
+    if media_type in INLINE_TYPES or media_type.startswith(INLINE_PREFIXES):
+        return "inline"
+    return "attachment"
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+async def serve_file(key: str, exp: int, sig: str, request: Request) -> Any:
+    """
+    Serve a blob through a signed URL (see `file_delivery_service.sign`).
+    Content-addressed files never change, so the ETag is the hashed file name and the
+    response is cacheable until the URL expires. Range requests are supported for
+    video seeking; with FILE_DELIVERY_ACCEL_PREFIX set the bytes are sent by nginx.
+    """
+    sha256 = file_delivery_service.parse_key(key)
+    if sha256 is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not file_delivery_service.verify(key, exp, sig):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+
+    # Renditions share the original's hash, so the file name (hash plus suffix) is the tag.
+    filename = key.rsplit("/", 1)[-1]
+    etag = f'"{filename}"'
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    disposition = f'{_disposition_type(media_type)}; filename="{filename}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max(exp - int(time.time()), 0)}, immutable",
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    backend = blob_store.backend
+    if not hasattr(backend, "path"):
+        # Object storage serves the bytes (and ranges) itself.
+        return RedirectResponse(
+            backend.presigned_url(key, max(exp - int(time.time()), 1), disposition),
+            status_code=302,
+            headers=headers,
+        )
+
+    path = backend.path(key)
+    if not await run_in_threadpool(os.path.isfile, path):
+        raise HTTPException(status_code=404, detail="File not found")
+    headers["Content-Disposition"] = disposition
+
+    if settings.FILE_DELIVERY_ACCEL_PREFIX:
+        # Zero-copy: nginx serves the internal location with sendfile and handles Range.
+        headers["X-Accel-Redirect"] = settings.FILE_DELIVERY_ACCEL_PREFIX.rstrip("/") + "/" + key
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    return FileResponse(path, media_type=media_type, headers=headers, method=request.method)
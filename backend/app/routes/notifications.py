@@ -6,8 +6,8 @@ from sqlalchemy import select, desc, update
 
 from app.api import deps
 from app.models.notification import Notification
-from app.models.user import User
 from app.schemas.notification import NotificationResponse
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -17,7 +17,7 @@ async def read_notifications(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 50,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get current user's notifications.
@@ -32,7 +32,7 @@ async def read_notifications(
 async def mark_as_read(
     notification_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Mark a notification as read.
@@ -52,7 +52,7 @@ async def mark_as_read(
 @router.put("/read-all")
 async def mark_all_as_read(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Mark all notifications as read.
@@ -1,14 +1,23 @@
-from typing import Any, List
+from typing import Any, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
-from app.models.community import CommunityPost, CommunityComment, Community, CommunityReaction
+from app.models.community import CommunityPost, CommunityComment, Community, CommunitySubscription
+from app.models.enums import FeedSortEnum, ReactionTypeEnum
 from app.models.user import User
-from app.schemas.community import PostCreate, PostResponse, CommentCreate, CommentResponse
+from app.core.config import settings
+from app.schemas.community import PostCreate, PostResponse, CommentCreate, CommentResponse, CommentThreadResponse, ReactionStateResponse
+from app.services.search_service import search_service
+from app.services.feed_service import feed_service
+from app.services.view_counter_service import view_counter_service
+from app.services.community_service import community_service
+from app.services.comment_thread_service import comment_thread_service
+from app.services.reaction_service import reaction_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -35,20 +44,60 @@ async def create_post(
         user_id=current_user.id
     )
     db.add(post)
+    await db.flush()
     
     # Update community post count
-    community.post_count += 1
-    db.add(community)
+    await community_service.adjust_counter(db, Community, community.id, "post_count", 1)
     
+    await search_service.index_post(db, post, community)
     await db.commit()
     await db.refresh(post)
+    await feed_service.update_post(post)
     return post
 
 
+@router.get("/feed/home", response_model=List[PostResponse])
+async def read_home_feed(
+    db: AsyncSession = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = 50,
+    sort: FeedSortEnum = FeedSortEnum.hot,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Posts from every community the current user is subscribed to.
+    """
+    result = await db.execute(
+        select(CommunitySubscription.community_id).where(CommunitySubscription.user_id == current_user.id)
+    )
+    community_ids = result.scalars().all()
+
+    post_ids = await feed_service.home_post_ids(db, current_user.id, community_ids, sort, skip, limit)
+    if post_ids is not None:
+        return await feed_service.fetch_posts(db, post_ids)
+
+    if not community_ids:
+        return []
+    query = (
+        select(CommunityPost)
+        .options(selectinload(CommunityPost.user))
+        .where(
+            CommunityPost.community_id.in_(community_ids),
+            CommunityPost.is_deleted == False
+        )
+        .order_by(*feed_service.fallback_order(sort))
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
 @router.get("/{post_id}", response_model=PostResponse)
 async def read_post(
     post_id: int,
     db: AsyncSession = Depends(deps.get_db),
+    viewer_id: str = Depends(deps.get_viewer_id),
 ) -> Any:
     """
     Get post details.
@@ -60,12 +109,11 @@ async def read_post(
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
         
-    # Increment view count (simple implementation, not unique views)
-    post.view_count += 1
-    db.add(post)
-    await db.commit()
-    
-    return post
+    # Views are buffered in Redis and flushed in batches; add the unflushed ones to the response.
+    pending_views = await view_counter_service.record_view(db, post.id, viewer_id)
+    response = PostResponse.model_validate(post)
+    response.view_count += pending_views
+    return response
 
 
 @router.post("/{post_id}/comments", response_model=CommentResponse)
@@ -84,6 +132,16 @@ async def create_comment(
     post = result.scalars().first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+
+    parent = None
+    if comment_in.parent_comment_id is not None:
+        parent = await db.get(CommunityComment, comment_in.parent_comment_id)
+        if not parent or parent.post_id != post_id:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+        if parent.path is None:
+            raise HTTPException(status_code=409, detail="Thread is still being indexed, try again shortly")
+        if parent.depth + 1 > settings.COMMENT_THREAD_MAX_DEPTH:
+            raise HTTPException(status_code=400, detail="Thread is too deeply nested")
         
     comment = CommunityComment(
         **comment_in.model_dump(),
@@ -91,77 +149,128 @@ async def create_comment(
         user_id=current_user.id
     )
     db.add(comment)
+    await db.flush()
+    comment_thread_service.assign_path(comment, parent)
     
     # Update post comment count
-    post.comment_count += 1
-    db.add(post)
+    await community_service.adjust_counter(db, CommunityPost, post_id, "comment_count", 1)
     
     await db.commit()
     await db.refresh(comment)
+    await feed_service.update_post(post)
     return comment
 
 
-@router.get("/{post_id}/comments", response_model=List[CommentResponse])
+@router.get("/{post_id}/comments", response_model=List[CommentThreadResponse])
 async def read_comments(
     post_id: int,
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 50,
+    max_depth: int = Query(settings.COMMENT_THREAD_DEFAULT_DEPTH, ge=0, le=settings.COMMENT_THREAD_MAX_DEPTH),
 ) -> Any:
     """
-    Get comments for a post.
+    Get a page of top-level comments for a post, each with its replies nested
+    up to `max_depth` levels. Deeper branches are flagged with `has_more_replies`
+    and can be fetched through the comment's thread endpoint.
     """
-    query = select(CommunityComment).options(selectinload(CommunityComment.user)).where(
-        CommunityComment.post_id == post_id,
-        CommunityComment.parent_comment_id == None  # Top level comments only for now
-    ).order_by(desc(CommunityComment.created_at))
-    
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await comment_thread_service.load_post_threads(db, post_id, skip, limit, max_depth)
+
+
+@router.get("/comments/{comment_id}/thread", response_model=CommentThreadResponse)
+async def read_comment_thread(
+    comment_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    max_depth: int = Query(settings.COMMENT_THREAD_DEFAULT_DEPTH, ge=0, le=settings.COMMENT_THREAD_MAX_DEPTH),
+) -> Any:
+    """
+    Get a comment with its replies nested up to `max_depth` levels below it.
+    """
+    result = await db.execute(
+        select(CommunityComment)
+        .options(selectinload(CommunityComment.user))
+        .where(CommunityComment.id == comment_id)
+    )
+    comment = result.scalars().first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return await comment_thread_service.load_subtree(db, comment, max_depth)
+
+
+@router.get("/reactions/me", response_model=Dict[int, List[str]])
+async def read_my_reactions(
+    post_ids: List[int] = Query(..., max_length=200),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    The current user's reactions on a page of posts (`?post_ids=1&post_ids=2`), in one lookup.
+    """
+    return await reaction_service.user_reactions(db, current_user.id, post_ids)
 
 
 @router.post("/{post_id}/like")
 async def like_post(
     post_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Toggle like on a post.
     """
-    # Check existing reaction
-    result = await db.execute(
-        select(CommunityReaction).where(
-            CommunityReaction.post_id == post_id,
-            CommunityReaction.user_id == current_user.id,
-            CommunityReaction.reaction_type == "like"
-        )
+    post = await db.get(CommunityPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    liked = await reaction_service.toggle(db, post_id, current_user.id, ReactionTypeEnum.like.value)
+    await db.commit()
+    await db.refresh(post)
+    await feed_service.update_post(post)
+    return {"message": "Liked" if liked else "Unliked", "like_count": post.like_count}
+
+
+@router.put("/{post_id}/reactions/{reaction_type}", response_model=ReactionStateResponse)
+async def add_reaction(
+    post_id: int,
+    reaction_type: ReactionTypeEnum,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Add a reaction to a post. Repeating the request is a no-op.
+    Liking removes an existing dislike and vice versa.
+    """
+    post = await db.get(CommunityPost, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    await reaction_service.add(db, post_id, current_user.id, reaction_type.value)
+    await db.commit()
+    await db.refresh(post)
+    await feed_service.update_post(post)
+    return ReactionStateResponse(
+        post_id=post_id, reaction_type=reaction_type.value, active=True, reaction_counts=post.reaction_counts
     )
-    reaction = result.scalars().first()
-    
-    result_post = await db.execute(select(CommunityPost).where(CommunityPost.id == post_id))
-    post = result_post.scalars().first()
+
+
+@router.delete("/{post_id}/reactions/{reaction_type}", response_model=ReactionStateResponse)
+async def remove_reaction(
+    post_id: int,
+    reaction_type: ReactionTypeEnum,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Remove a reaction from a post. Removing a reaction the user does not have is a no-op.
+    """
+    post = await db.get(CommunityPost, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    if reaction:
-        # Unlike
-        db.delete(reaction)
-        if post.like_count > 0:
-            post.like_count -= 1
-        message = "Unliked"
-    else:
-        # Like
-        new_reaction = CommunityReaction(
-            post_id=post_id,
-            user_id=current_user.id,
-            reaction_type="like"
-        )
-        db.add(new_reaction)
-        post.like_count += 1
-        message = "Liked"
-        
-    db.add(post)
+    await reaction_service.remove(db, post_id, current_user.id, reaction_type.value)
     await db.commit()
-    return {"message": message, "like_count": post.like_count}
+    await db.refresh(post)
+    await feed_service.update_post(post)
+    return ReactionStateResponse(
+        post_id=post_id, reaction_type=reaction_type.value, active=False, reaction_counts=post.reaction_counts
+    )
@@ -8,9 +8,10 @@ from sqlalchemy.orm import selectinload
 from app.api import deps
 from app.models.qa import QAQuestion, QAAnswer
 from app.models.subject import Subject
-from app.models.user import User
 from app.schemas.qa import QuestionCreate, QuestionResponse, AnswerCreate, AnswerResponse
 from app.models.enums import RoleEnum
+from app.services.search_service import search_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -20,7 +21,7 @@ async def ask_question(
     *,
     db: AsyncSession = Depends(deps.get_db),
     question_in: QuestionCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Ask a question in a subject.
@@ -36,6 +37,8 @@ async def ask_question(
         user_id=current_user.id
     )
     db.add(question)
+    await db.flush()
+    await search_service.index_question(db, question, subject.course_id)
     await db.commit()
     await db.refresh(question)
 
@@ -100,7 +103,7 @@ async def answer_question(
     *,
     db: AsyncSession = Depends(deps.get_db),
     answer_in: AnswerCreate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Answer a question.
@@ -6,11 +6,16 @@ from sqlalchemy import select, desc
 
 from app.api import deps
 from app.models.resource import Resource
+from app.models.blob import Blob
 from app.models.course import Course
 from app.models.subject import Subject
-from app.models.user import User
-from app.schemas.resource import ResourceCreate, ResourceResponse, ResourceUpdate
+from app.schemas.resource import ResourceCreate, ResourceResponse, ResourceUpdate, ResourceDownloadResponse
 from app.models.enums import RoleEnum
+from app.services.blob_store import blob_store
+from app.services.course_stats_service import course_stats_service
+from app.services.file_delivery_service import file_delivery_service
+from app.services.media_service import media_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -20,7 +25,7 @@ async def create_resource(
     *,
     db: AsyncSession = Depends(deps.get_db),
     resource_in: ResourceCreate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Create a new resource. Instructor only.
@@ -39,9 +44,22 @@ async def create_resource(
             raise HTTPException(status_code=403, detail="Not enough permissions")
 
     resource = Resource(**resource_in.model_dump())
+    if resource.blob_sha256 is None:
+        blob = await blob_store.resolve_url(db, resource.file_url)
+        resource.blob_sha256 = blob.sha256 if blob else None
+    else:
+        blob = await db.get(Blob, resource.blob_sha256)
+        if not blob:
+            raise HTTPException(status_code=404, detail="Blob not found")
+    if resource.blob_sha256:
+        # Keep the stable reference, not the expiring upload URL; responses are signed afresh.
+        resource.file_url = blob_store.reference(blob)
+        await blob_store.acquire(db, resource.blob_sha256)
+        media_service.apply_to_resource(resource, blob)
     db.add(resource)
     await db.commit()
     await db.refresh(resource)
+    await course_stats_service.mark_dirty(subject_id=resource.subject_id)
     return resource
 
 
@@ -83,12 +101,35 @@ async def read_course_resources(
     return result.scalars().all()
 
 
+@router.get("/{resource_id}/download-url", response_model=ResourceDownloadResponse)
+async def read_resource_download_url(
+    resource_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Get a short-lived signed URL for a stored resource file. The URL supports
+    range requests and can be cached until it expires.
+    """
+    result = await db.execute(select(Resource).where(Resource.id == resource_id))
+    resource = result.scalars().first()
+    if not resource:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
+    blob = await db.get(Blob, resource.blob_sha256) if resource.blob_sha256 else None
+    if not blob:
+        raise HTTPException(status_code=404, detail="Resource has no stored file")
+
+    url, expires_at = file_delivery_service.sign(blob.storage_key)
+    return ResourceDownloadResponse(url=url, expires_at=expires_at)
+
+
 @router.delete("/{resource_id}")
 async def delete_resource(
     *,
     db: AsyncSession = Depends(deps.get_db),
     resource_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Delete a resource.
@@ -109,6 +150,9 @@ async def delete_resource(
             if current_user.role != RoleEnum.admin and course.created_by != current_user.id:
                 raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    if resource.blob_sha256:
+        await blob_store.release(db, resource.blob_sha256)
     await db.delete(resource)
     await db.commit()
+    await course_stats_service.mark_dirty(subject_id=resource.subject_id)
     return {"message": "Resource deleted"}
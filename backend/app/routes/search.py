@@ -0,0 +1,56 @@
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.schemas.search import SearchHit, SearchResults, ReindexResponse
+from app.services.search_service import search_service, ENTITY_TYPES
+from app.services.token_service import Principal
+
+router = APIRouter()
+
+SNIPPET_LENGTH = 200
+
+
+@router.get("/", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[List[str]] = Query(None, description="Restrict to course, subject, community, post, question"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    Ranked search across published courses, subjects, public communities, posts and Q&A.
+    Public endpoint.
+    """
+    if types:
+        unknown = set(types) - set(ENTITY_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+
+    total, hits = await search_service.search(db, q, types, skip=skip, limit=limit)
+    items = []
+    for document, score in hits:
+        body = document.body or ""
+        items.append(SearchHit(
+            entity_type=document.entity_type,
+            entity_id=document.entity_id,
+            title=document.title,
+            snippet=body[:SNIPPET_LENGTH] + ("..." if len(body) > SNIPPET_LENGTH else ""),
+            score=score,
+        ))
+    return SearchResults(query=q, total=total, items=items)
+
+
+@router.post("/reindex", response_model=ReindexResponse)
+async def reindex(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
+) -> Any:
+    """
+    Rebuild the search index from scratch. Admin only.
+    """
+    indexed = await search_service.reindex(db)
+    return ReindexResponse(indexed=indexed)
@@ -8,9 +8,12 @@ from sqlalchemy.orm import selectinload
 from app.api import deps
 from app.models.subject import Subject
 from app.models.course import Course
-from app.models.user import User
 from app.schemas.subject import SubjectCreate, SubjectResponse, SubjectUpdate
+from app.models.qa import QAQuestion
 from app.models.enums import RoleEnum
+from app.services.course_stats_service import course_stats_service
+from app.services.search_service import search_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -20,7 +23,7 @@ async def create_subject(
     *,
     db: AsyncSession = Depends(deps.get_db),
     subject_in: SubjectCreate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Create a new subject in a course.
@@ -37,15 +40,18 @@ async def create_subject(
 
     subject = Subject(**subject_in.model_dump())
     db.add(subject)
+    await db.flush()
+    await search_service.index_subject(db, subject, course.is_published)
     await db.commit()
     await db.refresh(subject)
+    await course_stats_service.mark_dirty(course_id=subject.course_id)
     return subject
 
 
 @router.get("/instructor/my-subjects", response_model=List[SubjectResponse])
 async def get_my_subjects(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get all subjects from courses created by the current instructor.
@@ -87,7 +93,7 @@ async def update_subject(
     db: AsyncSession = Depends(deps.get_db),
     subject_id: int,
     subject_in: SubjectUpdate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Update a subject.
@@ -109,8 +115,10 @@ async def update_subject(
         setattr(subject, field, value)
 
     db.add(subject)
+    await search_service.index_subject(db, subject, course.is_published)
     await db.commit()
     await db.refresh(subject)
+    await course_stats_service.mark_dirty(course_id=subject.course_id)
     return subject
 
 
@@ -119,7 +127,7 @@ async def delete_subject(
     *,
     db: AsyncSession = Depends(deps.get_db),
     subject_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Delete a subject.
@@ -136,6 +144,12 @@ async def delete_subject(
     if current_user.role != RoleEnum.admin and course.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    question_ids = (await db.execute(
+        select(QAQuestion.id).where(QAQuestion.subject_id == subject.id)
+    )).scalars().all()
+    await search_service.remove(db, "question", question_ids)
+    await search_service.remove(db, "subject", [subject.id])
     await db.delete(subject)
     await db.commit()
+    await course_stats_service.mark_dirty(course_id=subject.course_id)
     return {"message": "Subject deleted"}
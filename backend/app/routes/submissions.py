@@ -3,13 +3,19 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
+from app.core import metrics
+from app.core.redis import redis_manager
 from app.models.submission import Submission
-from app.models.test import Test, TestQuestion
+from app.models.test import Test
 from app.models.user import User
-from app.schemas.submission import SubmissionCreate, SubmissionResponse
+from app.schemas.submission import SubmissionCreate, SubmissionResponse, SubmissionReceipt
+from app.services.activity_service import activity_service, SUBMISSION
+from app.services.submission_service import submission_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -32,36 +38,10 @@ async def submit_test(
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
         
-    # 2. Check if already submitted
-    result_sub = await db.execute(
-        select(Submission).where(
-            Submission.test_id == submission_in.test_id,
-            Submission.user_id == current_user.id
-        )
-    )
-    if result_sub.scalars().first():
-        raise HTTPException(status_code=400, detail="Already submitted")
-        
-    # 3. Evaluate
-    obtained_marks = 0.0
-    evaluation = {}
-    
-    for question in test.questions:
-        q_id_str = str(question.id)
-        user_answer = submission_in.answers.get(q_id_str)
-        
-        is_correct = False
-        if question.question_type == "mcq" and user_answer:
-            if str(user_answer).lower().strip() == str(question.correct_answer).lower().strip():
-                is_correct = True
-                obtained_marks += question.marks
-        
-        evaluation[q_id_str] = {
-            "is_correct": is_correct,
-            "marks": question.marks if is_correct else 0
-        }
-        
-    # 4. Save Submission
+    # 2. Evaluate
+    evaluation, obtained_marks = submission_service.grade(test, submission_in.answers)
+
+    # 3. Save Submission (the unique constraint on (test_id, user_id) rejects duplicates)
     submission = Submission(
         test_id=submission_in.test_id,
         user_id=current_user.id,
@@ -70,11 +50,54 @@ async def submit_test(
         obtained_marks=obtained_marks
     )
     db.add(submission)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Already submitted")
     await db.refresh(submission)
+    metrics.SUBMISSIONS_GRADED.labels("direct").inc()
+    await activity_service.record(
+        SUBMISSION, current_user.id, subject_id=test.subject_id, classroom_id=test.classroom_id
+    )
     return submission
 
 
+@router.post("/queue", response_model=SubmissionReceipt, status_code=202)
+async def queue_submission(
+    *,
+    submission_in: SubmissionCreate,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Queue a test submission for batched grading and return a receipt to poll.
+    Submitting the same test twice returns the original receipt.
+    """
+    if redis_manager.redis is None:
+        raise HTTPException(status_code=503, detail="Submission queue unavailable")
+
+    return await submission_service.enqueue(
+        submission_in.test_id, current_user.id, submission_in.answers
+    )
+
+
+@router.get("/receipts/{receipt_id}", response_model=SubmissionReceipt)
+async def read_submission_receipt(
+    receipt_id: str,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Poll the status of a queued submission.
+    """
+    if redis_manager.redis is None:
+        raise HTTPException(status_code=503, detail="Submission queue unavailable")
+
+    receipt = await submission_service.get_receipt(receipt_id)
+    if not receipt or receipt["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Receipt not found")
+    return receipt
+
+
 @router.get("/me", response_model=List[SubmissionResponse])
 async def read_my_submissions(
     db: AsyncSession = Depends(deps.get_db),
@@ -92,7 +115,7 @@ async def read_my_submissions(
 async def read_test_submissions(
     test_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Get all submissions for a specific test. Instructor only.
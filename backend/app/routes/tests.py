@@ -9,9 +9,10 @@ from app.api import deps
 from app.models.test import Test, TestQuestion
 from app.models.subject import Subject
 from app.models.classroom import Classroom
-from app.models.user import User
 from app.schemas.test import TestCreate, TestResponse, TestUpdate
 from app.models.enums import RoleEnum
+from app.services.course_stats_service import course_stats_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -21,7 +22,7 @@ async def create_test(
     *,
     db: AsyncSession = Depends(deps.get_db),
     test_in: TestCreate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Create a new test with questions. Instructor only.
@@ -53,6 +54,7 @@ async def create_test(
         db.add(question)
     
     await db.commit()
+    await course_stats_service.mark_dirty(subject_id=test.subject_id)
     
     # Reload with questions
     result = await db.execute(
@@ -65,7 +67,7 @@ async def create_test(
 async def read_test(
     test_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get test details.
@@ -85,7 +87,7 @@ async def read_course_tests(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Get tests for a specific course.
@@ -116,7 +118,7 @@ async def read_course_tests(
 @router.get("/instructor/my-tests", response_model=List[TestResponse])
 async def get_instructor_tests(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -161,7 +163,7 @@ async def get_instructor_tests(
 @router.get("/available/list", response_model=List[TestResponse])
 async def get_available_tests(
     db: AsyncSession = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
     skip: int = 0,
     limit: int = 50,
 ) -> Any:
@@ -213,7 +215,7 @@ async def update_test(
     db: AsyncSession = Depends(deps.get_db),
     test_id: int,
     test_in: TestUpdate,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
     """
     Update a test. Instructor only.
@@ -248,6 +250,7 @@ async def update_test(
             if not classroom or classroom.instructor_id != current_user.id:
                  raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    previous_subject_id = test.subject_id
     update_data = test_in.model_dump(exclude_unset=True)
 
     for field, value in update_data.items():
@@ -256,6 +259,9 @@ async def update_test(
     db.add(test)
     await db.commit()
     await db.refresh(test)
+    await course_stats_service.mark_dirty(subject_id=test.subject_id)
+    if previous_subject_id != test.subject_id:
+        await course_stats_service.mark_dirty(subject_id=previous_subject_id)
     return test
 
 
@@ -264,7 +270,7 @@ async def delete_test(
     *,
     db: AsyncSession = Depends(deps.get_db),
     test_id: int,
-    current_user: User = Depends(deps.get_current_instructor),
+    current_user: Principal = Depends(deps.get_current_instructor_principal),
 ) -> Any:
 
     """
@@ -299,4 +305,5 @@ async def delete_test(
 
     await db.delete(test)
     await db.commit()
+    await course_stats_service.mark_dirty(subject_id=test.subject_id)
     return {"message": "Test deleted successfully"}
@@ -1,27 +1,167 @@
-import shutil
-import os
-from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import Any
-from uuid import uuid4
+
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Header, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.redis import redis_manager
+from app.schemas.upload import UploadResponse, UploadSessionCreate, UploadSessionResponse
+from app.services.upload_service import upload_service, UploadOffsetMismatch, UploadSessionBusy, StoredUpload
+from app.services.blob_store import blob_store
+from app.services.media_service import media_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
-UPLOAD_DIR = "static/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.post("/", response_model=dict)
-async def upload_file(file: UploadFile = File(...)) -> Any:
+async def _store(db: AsyncSession, stored: StoredUpload, for_resource: bool) -> UploadResponse:
+    result = await blob_store.ingest(
+        db,
+        stored.path,
+        stored.sha256,
+        stored.size,
+        content_type=stored.content_type,
+        filename=stored.filename,
+        collectable=for_resource,
+    )
+    if not result.deduplicated:
+        await media_service.enqueue(result.blob)
+    return UploadResponse(
+        url=result.url,
+        sha256=result.blob.sha256,
+        size=result.blob.size,
+        content_type=result.blob.content_type,
+        deduplicated=result.deduplicated,
+    )
+
+
+@router.post("/", response_model=UploadResponse)
+async def upload_file(
+    file: UploadFile = File(...),
+    for_resource: bool = False,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """
+    Upload a file. The body is streamed to disk in chunks and rejected with 413
+    once it passes MAX_UPLOAD_SIZE_BYTES. Files are stored by content hash, so
+    uploading identical content again returns the existing URL.
+    Pass `for_resource=true` for course material: it is then garbage-collected
+    if no resource references it.
+    """
+    stored = await upload_service.save_upload(file)
+    return await _store(db, stored, for_resource)
+
+
+# --- Resumable uploads (tus-style: declare the length, then PATCH bytes at the current offset) ---
+
+def _require_redis():
+    if redis_manager.redis is None:
+        raise HTTPException(status_code=503, detail="Resumable uploads are unavailable")
+
+
+async def _get_own_session(session_id: str, current_user: Principal) -> dict:
+    _require_redis()
+    session = await upload_service.get_session(session_id)
+    if not session or session["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+def _offset_headers(response: Response, session: dict):
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Upload-Length"] = str(session["length"])
+    response.headers["Cache-Control"] = "no-store"
+
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    session_in: UploadSessionCreate,
+    response: Response,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
     """
-    Upload a file.
+    Start a resumable upload of `length` bytes (up to MAX_RESUMABLE_UPLOAD_SIZE_BYTES).
     """
+    _require_redis()
+    session = await upload_service.create_session(
+        current_user.id, session_in.length, session_in.filename, session_in.content_type,
+        for_resource=session_in.for_resource,
+    )
+    response.headers["Location"] = f"/upload/sessions/{session['id']}"
+    _offset_headers(response, session)
+    return session
+
+
+@router.head("/sessions/{session_id}")
+async def head_upload_session(
+    session_id: str,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Current offset in the Upload-Offset header, for resuming after a dropped connection.
+    """
+    session = await _get_own_session(session_id, current_user)
+    response = Response(status_code=status.HTTP_200_OK)
+    _offset_headers(response, session)
+    return response
+
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def read_upload_session(
+    session_id: str,
+    response: Response,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    session = await _get_own_session(session_id, current_user)
+    _offset_headers(response, session)
+    return session
+
+
+@router.patch("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def append_upload_session(
+    session_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Append the raw request body at `Upload-Offset`. The body is streamed straight to
+    disk; the upload is finalized once the declared length has been received.
+    """
+    session = await _get_own_session(session_id, current_user)
     try:
-        file_extension = os.path.splitext(file.filename)[1]
-        file_name = f"{uuid4()}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, file_name)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        return {"url": f"/static/uploads/{file_name}"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not upload file: {str(e)}")
+        session = await upload_service.append(session, upload_offset, request.stream())
+    except UploadOffsetMismatch as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.offset)},
+        )
+    except UploadSessionBusy:
+        raise HTTPException(status_code=status.HTTP_423_LOCKED, detail="Upload is already in progress")
+
+    _offset_headers(response, session)
+    if session["offset"] < session["length"]:
+        return session
+
+    stored = await upload_service.complete(session)
+    return UploadSessionResponse(
+        **session,
+        completed=True,
+        upload=await _store(db, stored, session["for_resource"]),
+    )
+
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_user: Principal = Depends(deps.get_current_principal),
+) -> Any:
+    """
+    Abort a resumable upload and discard the bytes received so far.
+    """
+    session = await _get_own_session(session_id, current_user)
+    await upload_service.abort(session)
+    return {"message": "Upload aborted"}
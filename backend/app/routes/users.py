@@ -8,6 +8,10 @@ from app.api import deps
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
 from app.models.enums import RoleEnum
+from app.services.file_delivery_service import file_delivery_service
+from app.services.media_service import media_service
+from app.services.token_service import token_service
+from app.services.token_service import Principal
 
 router = APIRouter()
 
@@ -42,12 +46,18 @@ async def update_user_me(
             )
             
     user_data = user_in.model_dump(exclude_unset=True)
+    ends_sessions = token_service.ends_sessions(current_user, user_data)
     for field, value in user_data.items():
         setattr(current_user, field, value)
+    await media_service.apply_to_user(db, current_user, user_data)
+    if ends_sessions:
+        token_service.bump_session_version(current_user)
 
     db.add(current_user)
     await db.commit()
     await db.refresh(current_user)
+    if ends_sessions:
+        await token_service.store_session_version(current_user.id, current_user.session_version)
     return current_user
 
 
@@ -57,7 +67,7 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     role: str | None = None,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Retrieve users. Admin only.
@@ -91,7 +101,7 @@ async def read_students(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_principal),
 ) -> Any:
     """
     Retrieve all students with enrollment statistics.
@@ -127,7 +137,7 @@ async def read_students(
             "id": user.id,
             "full_name": user.full_name,
             "email": user.email,
-            "photo": user.photo,
+            "photo": file_delivery_service.sign_url(user.photo),
             "enrolled_courses": enrolled_courses,
             "completed_courses": 0,  # TODO: Calculate from resource_completion
             "average_grade": 0,  # TODO: Calculate from submissions
@@ -159,7 +169,7 @@ async def read_instructor_public(
         
     from app.models.course import Course
     from app.models.enrollment import Enrollment
-    from app.models.feedback import InstructorFeedback
+    from app.services.rating_summary_service import rating_summary_service
     from sqlalchemy import func
     
     # Get stats
@@ -181,19 +191,17 @@ async def read_instructor_public(
         .where(User.id == instructor_id)
     )
     
-    # 3. Average Rating
-    rating_stats = await db.execute(
-        select(func.avg(InstructorFeedback.rating), func.count(InstructorFeedback.id))
-        .where(InstructorFeedback.instructor_id == instructor_id)
-    )
-    avg_rating, reviews_count = rating_stats.first() or (0, 0)
+    # 3. Average Rating (maintained summary, no scan of feedback rows)
+    summary = await rating_summary_service.get_instructor_summary(db, instructor_id)
+    avg_rating = summary.rating_average if summary else 0
+    reviews_count = summary.rating_count if summary else 0
     
     return {
         "id": instructor.id,
         "full_name": instructor.full_name,
         "email": instructor.email,
-        "photo": instructor.photo,
-        "banner_image": instructor.banner_image,
+        "photo": file_delivery_service.sign_url(instructor.photo),
+        "banner_image": file_delivery_service.sign_url(instructor.banner_image),
         "bio": instructor.bio,
         "experience": instructor.experience,
         "social_links": instructor.social_links,
@@ -213,7 +221,7 @@ async def update_user(
     db: AsyncSession = Depends(deps.get_db),
     user_id: int,
     user_in: UserUpdate,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Update a user. Admin only.
@@ -224,12 +232,18 @@ async def update_user(
         raise HTTPException(status_code=404, detail="User not found")
         
     user_data = user_in.model_dump(exclude_unset=True)
+    ends_sessions = token_service.ends_sessions(user, user_data)
     for field, value in user_data.items():
         setattr(user, field, value)
+    await media_service.apply_to_user(db, user, user_data)
+    if ends_sessions:
+        token_service.bump_session_version(user)
 
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    if ends_sessions:
+        await token_service.store_session_version(user.id, user.session_version)
     return user
 
 
@@ -238,7 +252,7 @@ async def delete_user(
     *,
     db: AsyncSession = Depends(deps.get_db),
     user_id: int,
-    current_user: User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_superuser_principal),
 ) -> Any:
     """
     Delete a user. Admin only.
@@ -254,4 +268,6 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+    # Outstanding tokens must not outlive the account on routes that skip the user lookup.
+    await token_service.store_session_version(user_id, user.session_version + 1)
     return {"message": "User deleted successfully"}
@@ -1,6 +1,7 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 from datetime import datetime
+from app.schemas.upload import FileUrl
 from app.schemas.user import UserResponse
 
 # --- Community Schemas ---
@@ -25,6 +26,8 @@ class CommunityUpdate(BaseModel):
 
 class CommunityResponse(CommunityBase):
     id: int
+    icon: FileUrl = None
+    banner: FileUrl = None
     created_by: Optional[int] = None
     created_at: Optional[datetime] = None
     member_count: int = 0
@@ -57,13 +60,22 @@ class PostResponse(PostBase):
     user_id: Optional[int] = None
     created_at: Optional[datetime] = None
     view_count: int = 0
+    unique_view_count: int = 0
     like_count: int = 0
+    dislike_count: int = 0
+    reaction_counts: Dict[str, int] = {}
     comment_count: int = 0
     user: Optional[UserResponse] = None
 
     class Config:
         from_attributes = True
 
+class ReactionStateResponse(BaseModel):
+    post_id: int
+    reaction_type: str
+    active: bool  # whether the current user now holds this reaction
+    reaction_counts: Dict[str, int]
+
 # --- Comment Schemas ---
 
 class CommentBase(BaseModel):
@@ -83,3 +95,8 @@ class CommentResponse(CommentBase):
 
     class Config:
         from_attributes = True
+
+class CommentThreadResponse(CommentResponse):
+    depth: int = 0
+    has_more_replies: bool = False  # replies exist below the requested max_depth
+    replies: List["CommentThreadResponse"] = []
@@ -2,6 +2,7 @@ from typing import Optional, List, Any
 from pydantic import BaseModel
 from datetime import datetime
 from app.models.enums import LevelEnum, CategoryEnum
+from app.schemas.upload import FileUrl
 
 
 class CourseBase(BaseModel):
@@ -32,10 +33,13 @@ class CourseUpdate(BaseModel):
 
 class CourseResponse(CourseBase):
     id: int
+    thumbnail: FileUrl = None
     created_by: int
     is_published: bool
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    average_rating: Optional[float] = None
+    rating_count: int = 0
 
     class Config:
         from_attributes = True
@@ -44,7 +48,7 @@ class CourseResponse(CourseBase):
 class InstructorSchema(BaseModel):
     id: int
     full_name: str
-    photo: Optional[str] = None
+    photo: FileUrl = None
     bio: Optional[str] = None
     
     class Config:
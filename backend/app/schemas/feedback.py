@@ -1,12 +1,12 @@
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
 class FeedbackBase(BaseModel):
     subject: str
     message: str
-    rating: Optional[int] = None
+    rating: Optional[int] = Field(None, ge=1, le=5)
     category: str = "general"
 
 
@@ -16,13 +16,13 @@ class AppFeedbackCreate(FeedbackBase):
 
 class CourseFeedbackCreate(BaseModel):
     course_id: int
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     review_text: Optional[str] = None
 
 
 class InstructorFeedbackCreate(BaseModel):
     instructor_id: int
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comments: Optional[str] = None
 
 
@@ -2,6 +2,7 @@ from typing import Optional, List
 from pydantic import BaseModel
 from datetime import datetime
 from app.models.enums import ResourceTypeEnum
+from app.schemas.upload import FileUrl
 
 
 class ResourceBase(BaseModel):
@@ -17,7 +18,7 @@ class ResourceBase(BaseModel):
 
 
 class ResourceCreate(ResourceBase):
-    pass
+    blob_sha256: Optional[str] = None  # defaults to the blob behind file_url, if any
 
 
 class ResourceUpdate(BaseModel):
@@ -31,8 +32,17 @@ class ResourceUpdate(BaseModel):
 
 class ResourceResponse(ResourceBase):
     id: int
+    file_url: FileUrl = None
+    blob_sha256: Optional[str] = None
+    thumbnail_url: FileUrl = None
+    page_count: Optional[int] = None
+    duration_seconds: Optional[float] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-
     class Config:
         from_attributes = True
+
+
+class ResourceDownloadResponse(BaseModel):
+    url: str  # signed /files URL
+    expires_at: datetime
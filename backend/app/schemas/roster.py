@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class RosterCourse(BaseModel):
+    course_id: int
+    course_title: str
+    progress_percent: float
+    enrolled_at: Optional[datetime] = None
+    last_accessed_at: Optional[datetime] = None
+
+
+class RosterStudent(BaseModel):
+    user_id: int
+    full_name: str
+    email: str
+    enrolled_courses: int
+    average_progress: float
+    last_active: Optional[datetime] = None
+    courses: List[RosterCourse]
+
+
+class StudentRoster(BaseModel):
+    total: int
+    items: List[RosterStudent]
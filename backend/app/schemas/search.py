@@ -0,0 +1,20 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    entity_type: str  # course, subject, community, post, question
+    entity_id: int
+    title: str
+    snippet: Optional[str] = None
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    items: List[SearchHit]
+
+
+class ReindexResponse(BaseModel):
+    indexed: int
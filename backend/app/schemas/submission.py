@@ -23,3 +23,14 @@ class SubmissionResponse(SubmissionBase):
 
     class Config:
         from_attributes = True
+
+
+class SubmissionReceipt(BaseModel):
+    receipt_id: str
+    status: str  # queued, graded, duplicate, rejected
+    test_id: int
+    submission_id: Optional[int] = None
+    obtained_marks: Optional[float] = None
+    detail: Optional[str] = None
+    queued_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
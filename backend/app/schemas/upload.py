@@ -0,0 +1,34 @@
+from typing import Annotated, Optional
+from pydantic import BaseModel, Field, PlainSerializer
+
+from app.services.file_delivery_service import file_delivery_service
+
+# A stored blob reference (or any other URL), sent to clients as a freshly signed /files URL.
+FileUrl = Annotated[Optional[str], PlainSerializer(file_delivery_service.sign_url, return_type=Optional[str])]
+
+
+class UploadResponse(BaseModel):
+    url: str  # signed and short-lived; store it as is, responses re-sign it
+    sha256: str  # content hash, computed while streaming; also the blob id
+    size: int
+    content_type: Optional[str] = None
+    deduplicated: bool = False  # identical content was already stored
+
+
+class UploadSessionCreate(BaseModel):
+    length: int = Field(gt=0)  # total size in bytes, declared up front
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    for_resource: bool = False  # unreferenced after the grace period means garbage-collected
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    length: int
+    offset: int  # bytes received so far; the next PATCH must start here
+    for_resource: bool = False
+    created_at: str
+    completed: bool = False
+    upload: Optional[UploadResponse] = None
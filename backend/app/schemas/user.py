@@ -1,6 +1,7 @@
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 from app.models.enums import RoleEnum
+from app.schemas.upload import FileUrl
 from datetime import datetime
 
 
@@ -49,8 +50,10 @@ class UserResponse(UserBase):
     id: int
     role: RoleEnum
     is_verified: bool
-    photo: Optional[str] = None
-    banner_image: Optional[str] = None
+    photo: FileUrl = None
+    banner_image: FileUrl = None
+    photo_thumbnail: FileUrl = None
+    banner_thumbnail: FileUrl = None
     bio: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -0,0 +1,421 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, update, func, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.core.redis import redis_manager
+from app.db.database import dialect_insert, get_engine, get_sessionmaker
+from app.models.activity import ActivityBucket
+from app.models.attendance import Attendance
+from app.models.classroom import Classroom
+from app.models.enrollment import Enrollment
+from app.models.resource import Resource
+from app.models.resource_completion import ResourceCompletion
+from app.models.subject import Subject
+from app.models.submission import Submission
+from app.models.test import Test
+
+logger = logging.getLogger("app.services.activity")
+
+ATTENDANCE = "attendance"
+SUBMISSION = "submission"
+RESOURCE_COMPLETION = "resource_completion"
+LOGIN = "login"
+METRICS = (ATTENDANCE, SUBMISSION, RESOURCE_COMPLETION, LOGIN)
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_WINDOWS = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+MAX_BUCKETS = 1000  # per chart request
+
+PENDING_KEY = "activity:pending"
+FLUSHING_KEY = "activity:flushing"
+FLUSH_LOCK_KEY = "activity:flush:lock"
+BACKFILL_LOCK_KEY = "activity:backfill:lock"
+PRUNE_LOCK_KEY = "activity:prune:lock"
+
+# (scope, scope_id, granularity, metric, bucket_start) -> count
+Increments = Dict[Tuple[str, int, str, str, datetime], int]
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour/day containing `moment`, as a naive datetime."""
+    moment = _naive_utc(moment).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == "day" else moment
+
+
+def window(
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    metrics: Optional[Sequence[str]] = None,
+) -> Tuple[datetime, datetime, Tuple[str, ...]]:
+    """Validate chart query parameters, filling in the default window and metrics."""
+    if granularity not in GRANULARITIES:
+        raise ValidationError(f"granularity must be one of {', '.join(GRANULARITIES)}", "granularity")
+    unknown = set(metrics or ()) - set(METRICS)
+    if unknown:
+        raise ValidationError(f"Unknown metrics: {', '.join(sorted(unknown))}", "metrics")
+    end = _naive_utc(end) if end else datetime.utcnow()
+    start = _naive_utc(start) if start else end - DEFAULT_WINDOWS[granularity]
+    if start > end:
+        raise ValidationError("start must not be after end", "start")
+    if (end - start) / GRANULARITIES[granularity] > MAX_BUCKETS:
+        raise ValidationError(f"Window too large; at most {MAX_BUCKETS} {granularity} buckets", "start")
+    return start, end, tuple(metrics or METRICS)
+
+
+class ActivityService:
+    """
+    Hourly and daily event counts per user, per course and platform-wide, for trend
+    charts. Recording an event is one HINCRBY on a Redis hash keyed by metric, user,
+    course reference and hour; a periodic flush resolves the references to courses and
+    adds the counts to `activity_buckets` with batched upserts, the same way post views
+    are buffered. Charts then read a handful of pre-aggregated rows for any window.
+    The flush also advances `enrollments.last_accessed_at`, which the instructor roster
+    sorts on.
+    """
+
+    def _field(self, metric: str, user_id: Optional[int], ref: str, at: datetime) -> str:
+        return f"{metric}|{user_id or 0}|{ref}|{truncate(at, 'hour').strftime('%Y%m%d%H')}"
+
+    async def record(
+        self,
+        metric: str,
+        user_id: Optional[int],
+        course_id: Optional[int] = None,
+        subject_id: Optional[int] = None,
+        classroom_id: Optional[int] = None,
+        at: Optional[datetime] = None,
+    ):
+        """
+        Count one event. The course may be given directly or through the subject or
+        classroom it happened in; it is looked up at flush time, not on the request path.
+        """
+        ref = next(
+            (f"{kind}:{key}" for kind, key in (
+                ("course", course_id), ("subject", subject_id), ("classroom", classroom_id)
+            ) if key is not None),
+            "",
+        )
+        field = self._field(metric, user_id, ref, at or datetime.utcnow())
+        redis = redis_manager.redis
+        if redis is None:
+            await self._apply({field: 1})
+            return
+        try:
+            await redis.hincrby(PENDING_KEY, field, 1)
+        except Exception as e:
+            logger.warning(f"Failed to record {metric} activity: {e}")
+
+    async def flush(self):
+        """Move buffered counts into the database; see ViewCounterService.flush for the rename scheme."""
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        if not await redis_manager.acquire_lock(FLUSH_LOCK_KEY, max(settings.ACTIVITY_FLUSH_INTERVAL_SECONDS * 6, 60)):
+            return
+
+        try:
+            if await redis.exists(FLUSHING_KEY) or await redis.exists(PENDING_KEY):
+                if not await redis.exists(FLUSHING_KEY):
+                    await redis.rename(PENDING_KEY, FLUSHING_KEY)
+                # A leftover flushing key only holds the batches that were not committed.
+                fields = list((await redis.hgetall(FLUSHING_KEY)).items())
+                batch_size = settings.ACTIVITY_FLUSH_BATCH_SIZE
+                for start in range(0, len(fields), batch_size):
+                    batch = {field: int(count) for field, count in fields[start:start + batch_size]}
+                    await self._apply(batch)
+                    # Committed: a flush resumed after a later failure must not apply these again.
+                    await redis.hdel(FLUSHING_KEY, *batch)
+                await redis.delete(FLUSHING_KEY)
+
+            # Never released: the key expiring is what allows the next prune, an hour later.
+            if await redis_manager.acquire_lock(PRUNE_LOCK_KEY, 60 * 60):
+                await self._prune()
+        finally:
+            await redis_manager.release_lock(FLUSH_LOCK_KEY)
+
+    async def _resolve_courses(self, db: AsyncSession, refs: Iterable[str]) -> Dict[str, Optional[int]]:
+        ids: Dict[str, set] = {"course": set(), "subject": set(), "classroom": set()}
+        for ref in refs:
+            kind, _, key = ref.partition(":")
+            if kind in ids and key.isdigit():
+                ids[kind].add(int(key))
+
+        classroom_subjects: Dict[int, Optional[int]] = {}
+        if ids["classroom"]:
+            result = await db.execute(
+                select(Classroom.id, Classroom.subject_id).where(Classroom.id.in_(ids["classroom"]))
+            )
+            classroom_subjects = dict(result.all())
+            ids["subject"].update(subject_id for subject_id in classroom_subjects.values() if subject_id)
+        subject_courses: Dict[int, int] = {}
+        if ids["subject"]:
+            result = await db.execute(select(Subject.id, Subject.course_id).where(Subject.id.in_(ids["subject"])))
+            subject_courses = dict(result.all())
+
+        resolved: Dict[str, Optional[int]] = {}
+        for ref in refs:
+            kind, _, key = ref.partition(":")
+            if not key.isdigit():
+                resolved[ref] = None
+            elif kind == "course":
+                resolved[ref] = int(key)
+            elif kind == "subject":
+                resolved[ref] = subject_courses.get(int(key))
+            elif kind == "classroom":
+                resolved[ref] = subject_courses.get(classroom_subjects.get(int(key)))
+            else:
+                resolved[ref] = None
+        return resolved
+
+    def _increment(self, increments: Increments, metric: str, user_id: int, course_id: Optional[int], hour: datetime, count: int):
+        for granularity in GRANULARITIES:
+            bucket = truncate(hour, granularity)
+            if user_id:
+                increments[("user", user_id, granularity, metric, bucket)] += count
+            if course_id:
+                increments[("course", course_id, granularity, metric, bucket)] += count
+            increments[("platform", 0, granularity, metric, bucket)] += count
+
+    async def _apply(self, fields: Dict[str, int]):
+        parsed = []
+        for field, count in fields.items():
+            try:
+                metric, user_id, ref, hour = field.split("|")
+                parsed.append((metric, int(user_id), ref, datetime.strptime(hour, "%Y%m%d%H"), count))
+            except ValueError:
+                logger.warning(f"Dropping malformed activity field {field!r}")
+
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            courses = await self._resolve_courses(db, {ref for _, _, ref, _, _ in parsed})
+            increments: Increments = defaultdict(int)
+            last_seen: Dict[Tuple[int, int], datetime] = {}
+            for metric, user_id, ref, hour, count in parsed:
+                course_id = courses.get(ref)
+                self._increment(increments, metric, user_id, course_id, hour, count)
+                if user_id and course_id:
+                    last_seen[(user_id, course_id)] = max(hour, last_seen.get((user_id, course_id), hour))
+            await self._upsert(db, increments)
+            await self._touch_enrollments(db, last_seen)
+            await db.commit()
+
+        logger.info(f"Flushed {sum(fields.values())} activity events into {len(increments)} buckets")
+
+    async def _upsert(self, db: AsyncSession, increments: Increments):
+        rows = [
+            {"scope": scope, "scope_id": scope_id, "granularity": granularity,
+             "metric": metric, "bucket_start": bucket, "count": count}
+            for (scope, scope_id, granularity, metric, bucket), count in increments.items()
+            if count
+        ]
+        batch_size = settings.ACTIVITY_FLUSH_BATCH_SIZE
+        for start in range(0, len(rows), batch_size):
+            stmt = dialect_insert(ActivityBucket).values(rows[start:start + batch_size])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=["scope", "scope_id", "granularity", "metric", "bucket_start"],
+                set_={"count": ActivityBucket.count + stmt.excluded.count},
+            ))
+
+    async def _touch_enrollments(self, db: AsyncSession, last_seen: Dict[Tuple[int, int], datetime]):
+        """Advance `enrollments.last_accessed_at` (hour precision) for the (user, course) pairs seen."""
+        by_hour: Dict[datetime, List[Tuple[int, int]]] = defaultdict(list)
+        for pair, hour in last_seen.items():
+            by_hour[hour].append(pair)
+        batch_size = settings.ACTIVITY_FLUSH_BATCH_SIZE
+        for hour, pairs in by_hour.items():
+            for start in range(0, len(pairs), batch_size):
+                await db.execute(
+                    update(Enrollment)
+                    .where(
+                        tuple_(Enrollment.user_id, Enrollment.course_id).in_(pairs[start:start + batch_size]),
+                        or_(Enrollment.last_accessed_at.is_(None), Enrollment.last_accessed_at < hour),
+                    )
+                    .values(last_accessed_at=hour)
+                    .execution_options(synchronize_session=False)
+                )
+
+    async def _prune(self):
+        cutoff = truncate(datetime.utcnow() - timedelta(days=settings.ACTIVITY_HOURLY_RETENTION_DAYS), "day")
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            await db.execute(
+                delete(ActivityBucket).where(
+                    ActivityBucket.granularity == "hour", ActivityBucket.bucket_start < cutoff
+                )
+            )
+            await db.commit()
+
+    # --- Reads ---
+
+    async def series(
+        self,
+        db: AsyncSession,
+        scope: str,
+        scope_ids: Sequence[int],
+        start: datetime,
+        end: datetime,
+        granularity: str = "day",
+        metrics: Sequence[str] = METRICS,
+    ) -> List[Dict]:
+        """
+        Chart-ready counts for [start, end], one entry per bucket (zero-filled):
+        {"bucket": iso start, "total": n, <metric>: n, ...}. Several scope ids are summed,
+        e.g. all courses of an instructor.
+        """
+        first, last = truncate(start, granularity), truncate(end, granularity)
+        totals: Dict[datetime, Dict[str, int]] = defaultdict(dict)
+        if scope_ids:
+            result = await db.execute(
+                select(ActivityBucket.bucket_start, ActivityBucket.metric, func.sum(ActivityBucket.count))
+                .where(
+                    ActivityBucket.scope == scope,
+                    ActivityBucket.scope_id.in_(scope_ids),
+                    ActivityBucket.granularity == granularity,
+                    ActivityBucket.metric.in_(metrics),
+                    ActivityBucket.bucket_start.between(first, last),
+                )
+                .group_by(ActivityBucket.bucket_start, ActivityBucket.metric)
+            )
+            for bucket, metric, count in result.all():
+                totals[bucket][metric] = int(count or 0)
+
+        points = []
+        bucket, step = first, GRANULARITIES[granularity]
+        while bucket <= last:
+            counts = totals.get(bucket, {})
+            points.append({
+                "bucket": bucket.isoformat(),
+                "total": sum(counts.values()),
+                **{metric: counts.get(metric, 0) for metric in metrics},
+            })
+            bucket += step
+        return points
+
+    # --- Backfill ---
+
+    def _hour(self, column):
+        if get_engine().dialect.name == "postgresql":
+            return func.date_trunc("hour", column)
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+
+    async def _take_buffered(self) -> Dict[str, int]:
+        """Empty the pending and flushing hashes in one transaction, returning their counts."""
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(FLUSHING_KEY)
+            pipe.hgetall(PENDING_KEY)
+            pipe.delete(FLUSHING_KEY, PENDING_KEY)
+            flushing, pending, _ = await pipe.execute()
+        fields: Dict[str, int] = defaultdict(int)
+        for buffered in (flushing, pending):
+            for field, count in buffered.items():
+                fields[field] += int(count)
+        return fields
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """
+        Recompute every bucket from attendance, submissions and resource completions.
+        Holds the flush lock throughout: buffered events of those metrics are already
+        rows in the source tables, so they are discarded rather than flushed on top of
+        the snapshot; buffered logins, which have no source table, are applied after it.
+        """
+        redis = redis_manager.redis
+        if redis is None:
+            return await self._rebuild(db)
+        while not await redis_manager.acquire_lock(FLUSH_LOCK_KEY, 600):
+            await asyncio.sleep(1)
+        try:
+            buffered = await self._take_buffered()
+            rebuilt = await self._rebuild(db)
+            logins = {field: count for field, count in buffered.items() if field.startswith(f"{LOGIN}|")}
+            if logins:
+                await self._apply(logins)
+            return rebuilt
+        finally:
+            await redis_manager.release_lock(FLUSH_LOCK_KEY)
+
+    async def _rebuild(self, db: AsyncSession) -> int:
+        sources = (
+            (ATTENDANCE, Attendance.joined_at, Attendance.user_id,
+             lambda q: q.select_from(Attendance)
+             .join(Classroom, Attendance.classroom_id == Classroom.id)
+             .outerjoin(Subject, Classroom.subject_id == Subject.id)),
+            (SUBMISSION, Submission.submitted_at, Submission.user_id,
+             lambda q: q.select_from(Submission)
+             .join(Test, Submission.test_id == Test.id)
+             .outerjoin(Subject, Test.subject_id == Subject.id)),
+            (RESOURCE_COMPLETION, ResourceCompletion.completed_at, ResourceCompletion.user_id,
+             lambda q: q.select_from(ResourceCompletion)
+             .join(Resource, ResourceCompletion.resource_id == Resource.id)
+             .outerjoin(Subject, Resource.subject_id == Subject.id)),
+        )
+        increments: Increments = defaultdict(int)
+        last_seen: Dict[Tuple[int, int], datetime] = {}
+        for metric, at, user_id, joins in sources:
+            hour = self._hour(at).label("hour")
+            result = await db.execute(
+                joins(select(user_id, Subject.course_id, hour, func.count()))
+                .where(at.isnot(None))
+                .group_by(user_id, Subject.course_id, hour)
+            )
+            for uid, course_id, bucket, count in result.all():
+                if isinstance(bucket, str):
+                    bucket = datetime.fromisoformat(bucket)
+                self._increment(increments, metric, uid or 0, course_id, bucket, count)
+                if uid and course_id:
+                    last_seen[(uid, course_id)] = max(bucket, last_seen.get((uid, course_id), bucket))
+
+        await db.execute(delete(ActivityBucket).where(ActivityBucket.metric != LOGIN))
+        await self._upsert(db, increments)
+        await self._touch_enrollments(db, last_seen)
+        await db.commit()
+        logger.info(f"Rebuilt {len(increments)} activity buckets")
+        return len(increments)
+
+    async def ensure_buckets(self):
+        """
+        One-shot backfill for databases that have activity but no buckets yet. Skipped
+        on SQLite: its single writer lock would be held by the rebuild against the
+        requests served meanwhile, failing one side with "database is locked".
+        """
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            if await db.scalar(select(func.count()).select_from(ActivityBucket)):
+                return
+            has_activity = await db.scalar(select(func.count()).select_from(Attendance)) or \
+                await db.scalar(select(func.count()).select_from(Submission)) or \
+                await db.scalar(select(func.count()).select_from(ResourceCompletion))
+            if not has_activity:
+                return
+            if get_engine().dialect.name == "sqlite":
+                logger.warning(
+                    "Activity buckets are empty; not backfilling on SQLite while serving requests. "
+                    "Run activity_service.rebuild() with the app stopped to chart past activity."
+                )
+                return
+            if redis_manager.redis is not None:
+                if not await redis_manager.acquire_lock(BACKFILL_LOCK_KEY, 600):
+                    return
+            try:
+                await self.rebuild(db)
+            except Exception:
+                # Let the next start try again instead of waiting out the lock.
+                if redis_manager.redis is not None:
+                    await redis_manager.release_lock(BACKFILL_LOCK_KEY)
+                raise
+
+
+activity_service = ActivityService()
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, case
 from datetime import datetime, timedelta
@@ -9,14 +9,17 @@ from app.models.classroom import Classroom
 from app.models.attendance import Attendance
 from app.models.submission import Submission
 from app.models.test import Test
-from app.models.feedback import InstructorFeedback, CourseFeedback
+from app.models.feedback import InstructorFeedback, CourseFeedback, InstructorRatingSummary
 from app.models.subject import Subject
 from app.models.enums import AttendanceStatusEnum, ClassroomStatusEnum
+from app.services.activity_service import activity_service
 from app.services.llm_service import llm_service
 import logging
 
 logger = logging.getLogger("app.services.analytics")
 
+ROSTER_SORTS = ("name", "progress", "last_active", "courses")
+
 class AnalyticsService:
     
     async def get_admin_dashboard(self, db: AsyncSession) -> Dict[str, Any]:
@@ -95,7 +98,10 @@ class AnalyticsService:
             "recent_activity": {
                 "enrollments_last_7_days": recent_enrollments.scalar() or 0
             },
-            "top_courses": top_courses
+            "top_courses": top_courses,
+            "activity_trend": await activity_service.series(
+                db, "platform", [0], datetime.utcnow() - timedelta(days=30), datetime.utcnow()
+            )
         }
     
     async def get_instructor_performance(self, db: AsyncSession, instructor_id: int) -> Dict[str, Any]:
@@ -133,8 +139,8 @@ class AnalyticsService:
         
         # Average rating from feedback
         avg_rating = await db.execute(
-            select(func.avg(InstructorFeedback.rating))
-            .where(InstructorFeedback.instructor_id == instructor_id)
+            select(InstructorRatingSummary.rating_average)
+            .where(InstructorRatingSummary.instructor_id == instructor_id)
         )
         
         # Get all feedback for AI analysis
@@ -215,7 +221,8 @@ class AnalyticsService:
                 "active_courses": 0,
                 "recent_enrollments": [],
                 "upcoming_classes": [],
-                "course_stats": []
+                "course_stats": [],
+                "activity_trend": []
             }
         
         # Total students across all courses
@@ -335,7 +342,10 @@ class AnalyticsService:
             "active_courses": active_courses,
             "recent_enrollments": recent_enrollments,
             "upcoming_classes": upcoming_classes,
-            "course_stats": course_stats
+            "course_stats": course_stats,
+            "activity_trend": await activity_service.series(
+                db, "course", course_ids, datetime.utcnow() - timedelta(days=30), datetime.utcnow()
+            )
         }
 
     async def get_instructor_students(self, db: AsyncSession, instructor_id: int) -> List[Dict[str, Any]]:
@@ -416,4 +426,121 @@ class AnalyticsService:
             
         return final_students
 
+    async def get_instructor_student_roster(
+        self,
+        db: AsyncSession,
+        instructor_id: int,
+        skip: int = 0,
+        limit: int = 20,
+        sort: str = "name",
+        descending: bool = False,
+        search: Optional[str] = None,
+        course_id: Optional[int] = None,
+        min_progress: Optional[float] = None,
+        max_progress: Optional[float] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        One page of the students enrolled in an instructor's courses, as (total, students).
+
+        Per-student course count, average progress and last activity are aggregated in
+        SQL and sorted and paginated there, so only the page's rows (and then only their
+        enrollments) are loaded, however many students the instructor has.
+        """
+        instructor_courses = select(Course.id).where(
+            or_(
+                Course.created_by == instructor_id,
+                Course.instructors.any(User.id == instructor_id)
+            )
+        )
+        if course_id is not None:
+            instructor_courses = instructor_courses.where(Course.id == course_id)
+
+        per_student = (
+            select(
+                Enrollment.user_id,
+                func.count().label("enrolled_courses"),
+                func.avg(Enrollment.progress_percent).label("average_progress"),
+                func.max(Enrollment.last_accessed_at).label("last_active"),
+            )
+            .where(Enrollment.course_id.in_(instructor_courses))
+            .group_by(Enrollment.user_id)
+            .subquery()
+        )
+        sort_column = {
+            "name": User.full_name,
+            "progress": per_student.c.average_progress,
+            "last_active": per_student.c.last_active,
+            "courses": per_student.c.enrolled_courses,
+        }[sort]
+
+        query = (
+            select(
+                User.id,
+                User.full_name,
+                User.email,
+                per_student.c.enrolled_courses,
+                per_student.c.average_progress,
+                per_student.c.last_active,
+            )
+            .join(per_student, per_student.c.user_id == User.id)
+        )
+        if search:
+            pattern = f"%{search}%"
+            query = query.where(or_(User.full_name.ilike(pattern), User.email.ilike(pattern)))
+        if min_progress is not None:
+            query = query.where(per_student.c.average_progress >= min_progress)
+        if max_progress is not None:
+            query = query.where(per_student.c.average_progress <= max_progress)
+        page = (
+            query
+            .add_columns(func.count().over().label("total"))
+            .order_by((sort_column.desc() if descending else sort_column.asc()).nulls_last(), User.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        rows = (await db.execute(page)).all()
+        if not rows:
+            # The window count only comes back with a row; a page past the end needs its own count.
+            total = await db.scalar(select(func.count()).select_from(query.subquery())) if skip else 0
+            return total, []
+
+        students = {
+            row.id: {
+                "user_id": row.id,
+                "full_name": row.full_name,
+                "email": row.email,
+                "enrolled_courses": row.enrolled_courses,
+                "average_progress": round(row.average_progress or 0, 2),
+                "last_active": row.last_active,
+                "courses": [],
+            }
+            for row in rows
+        }
+        enrollments = await db.execute(
+            select(
+                Enrollment.user_id,
+                Enrollment.course_id,
+                Course.title,
+                Enrollment.progress_percent,
+                Enrollment.enrolled_at,
+                Enrollment.last_accessed_at,
+            )
+            .join(Course, Enrollment.course_id == Course.id)
+            .where(
+                Enrollment.user_id.in_(students.keys()),
+                Enrollment.course_id.in_(instructor_courses),
+            )
+            .order_by(Enrollment.user_id, Course.title)
+        )
+        for row in enrollments.all():
+            students[row.user_id]["courses"].append({
+                "course_id": row.course_id,
+                "course_title": row.title,
+                "progress_percent": row.progress_percent,
+                "enrolled_at": row.enrolled_at,
+                "last_accessed_at": row.last_accessed_at,
+            })
+
+        return rows[0].total, list(students.values())
+
 analytics_service = AnalyticsService()
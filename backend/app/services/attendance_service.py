@@ -4,6 +4,8 @@ from sqlalchemy import select, update
 from app.models.attendance import Attendance
 from app.models.enums import AttendanceStatusEnum
 from app.db.database import get_sessionmaker
+from app.services.activity_service import activity_service, ATTENDANCE
+from app.services.course_stats_service import course_stats_service
 
 class AttendanceService:
     async def mark_attendance_join(self, classroom_id: int, user_id: int, ip_address: str = None):
@@ -21,7 +23,9 @@ class AttendanceService:
             db.add(attendance)
             await db.commit()
             await db.refresh(attendance)
-            return attendance.id
+        await course_stats_service.mark_dirty(classroom_id=classroom_id)
+        await activity_service.record(ATTENDANCE, user_id, classroom_id=classroom_id)
+        return attendance.id
 
     async def mark_attendance_leave(self, attendance_id: int):
         if not attendance_id:
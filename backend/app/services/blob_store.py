@@ -0,0 +1,363 @@
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import select, update, delete, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import dialect_insert, get_sessionmaker
+from app.models.blob import Blob
+from app.models.resource import Resource
+from app.services.file_delivery_service import file_delivery_service
+from app.utils.media import media_kind
+
+logger = logging.getLogger("app.services.blob_store")
+
+GC_LOCK_KEY = "blobs:gc:lock"
+GC_BATCH_SIZE = 500
+
+
+def blob_key(sha256: str, extension: str = "") -> str:
+    """Fan out by hash prefix so no directory/prefix gets millions of entries."""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+def variant_key(storage_key: str, name: str) -> str:
+    """Renditions sit next to the original: ab/cd/<sha>.pdf -> ab/cd/<sha>.thumb.jpg"""
+    return f"{os.path.splitext(storage_key)[0]}.{name}.jpg"
+
+
+class LocalBlobBackend:
+    """Blobs as files under BLOB_STORAGE_DIR, which is not publicly mounted; see /files."""
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _put(self, source_path: str, key: str):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+
+    async def put(self, source_path: str, key: str, content_type: Optional[str]):
+        """Move `source_path` into the store; the source file is consumed."""
+        await run_in_threadpool(self._put, source_path, key)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.exists, self.path(key))
+
+    async def delete(self, key: str):
+        try:
+            await run_in_threadpool(os.remove, self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobBackend:
+    """
+    Blobs in an S3-compatible bucket (AWS S3, MinIO, ...). boto3 is only needed
+    when this backend is configured.
+    """
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None, secret_key: Optional[str] = None):
+        self.bucket = bucket
+        self._client_kwargs = {
+            "endpoint_url": endpoint_url,
+            "region_name": region,
+            "aws_access_key_id": access_key,
+            "aws_secret_access_key": secret_key,
+        }
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("BLOB_STORAGE_BACKEND=s3 requires the boto3 package")
+            self._client = boto3.client(
+                "s3", **{k: v for k, v in self._client_kwargs.items() if v is not None}
+            )
+        return self._client
+
+    def _put(self, source_path: str, key: str, content_type: Optional[str]):
+        extra = {"CacheControl": "public, max-age=31536000, immutable"}
+        if content_type:
+            extra["ContentType"] = content_type
+        self.client.upload_file(source_path, self.bucket, key, ExtraArgs=extra)
+        os.remove(source_path)
+
+    async def put(self, source_path: str, key: str, content_type: Optional[str]):
+        await run_in_threadpool(self._put, source_path, key, content_type)
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception:
+            return False
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self._exists, key)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def download(self, key: str, target_path: str):
+        await run_in_threadpool(self.client.download_file, self.bucket, key, target_path)
+
+    def presigned_url(self, key: str, expires_in: int, disposition: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+        if disposition:
+            params["ResponseContentDisposition"] = disposition
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def create_backend():
+    if settings.BLOB_STORAGE_BACKEND == "s3":
+        if not settings.BLOB_S3_BUCKET:
+            raise RuntimeError("BLOB_S3_BUCKET must be set when BLOB_STORAGE_BACKEND=s3")
+        return S3BlobBackend(
+            bucket=settings.BLOB_S3_BUCKET,
+            endpoint_url=settings.BLOB_S3_ENDPOINT_URL,
+            region=settings.BLOB_S3_REGION,
+            access_key=settings.BLOB_S3_ACCESS_KEY,
+            secret_key=settings.BLOB_S3_SECRET_KEY,
+        )
+    return LocalBlobBackend(settings.BLOB_STORAGE_DIR)
+
+
+@dataclass
+class StoredBlob:
+    blob: Blob
+    url: str  # signed, short-lived
+    deduplicated: bool  # the content was already stored; nothing new was written
+
+
+class BlobStore:
+    """
+    Content-addressed storage: files are named by SHA-256, so identical uploads are
+    stored once. Resources hold references; blobs nobody references are deleted by a
+    periodic garbage collector after a grace period.
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = create_backend()
+        return self._backend
+
+    def url(self, blob: Blob) -> str:
+        """Signed /files URL to hand out; store `reference()` instead, it does not expire."""
+        return file_delivery_service.sign(blob.storage_key)[0]
+
+    def reference(self, blob: Blob) -> str:
+        return file_delivery_service.reference(blob.storage_key)
+
+    def variant_reference(self, blob: Optional[Blob], *names: str) -> Optional[str]:
+        """Stored reference to the first rendition in `names` that exists for the blob."""
+        for name in names:
+            if blob is not None and blob.variants and name in blob.variants:
+                return file_delivery_service.reference(blob.variants[name])
+        return None
+
+    def _extension(self, filename: Optional[str], content_type: Optional[str]) -> str:
+        extension = os.path.splitext(filename or "")[1].lower()
+        if not extension and content_type:
+            extension = mimetypes.guess_extension(content_type) or ""
+        return extension if re.fullmatch(r"\.[a-z0-9]{1,10}", extension) else ""
+
+    async def ingest(
+        self,
+        db: AsyncSession,
+        source_path: str,
+        sha256: str,
+        size: int,
+        content_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        collectable: bool = False,
+    ) -> StoredBlob:
+        """
+        Store a fully written temp file by its hash, consuming it. If the content is
+        already stored the temp file is dropped and the existing blob returned.
+        `collectable` blobs are garbage-collected unless a resource references them
+        within the grace period; other uploads are pinned.
+        """
+        now = datetime.now(timezone.utc)
+        # Claim an existing blob; the WHERE makes this atomic with respect to the GC,
+        # which only deletes rows that are still orphaned. A plain upload pins the blob,
+        # a collectable one restarts the grace period of an orphaned blob.
+        if collectable:
+            values = {"orphaned_at": case((Blob.orphaned_at != None, now), else_=None)}
+        else:
+            values = {"is_pinned": True}
+        result = await db.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(**values)
+            .returning(Blob.storage_key)
+            .execution_options(synchronize_session=False)
+        )
+        if result.scalar_one_or_none() is not None:
+            await db.commit()
+            if os.path.exists(source_path):
+                await run_in_threadpool(os.remove, source_path)
+            blob = await db.get(Blob, sha256, populate_existing=True)
+            return StoredBlob(blob=blob, url=self.url(blob), deduplicated=True)
+
+        key = blob_key(sha256, self._extension(filename, content_type))
+        await self.backend.put(source_path, key, content_type)
+        await db.execute(
+            dialect_insert(Blob)
+            .values(
+                sha256=sha256,
+                size=size,
+                content_type=content_type,
+                backend=self.backend.name,
+                storage_key=key,
+                ref_count=0,
+                orphaned_at=now if collectable else None,
+                is_pinned=not collectable,
+                processing_status="pending" if media_kind(content_type) else "skipped",
+            )
+            .on_conflict_do_nothing(index_elements=["sha256"])
+        )
+        await db.commit()
+        blob = await db.get(Blob, sha256, populate_existing=True)
+        return StoredBlob(blob=blob, url=self.url(blob), deduplicated=False)
+
+    async def resolve_url(self, db: AsyncSession, url: Optional[str]) -> Optional[Blob]:
+        """The blob behind a URL returned by the upload endpoints (or a stored reference), if any."""
+        key = file_delivery_service.key_of(url)
+        if not key:
+            return None
+        blob = await db.get(Blob, file_delivery_service.parse_key(key))
+        if blob is None or key != blob.storage_key:
+            return None
+        return blob
+
+    async def acquire(self, db: AsyncSession, sha256: str):
+        """Count one more reference. The caller commits."""
+        await db.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(ref_count=Blob.ref_count + 1, orphaned_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def release(self, db: AsyncSession, sha256: str):
+        """Drop one reference; the last one makes the blob collectable. The caller commits."""
+        remaining = case((Blob.ref_count > 1, Blob.ref_count - 1), else_=0)
+        await db.execute(
+            update(Blob)
+            .where(Blob.sha256 == sha256)
+            .values(
+                ref_count=remaining,
+                orphaned_at=case((Blob.ref_count > 1, None), else_=datetime.now(timezone.utc)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def reconcile_refs(self, db: AsyncSession) -> int:
+        """Recount references from resources, for rows deleted without going through release()."""
+        ref_count = (
+            select(func.count(Resource.id))
+            .where(Resource.blob_sha256 == Blob.sha256)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(Blob)
+            .where(Blob.ref_count != ref_count)
+            .values(
+                ref_count=ref_count,
+                orphaned_at=case((ref_count > 0, None), else_=datetime.now(timezone.utc)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def collect_garbage(self, db: AsyncSession) -> int:
+        """Delete blobs that have been unreferenced for longer than the grace period."""
+        fixed = await self.reconcile_refs(db)
+        if fixed:
+            logger.info(f"Reconciled reference counts for {fixed} blobs")
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.BLOB_GC_GRACE_SECONDS)
+        removed = 0
+        while True:
+            result = await db.execute(
+                select(Blob.sha256)
+                .where(
+                    Blob.ref_count == 0,
+                    Blob.is_pinned == False,
+                    Blob.orphaned_at != None,
+                    Blob.orphaned_at < cutoff,
+                )
+                .limit(GC_BATCH_SIZE)
+            )
+            candidates = result.scalars().all()
+            if not candidates:
+                break
+            # Re-check the condition in the DELETE so a concurrent re-upload or new
+            # reference wins over the collector.
+            result = await db.execute(
+                delete(Blob)
+                .where(
+                    Blob.sha256.in_(candidates),
+                    Blob.ref_count == 0,
+                    Blob.is_pinned == False,
+                    Blob.orphaned_at != None,
+                    Blob.orphaned_at < cutoff,
+                )
+                .returning(Blob.backend, Blob.storage_key, Blob.variants)
+                .execution_options(synchronize_session=False)
+            )
+            deleted = result.all()
+            # Bytes go before the commit: until then the deleted rows stay locked, so a
+            # concurrent ingest of the same content only stores its file (and a fresh
+            # row) after the old bytes are gone.
+            for backend_name, key, variants in deleted:
+                if backend_name != self.backend.name:
+                    logger.warning(f"Blob {key} lives on backend {backend_name}; leaving its bytes in place")
+                    continue
+                for stored_key in [key, *(variants or {}).values()]:
+                    try:
+                        await self.backend.delete(stored_key)
+                    except Exception as e:
+                        logger.error(f"Failed to delete blob {stored_key}: {e}")
+            await db.commit()
+            removed += len(deleted)
+            if len(candidates) < GC_BATCH_SIZE:
+                break
+        if removed:
+            logger.info(f"Garbage-collected {removed} unreferenced blobs")
+        return removed
+
+    async def run_gc(self):
+        """Periodic job entry point; one worker collects per interval."""
+        if redis_manager.redis is not None:
+            if not await redis_manager.acquire_lock(GC_LOCK_KEY, settings.BLOB_GC_INTERVAL_SECONDS):
+                return
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            await self.collect_garbage(db)
+
+
+blob_store = BlobStore()
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import get_sessionmaker
+from app.models.classroom import Classroom
+from app.models.enrollment import Enrollment
+from app.models.enums import ClassroomStatusEnum
+from app.models.subject import Subject
+from app.services.course_stats_service import course_stats_service
+from app.services.notification_service import notification_service
+
+logger = logging.getLogger("app.services.class_scheduler")
+
+SCHEDULE_KEY = "class_schedule"  # ZSET of "<kind>:<classroom id>" scored by due time (epoch seconds)
+SYNC_LOCK_KEY = "class_schedule:sync:lock"
+
+REMIND = "remind"
+START = "start"
+OVERRUN = "overrun"
+
+DUE_BATCH_SIZE = 100
+RETRY_DELAY_SECONDS = 60
+
+RUNNING_STATUSES = (ClassroomStatusEnum.live.value, ClassroomStatusEnum.late.value)
+
+
+def _epoch(moment: datetime) -> float:
+    # SQLite hands back naive datetimes; those are UTC like everything else we store.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _reminded_key(classroom_id: int, start: datetime) -> str:
+    return f"class_schedule:reminded:{classroom_id}:{int(_epoch(start))}"
+
+
+class ClassSchedulerService:
+    """
+    Sends "class starting soon" reminders and moves classes through their status at
+    `start_time` and `end_time`.
+
+    Everything due is kept in one Redis sorted set scored by due time, so the worker
+    only asks Redis for the head of the set and sleeps until it is due; the database
+    is read when something actually fires. Every node runs the worker: an entry
+    belongs to whichever node removes it from the set (ZREM returns 1 for exactly one
+    of them), and reminders are additionally claimed per class and start time, so
+    each goes out once (a failed send hands its progress to the retry). Routes
+    schedule a class whenever they change it, and a periodic sync (one node at a
+    time) re-adds everything due within CLASS_SCHEDULE_HORIZON_HOURS from the
+    database, which covers lost entries.
+    """
+
+    def _entries(self, classroom: Classroom) -> Dict[str, Optional[float]]:
+        """Due time of each kind of entry for `classroom`, None for kinds that no longer apply."""
+        upcoming = classroom.is_active and classroom.status == ClassroomStatusEnum.not_started.value
+        running = classroom.is_active and (upcoming or classroom.status in RUNNING_STATUSES)
+        start = _epoch(classroom.start_time) if classroom.start_time else None
+        end = _epoch(classroom.end_time) if classroom.end_time else None
+        return {
+            REMIND: start - settings.CLASS_REMINDER_LEAD_MINUTES * 60 if upcoming and start else None,
+            START: start if upcoming and start else None,
+            OVERRUN: end + settings.CLASS_OVERRUN_GRACE_MINUTES * 60 if running and end else None,
+        }
+
+    async def schedule(self, classroom: Classroom):
+        """(Re)schedule everything due for a class after it was created or changed."""
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        entries = self._entries(classroom)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                due = {f"{kind}:{classroom.id}": at for kind, at in entries.items() if at is not None}
+                gone = [f"{kind}:{classroom.id}" for kind, at in entries.items() if at is None]
+                if due:
+                    pipe.zadd(SCHEDULE_KEY, due)
+                if gone:
+                    pipe.zrem(SCHEDULE_KEY, *gone)
+                await pipe.execute()
+        except Exception as e:
+            # The periodic sync picks the class up again once it is within the horizon.
+            logger.warning(f"Failed to schedule classroom {classroom.id}: {e}")
+
+    async def unschedule(self, classroom_id: int):
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        try:
+            await redis.zrem(SCHEDULE_KEY, *(f"{kind}:{classroom_id}" for kind in (REMIND, START, OVERRUN)))
+        except Exception as e:
+            logger.warning(f"Failed to unschedule classroom {classroom_id}: {e}")
+
+    async def sync(self):
+        """Periodic job: schedule every class with something due within the horizon, from the database."""
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        # Never released: the key expiring is what lets the next sync run, on any node.
+        if not await redis_manager.acquire_lock(SYNC_LOCK_KEY, max(settings.CLASS_SCHEDULE_SYNC_INTERVAL_SECONDS - 5, 1)):
+            return
+
+        now = datetime.utcnow()
+        horizon = now + timedelta(hours=settings.CLASS_SCHEDULE_HORIZON_HOURS)
+        grace = timedelta(minutes=settings.CLASS_OVERRUN_GRACE_MINUTES)
+        condition = and_(
+            Classroom.is_active.is_(True),
+            or_(
+                and_(
+                    Classroom.status == ClassroomStatusEnum.not_started.value,
+                    Classroom.start_time >= now - grace,
+                    Classroom.start_time <= horizon,
+                ),
+                and_(
+                    Classroom.status.in_(RUNNING_STATUSES),
+                    Classroom.end_time <= horizon,
+                ),
+            ),
+        )
+
+        scheduled, last_id = 0, 0
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            while True:
+                result = await db.execute(
+                    select(Classroom)
+                    .where(condition, Classroom.id > last_id)
+                    .order_by(Classroom.id)
+                    .limit(settings.CLASS_REMINDER_CHUNK_SIZE)
+                )
+                classrooms = result.scalars().all()
+                if not classrooms:
+                    break
+                due = {}
+                for classroom in classrooms:
+                    for kind, at in self._entries(classroom).items():
+                        if at is not None:
+                            due[f"{kind}:{classroom.id}"] = at
+                if due:
+                    await redis.zadd(SCHEDULE_KEY, due)
+                scheduled += len(classrooms)
+                last_id = classrooms[-1].id
+                db.expunge_all()
+
+        if scheduled:
+            logger.info(f"Class schedule synced: {scheduled} classes due within {settings.CLASS_SCHEDULE_HORIZON_HOURS}h")
+
+    async def run_worker(self):
+        redis = redis_manager.redis
+        if redis is None:
+            logger.warning("Redis not connected. Class scheduler disabled.")
+            return
+
+        await self.sync()
+        while True:
+            due = await redis.zrangebyscore(SCHEDULE_KEY, "-inf", time.time(), start=0, num=DUE_BATCH_SIZE)
+            for member in due:
+                if not await redis.zrem(SCHEDULE_KEY, member):
+                    continue  # another node claimed it
+                try:
+                    await self._dispatch(member)
+                except Exception as e:
+                    logger.error(f"Scheduled class job {member} failed: {e}", exc_info=True)
+                    await redis.zadd(SCHEDULE_KEY, {member: time.time() + RETRY_DELAY_SECONDS}, nx=True)
+            if len(due) == DUE_BATCH_SIZE:
+                continue
+
+            head = await redis.zrange(SCHEDULE_KEY, 0, 0, withscores=True)
+            delay = settings.CLASS_SCHEDULER_POLL_SECONDS
+            if head:
+                delay = min(max(head[0][1] - time.time(), 0), delay)
+            await asyncio.sleep(delay)
+
+    async def _dispatch(self, member: str):
+        kind, _, key = member.partition(":")
+        if not key.isdigit():
+            logger.warning(f"Dropping malformed schedule entry {member!r}")
+            return
+        handler = {REMIND: self._remind, START: self._start, OVERRUN: self._complete_overrun}.get(kind)
+        if handler is None:
+            logger.warning(f"Dropping unknown schedule entry {member!r}")
+            return
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            classroom = await db.get(Classroom, int(key))
+            if classroom is None or not classroom.is_active:
+                return
+            await handler(db, classroom)
+
+    async def _remind(self, db: AsyncSession, classroom: Classroom):
+        if classroom.status != ClassroomStatusEnum.not_started.value or classroom.start_time is None:
+            return
+        seconds_left = _epoch(classroom.start_time) - time.time()
+        if seconds_left <= 0:
+            return
+        if seconds_left > settings.CLASS_REMINDER_LEAD_MINUTES * 60 + 60:
+            # Moved to a later time since this entry was added.
+            await self.schedule(classroom)
+            return
+        redis = redis_manager.redis
+        key = _reminded_key(classroom.id, classroom.start_time)
+        resume_key = f"{key}:resume"
+        ttl = int(seconds_left) + 3600
+        # A failed send leaves the last notified user id under the resume key; whoever
+        # takes it (atomically) carries on from there instead of starting over.
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.get(resume_key)
+            pipe.delete(resume_key)
+            resumed, _ = await pipe.execute()
+        if resumed is not None:
+            await redis.set(key, resumed, ex=ttl)
+        elif not await redis.set(key, "0", nx=True, ex=ttl):
+            return
+
+        course_id = await db.scalar(select(Subject.course_id).where(Subject.id == classroom.subject_id))
+        if course_id is None:
+            return
+        minutes = max(round(seconds_left / 60), 1)
+        notified, last_user_id = 0, int(resumed or 0)
+        try:
+            while True:
+                result = await db.execute(
+                    select(Enrollment.user_id)
+                    .where(Enrollment.course_id == course_id, Enrollment.user_id > last_user_id)
+                    .order_by(Enrollment.user_id)
+                    .limit(settings.CLASS_REMINDER_CHUNK_SIZE)
+                )
+                user_ids = result.scalars().all()
+                if not user_ids:
+                    break
+                await notification_service.notify_class_starting(classroom.id, classroom.title, user_ids, minutes=minutes)
+                notified += len(user_ids)
+                last_user_id = user_ids[-1]
+        except Exception:
+            # Release the claim for the retry, keeping the progress made.
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.set(resume_key, last_user_id, ex=ttl)
+                pipe.delete(key)
+                await pipe.execute()
+            raise
+        logger.info(f"Sent class reminder for classroom {classroom.id} to {notified} students")
+
+    async def _start(self, db: AsyncSession, classroom: Classroom):
+        if classroom.start_time is None or _epoch(classroom.start_time) > time.time():
+            await self.schedule(classroom)
+            return
+        await self._set_status(
+            db, classroom, ClassroomStatusEnum.live.value, (ClassroomStatusEnum.not_started.value,)
+        )
+
+    async def _complete_overrun(self, db: AsyncSession, classroom: Classroom):
+        if classroom.end_time is None:
+            return
+        if _epoch(classroom.end_time) + settings.CLASS_OVERRUN_GRACE_MINUTES * 60 > time.time():
+            await self.schedule(classroom)
+            return
+        await self._set_status(db, classroom, ClassroomStatusEnum.completed.value, RUNNING_STATUSES)
+
+    async def _set_status(self, db: AsyncSession, classroom: Classroom, status: str, expected: tuple):
+        # Conditional on the current status so an instructor starting/ending the class meanwhile wins.
+        result = await db.execute(
+            update(Classroom)
+            .where(Classroom.id == classroom.id, Classroom.status.in_(expected))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount:
+            logger.info(f"Classroom {classroom.id} is now {status}")
+            await course_stats_service.mark_dirty(subject_id=classroom.subject_id)
+
+
+class_scheduler_service = ClassSchedulerService()
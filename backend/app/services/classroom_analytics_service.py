@@ -10,6 +10,7 @@ from app.models.course import Course
 from app.models.test import Test
 from app.models.submission import Submission
 from app.models.enums import AttendanceStatusEnum
+from app.services.course_stats_service import course_stats_service
 
 class ClassroomAnalyticsService:
     
@@ -112,11 +113,10 @@ class ClassroomAnalyticsService:
         course_id: int
     ) -> Dict[str, Any]:
 
-        subjects = (
-            await db.execute(select(Subject.id).where(Subject.course_id == course_id))
-        ).scalars().all()
+        # Class counts come from the course stats rollup; only the per-class rows are queried.
+        stats = await course_stats_service.get(db, course_id)
 
-        if not subjects:
+        if stats is None or not stats.total_classes:
             return {
                 "course_id": course_id,
                 "total_classes": 0,
@@ -126,28 +126,14 @@ class ClassroomAnalyticsService:
                 "classroom_details": []
             }
 
-        classrooms = (
-            await db.execute(
-                select(Classroom).where(Classroom.subject_id.in_(subjects))
-            )
-        ).scalars().all()
-
-        classroom_ids = [c.id for c in classrooms]
-        if not classroom_ids:
-            return {
-                "course_id": course_id,
-                "total_classes": 0,
-                "completed_classes": 0,
-                "live_classes": 0,
-                "upcoming_classes": 0,
-                "classroom_details": []
-            }
-
-        attendance_data = (
+        rows = (
             await db.execute(
                 select(
-                    Attendance.classroom_id,
-                    func.count().label("total"),
+                    Classroom.id,
+                    Classroom.title,
+                    Classroom.status,
+                    Classroom.start_time,
+                    func.count(Attendance.id).label("total"),
                     func.sum(
                         case(
                             (Attendance.status == AttendanceStatusEnum.late.value, 1),
@@ -155,40 +141,31 @@ class ClassroomAnalyticsService:
                         )
                     ).label("late")
                 )
-                .where(Attendance.classroom_id.in_(classroom_ids))
-                .group_by(Attendance.classroom_id)
+                .join(Subject, Classroom.subject_id == Subject.id)
+                .outerjoin(Attendance, Attendance.classroom_id == Classroom.id)
+                .where(Subject.course_id == course_id)
+                .group_by(Classroom.id, Classroom.title, Classroom.status, Classroom.start_time)
             )
         ).all()
 
-        attendance_map = {
-            row.classroom_id: {"total": row.total, "late": row.late}
-            for row in attendance_data
-        }
-
-        classroom_stats = []
-        for c in classrooms:
-
-            stats = attendance_map.get(c.id, {"total": 0, "late": 0})
-
-            classroom_stats.append({
-                "classroom_id": c.id,
-                "title": c.title,
-                "status": c.status,
-                "start_time": c.start_time.isoformat() if c.start_time else None,
-                "total_attendance": stats["total"],
-                "late_count": stats["late"]
-            })
-
-        total_classes = len(classrooms)
-        completed = sum(1 for c in classrooms if c.status == "completed")
-        live = sum(1 for c in classrooms if c.status == "live")
+        classroom_stats = [
+            {
+                "classroom_id": row.id,
+                "title": row.title,
+                "status": row.status,
+                "start_time": row.start_time.isoformat() if row.start_time else None,
+                "total_attendance": row.total,
+                "late_count": row.late or 0
+            }
+            for row in rows
+        ]
 
         return {
             "course_id": course_id,
-            "total_classes": total_classes,
-            "completed_classes": completed,
-            "live_classes": live,
-            "upcoming_classes": total_classes - completed - live,
+            "total_classes": stats.total_classes,
+            "completed_classes": stats.completed_classes,
+            "live_classes": stats.live_classes,
+            "upcoming_classes": stats.total_classes - stats.completed_classes - stats.live_classes,
             "classroom_details": classroom_stats
         }
 
@@ -0,0 +1,174 @@
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, and_, or_, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db.database import get_sessionmaker
+from app.models.community import CommunityComment
+from app.schemas.community import CommentResponse, CommentThreadResponse
+
+logger = logging.getLogger("app.services.comment_thread")
+
+PATH_SEGMENT_WIDTH = 10
+PATH_SEPARATOR = "."
+BACKFILL_BATCH_SIZE = 500
+
+
+def path_segment(comment_id: int) -> str:
+    return str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+
+
+def descendant_range(path: str):
+    """
+    Bounds that select every descendant of `path` with a plain btree range:
+    children start with "<path>." and "/" sorts right after "." in byte order, which
+    the column's collation guarantees (see CommunityComment.path).
+    """
+    return and_(
+        CommunityComment.path > path + PATH_SEPARATOR,
+        CommunityComment.path < path + "/",
+    )
+
+
+class CommentThreadService:
+    """
+    Loads comment threads with materialized paths: one query for the roots, one range
+    query for all their descendants, assembled into a tree in memory.
+    """
+
+    def assign_path(self, comment: CommunityComment, parent: Optional[CommunityComment]):
+        """Set path/depth on a flushed comment (it needs its id)."""
+        if parent is not None:
+            comment.path = parent.path + PATH_SEPARATOR + path_segment(comment.id)
+            comment.depth = parent.depth + 1
+        else:
+            comment.path = path_segment(comment.id)
+            comment.depth = 0
+
+    async def _load_descendants(
+        self, db: AsyncSession, post_id: int, roots: List[CommunityComment], max_depth: Optional[int]
+    ) -> List[CommunityComment]:
+        # Comments still waiting for the path backfill come back without replies.
+        paths = [root.path for root in roots if root.path]
+        if not paths:
+            return []
+        filters = [
+            CommunityComment.post_id == post_id,
+            or_(*[descendant_range(path) for path in paths]),
+        ]
+        if max_depth is not None:
+            filters.append(CommunityComment.depth <= max_depth)
+        result = await db.execute(
+            select(CommunityComment)
+            .options(selectinload(CommunityComment.user))
+            .where(*filters)
+            .order_by(CommunityComment.path)
+        )
+        return result.scalars().all()
+
+    async def _parents_with_hidden_replies(
+        self, db: AsyncSession, post_id: int, comments: List[CommunityComment], max_depth: Optional[int]
+    ) -> set:
+        if max_depth is None:
+            return set()
+        edge_ids = [comment.id for comment in comments if comment.depth == max_depth]
+        if not edge_ids:
+            return set()
+        result = await db.execute(
+            select(distinct(CommunityComment.parent_comment_id)).where(
+                CommunityComment.post_id == post_id,
+                CommunityComment.parent_comment_id.in_(edge_ids),
+            )
+        )
+        return set(result.scalars().all())
+
+    def _assemble(
+        self, roots: List[CommunityComment], descendants: List[CommunityComment], truncated: set
+    ) -> List[CommentThreadResponse]:
+        # Built field by field: validating the ORM object directly would touch the
+        # lazy `replies` relationship, which cannot load under asyncio.
+        nodes: Dict[int, CommentThreadResponse] = {}
+        for comment in list(roots) + list(descendants):
+            nodes[comment.id] = CommentThreadResponse(
+                **CommentResponse.model_validate(comment).model_dump(),
+                depth=comment.depth,
+                has_more_replies=comment.id in truncated,
+                replies=[],
+            )
+        # Descendants arrive in path order, so each parent is attached before its children.
+        for comment in descendants:
+            parent = nodes.get(comment.parent_comment_id)
+            if parent is not None:
+                parent.replies.append(nodes[comment.id])
+        return [nodes[root.id] for root in roots]
+
+    async def load_post_threads(
+        self, db: AsyncSession, post_id: int, skip: int, limit: int, max_depth: Optional[int]
+    ) -> List[CommentThreadResponse]:
+        """A page of top-level comments (newest first) with their replies down to `max_depth`."""
+        result = await db.execute(
+            select(CommunityComment)
+            .options(selectinload(CommunityComment.user))
+            .where(
+                CommunityComment.post_id == post_id,
+                CommunityComment.parent_comment_id == None
+            )
+            .order_by(CommunityComment.created_at.desc(), CommunityComment.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        roots = result.scalars().all()
+        descendants = await self._load_descendants(db, post_id, roots, max_depth)
+        truncated = await self._parents_with_hidden_replies(db, post_id, list(roots) + list(descendants), max_depth)
+        return self._assemble(roots, descendants, truncated)
+
+    async def load_subtree(
+        self, db: AsyncSession, comment: CommunityComment, max_depth: Optional[int]
+    ) -> CommentThreadResponse:
+        """One comment with its replies, `max_depth` levels below it."""
+        absolute_depth = comment.depth + max_depth if max_depth is not None else None
+        descendants = await self._load_descendants(db, comment.post_id, [comment], absolute_depth)
+        truncated = await self._parents_with_hidden_replies(
+            db, comment.post_id, [comment] + list(descendants), absolute_depth
+        )
+        return self._assemble([comment], descendants, truncated)[0]
+
+    async def backfill_paths(self):
+        """Assign paths to comments created before threading existed, one tree level at a time."""
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            total = 0
+            while True:
+                parent = CommunityComment.__table__.alias("parent")
+                result = await db.execute(
+                    select(CommunityComment.id, CommunityComment.parent_comment_id, parent.c.path, parent.c.depth)
+                    .outerjoin(parent, parent.c.id == CommunityComment.parent_comment_id)
+                    .where(
+                        CommunityComment.path == None,
+                        or_(CommunityComment.parent_comment_id == None, parent.c.path != None),
+                    )
+                    .limit(BACKFILL_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                for comment_id, parent_id, parent_path, parent_depth in rows:
+                    if parent_id is None:
+                        path, depth = path_segment(comment_id), 0
+                    else:
+                        path, depth = parent_path + PATH_SEPARATOR + path_segment(comment_id), parent_depth + 1
+                    await db.execute(
+                        update(CommunityComment)
+                        .where(CommunityComment.id == comment_id)
+                        .values(path=path, depth=depth)
+                        .execution_options(synchronize_session=False)
+                    )
+                await db.commit()
+                total += len(rows)
+            if total:
+                logger.info(f"Backfilled materialized paths for {total} comments")
+
+
+comment_thread_service = CommentThreadService()
@@ -0,0 +1,109 @@
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import select, update, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import get_sessionmaker
+from app.models.community import (
+    Community,
+    CommunityPost,
+    CommunityComment,
+    CommunityReaction,
+    CommunitySubscription,
+    REACTION_COUNTER_FIELDS,
+)
+
+logger = logging.getLogger("app.services.community")
+
+RECONCILE_LOCK_KEY = "community:counters:reconcile:lock"
+
+
+class CommunityService:
+    async def adjust_counter(
+        self, db: AsyncSession, model, row_id: int, field: str, delta: int
+    ) -> Optional[int]:
+        """
+        Atomically add `delta` to a denormalized counter column and return the new value
+        (None if the row does not exist). Decrements never go below zero.
+        The caller commits.
+        """
+        column = getattr(model, field)
+        if delta < 0:
+            new_value = case((column + delta > 0, column + delta), else_=0)
+        else:
+            new_value = column + delta
+        result = await db.execute(
+            update(model)
+            .where(model.id == row_id)
+            .values({field: new_value})
+            .returning(column)
+        )
+        return result.scalar_one_or_none()
+
+    async def reconcile_counters(self, db: AsyncSession) -> Dict[str, int]:
+        """
+        Recompute member/post/reaction/comment counters from the source tables,
+        touching only rows whose stored value has drifted.
+        """
+        member_count = (
+            select(func.count(CommunitySubscription.id))
+            .where(CommunitySubscription.community_id == Community.id)
+            .scalar_subquery()
+        )
+        post_count = (
+            select(func.count(CommunityPost.id))
+            .where(CommunityPost.community_id == Community.id, CommunityPost.is_deleted == False)
+            .scalar_subquery()
+        )
+        communities = await db.execute(
+            update(Community)
+            .where(or_(Community.member_count != member_count, Community.post_count != post_count))
+            .values(member_count=member_count, post_count=post_count)
+            .execution_options(synchronize_session=False)
+        )
+
+        def reaction_count(reaction_type: str):
+            return (
+                select(func.count(CommunityReaction.id))
+                .where(CommunityReaction.post_id == CommunityPost.id, CommunityReaction.reaction_type == reaction_type)
+                .scalar_subquery()
+            )
+
+        reaction_counts = {
+            field: reaction_count(reaction_type) for reaction_type, field in REACTION_COUNTER_FIELDS.items()
+        }
+        comment_count = (
+            select(func.count(CommunityComment.id))
+            .where(CommunityComment.post_id == CommunityPost.id, CommunityComment.is_deleted == False)
+            .scalar_subquery()
+        )
+        posts = await db.execute(
+            update(CommunityPost)
+            .where(or_(
+                CommunityPost.comment_count != comment_count,
+                *[getattr(CommunityPost, field) != count for field, count in reaction_counts.items()],
+            ))
+            .values(comment_count=comment_count, **reaction_counts)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        fixed = {"communities": communities.rowcount, "posts": posts.rowcount}
+        if fixed["communities"] or fixed["posts"]:
+            logger.info(f"Reconciled counters: {fixed}")
+        return fixed
+
+    async def run_reconciliation(self):
+        """Periodic job entry point; only one worker process reconciles per interval."""
+        if redis_manager.redis is not None:
+            if not await redis_manager.acquire_lock(RECONCILE_LOCK_KEY, settings.COUNTER_RECONCILE_INTERVAL_SECONDS):
+                return
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            await self.reconcile_counters(db)
+
+
+community_service = CommunityService()
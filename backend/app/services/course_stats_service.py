@@ -0,0 +1,273 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select, delete, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import dialect_insert, get_sessionmaker
+from app.db.query_batch import QueryBatch
+from app.models.attendance import Attendance
+from app.models.classroom import Classroom
+from app.models.course import Course
+from app.models.course_stats import CourseStats
+from app.models.enrollment import Enrollment
+from app.models.enums import ClassroomStatusEnum, TestStatusEnum
+from app.models.feedback import CourseRatingSummary
+from app.models.resource import Resource
+from app.models.resource_completion import ResourceCompletion
+from app.models.subject import Subject
+from app.models.test import Test
+
+logger = logging.getLogger("app.services.course_stats")
+
+DIRTY_KEY = "course_stats:dirty"  # members are "course:<id>", "subject:<id>" or "classroom:<id>"
+REFRESH_LOCK_KEY = "course_stats:refresh:lock"
+
+
+class CourseStatsService:
+    """
+    Maintains the `course_stats` rollup that every course-level dashboard reads.
+
+    Writes only record which course changed: routes add the course, subject or
+    classroom they touched to a Redis set (one SADD, no extra queries on the request
+    path) and a periodic job resolves those to courses and recomputes their rows from
+    the source tables. Rows older than COURSE_STATS_MAX_AGE_SECONDS are recomputed as
+    well, which keeps the 24h/7d windows current and covers changes made while Redis
+    was unavailable. A course without a row is computed on first read.
+    """
+
+    async def mark_dirty(
+        self,
+        course_id: Optional[int] = None,
+        subject_id: Optional[int] = None,
+        classroom_id: Optional[int] = None,
+    ):
+        members = [
+            f"{kind}:{key}"
+            for kind, key in (("course", course_id), ("subject", subject_id), ("classroom", classroom_id))
+            if key is not None
+        ]
+        if not members or redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.sadd(DIRTY_KEY, *members)
+        except Exception as e:
+            # The row is recomputed once it is older than COURSE_STATS_MAX_AGE_SECONDS anyway.
+            logger.warning(f"Failed to mark course stats dirty ({members}): {e}")
+
+    async def get(self, db: AsyncSession, course_id: int) -> Optional[CourseStats]:
+        """The stats row of a course, computed on the spot if it does not exist yet (None for unknown courses)."""
+        stats = await db.get(CourseStats, course_id)
+        if stats is None:
+            await self.refresh(course_id)
+            stats = await db.get(CourseStats, course_id, populate_existing=True)
+        return stats
+
+    async def compute(self, course_id: int) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        week_ago = now - timedelta(days=7)
+        day_ago = now - timedelta(days=1)
+        course_enrollments = Enrollment.course_id == course_id
+        course_subjects = Subject.course_id == course_id
+
+        batch = QueryBatch()
+        batch.first(
+            "enrollments",
+            select(
+                func.count().label("total"),
+                func.sum(case((Enrollment.progress_percent >= 100, 1), else_=0)).label("completed"),
+                func.sum(case((Enrollment.enrolled_at >= week_ago, 1), else_=0)).label("recent"),
+            )
+            .where(course_enrollments)
+        )
+        batch.all(
+            "progress",
+            select(
+                case(
+                    (Enrollment.progress_percent < 25, "0-25%"),
+                    (Enrollment.progress_percent < 50, "25-50%"),
+                    (Enrollment.progress_percent < 75, "50-75%"),
+                    (Enrollment.progress_percent < 100, "75-100%"),
+                    else_="Completed",
+                ).label("range"),
+                func.count().label("count"),
+            )
+            .where(course_enrollments)
+            .group_by("range")
+        )
+        attendees = (
+            select(func.count(func.distinct(Attendance.user_id)))
+            .select_from(Attendance)
+            .join(Classroom, Attendance.classroom_id == Classroom.id)
+            .join(Subject, Classroom.subject_id == Subject.id)
+            .where(course_subjects)
+        )
+        batch.scalar("active_students", attendees)
+        batch.scalar("active_students_7d", attendees.where(Attendance.joined_at >= week_ago))
+        batch.scalar(
+            "recent_activity_24h",
+            select(func.count())
+            .select_from(ResourceCompletion)
+            .join(Enrollment, ResourceCompletion.enrollment_id == Enrollment.id)
+            .where(course_enrollments, ResourceCompletion.completed_at >= day_ago)
+        )
+        batch.all(
+            "subjects",
+            select(
+                Subject.id,
+                Subject.title,
+                Subject.description,
+                func.count(Classroom.id).label("total_classes")
+            )
+            .outerjoin(Classroom, Classroom.subject_id == Subject.id)
+            .where(course_subjects)
+            .group_by(Subject.id, Subject.title, Subject.description)
+            .order_by(Subject.id)
+        )
+        batch.first(
+            "classes",
+            select(
+                func.count().label("total"),
+                func.sum(case((Classroom.status == ClassroomStatusEnum.completed.value, 1), else_=0)).label("completed"),
+                func.sum(case((Classroom.status == ClassroomStatusEnum.live.value, 1), else_=0)).label("live"),
+            )
+            .select_from(Classroom)
+            .join(Subject, Classroom.subject_id == Subject.id)
+            .where(course_subjects)
+        )
+        batch.first(
+            "tests",
+            select(
+                func.count().label("total"),
+                func.sum(case((Test.status == TestStatusEnum.published.value, 1), else_=0)).label("published"),
+            )
+            .select_from(Test)
+            .join(Subject, Test.subject_id == Subject.id)
+            .where(course_subjects)
+        )
+        batch.scalar(
+            "total_resources",
+            select(func.count())
+            .select_from(Resource)
+            .join(Subject, Resource.subject_id == Subject.id)
+            .where(course_subjects)
+        )
+        batch.first(
+            "rating",
+            select(CourseRatingSummary.rating_average, CourseRatingSummary.rating_count)
+            .where(CourseRatingSummary.course_id == course_id)
+        )
+        results = await batch.run()
+
+        enrollments, classes, tests, rating = (
+            results["enrollments"], results["classes"], results["tests"], results["rating"]
+        )
+        subjects = [
+            {
+                "subject_id": row.id,
+                "title": row.title,
+                "description": row.description,
+                "total_classes": row.total_classes or 0,
+            }
+            for row in results["subjects"]
+        ]
+        return {
+            "course_id": course_id,
+            "total_enrollments": enrollments.total or 0,
+            "completed_students": enrollments.completed or 0,
+            "recent_enrollments_7d": enrollments.recent or 0,
+            "progress_distribution": {row.range: row.count for row in results["progress"]},
+            "active_students": results["active_students"],
+            "active_students_7d": results["active_students_7d"],
+            "recent_activity_24h": results["recent_activity_24h"],
+            "total_subjects": len(subjects),
+            "total_classes": classes.total or 0,
+            "completed_classes": classes.completed or 0,
+            "live_classes": classes.live or 0,
+            "total_tests": tests.total or 0,
+            "published_tests": tests.published or 0,
+            "total_resources": results["total_resources"],
+            "subjects": subjects,
+            "rating_average": rating.rating_average if rating else None,
+            "rating_count": rating.rating_count if rating else 0,
+            "computed_at": now,
+        }
+
+    async def refresh(self, course_id: int):
+        """Recompute and store the row of one course."""
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            if await db.scalar(select(Course.id).where(Course.id == course_id)) is None:
+                # Deleted meanwhile; SQLite does not cascade the row away by itself.
+                await db.execute(delete(CourseStats).where(CourseStats.course_id == course_id))
+                await db.commit()
+                return
+
+            values = await self.compute(course_id)
+            stmt = dialect_insert(CourseStats).values(**values)
+            set_ = {field: stmt.excluded[field] for field in values if field != "course_id"}
+            set_["updated_at"] = func.now()
+            await db.execute(stmt.on_conflict_do_update(index_elements=["course_id"], set_=set_))
+            await db.commit()
+
+    async def _resolve(self, db: AsyncSession, members: Iterable[str]) -> Set[int]:
+        ids: Dict[str, Set[int]] = {"course": set(), "subject": set(), "classroom": set()}
+        for member in members:
+            kind, _, key = member.partition(":")
+            if kind in ids and key.isdigit():
+                ids[kind].add(int(key))
+
+        course_ids = ids["course"]
+        if ids["classroom"]:
+            result = await db.execute(select(Classroom.subject_id).where(Classroom.id.in_(ids["classroom"])))
+            ids["subject"].update(subject_id for subject_id in result.scalars() if subject_id is not None)
+        if ids["subject"]:
+            result = await db.execute(select(Subject.course_id).where(Subject.id.in_(ids["subject"])))
+            course_ids.update(course_id for course_id in result.scalars() if course_id is not None)
+        return course_ids
+
+    async def run_refresh(self):
+        """Periodic job: recompute dirty courses, then the oldest rows past their max age."""
+        redis = redis_manager.redis
+        if redis is not None:
+            if not await redis_manager.acquire_lock(
+                REFRESH_LOCK_KEY, max(settings.COURSE_STATS_REFRESH_INTERVAL_SECONDS * 4, 60)
+            ):
+                return
+
+        try:
+            batch_size = settings.COURSE_STATS_REFRESH_BATCH_SIZE
+            members = await redis.spop(DIRTY_KEY, batch_size) if redis is not None else []
+
+            async_session = get_sessionmaker()
+            async with async_session() as db:
+                course_ids = await self._resolve(db, members or [])
+                stale_before = datetime.utcnow() - timedelta(seconds=settings.COURSE_STATS_MAX_AGE_SECONDS)
+                result = await db.execute(
+                    select(CourseStats.course_id)
+                    .where(CourseStats.computed_at < stale_before)
+                    .order_by(CourseStats.computed_at)
+                    .limit(batch_size)
+                )
+                stale_ids = set(result.scalars()) - course_ids
+
+            refreshed = 0
+            for course_id in [*course_ids, *stale_ids]:
+                try:
+                    await self.refresh(course_id)
+                    refreshed += 1
+                except Exception as e:
+                    logger.error(f"Failed to refresh stats of course {course_id}: {e}")
+                    if redis is not None:
+                        await redis.sadd(DIRTY_KEY, f"course:{course_id}")
+            if refreshed:
+                logger.info(f"Refreshed stats of {refreshed} courses ({len(course_ids)} changed, {len(stale_ids)} stale)")
+        finally:
+            if redis is not None:
+                await redis_manager.release_lock(REFRESH_LOCK_KEY)
+
+
+course_stats_service = CourseStatsService()
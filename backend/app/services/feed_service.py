@@ -0,0 +1,219 @@
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select, desc
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.models.community import CommunityPost
+from app.models.enums import FeedSortEnum
+
+logger = logging.getLogger("app.services.feed")
+
+# Reddit-style hot ranking: every 45000s (12.5h) of age is worth one order of magnitude of engagement.
+HOT_EPOCH = 1704067200  # 2024-01-01T00:00:00Z
+HOT_DECAY_SECONDS = 45000
+COMMENT_WEIGHT = 2.0
+VIEW_WEIGHT = 0.05
+
+
+def _community_key(community_id: int, sort: FeedSortEnum) -> str:
+    return f"feed:community:{community_id}:{sort.value}"
+
+
+def _home_key(user_id: int, sort: FeedSortEnum) -> str:
+    return f"feed:home:{user_id}:{sort.value}"
+
+
+def engagement_score(post: CommunityPost) -> float:
+    return (
+        (post.like_count or 0)
+        - (post.dislike_count or 0)
+        + COMMENT_WEIGHT * (post.comment_count or 0)
+        + VIEW_WEIGHT * (post.view_count or 0)
+    )
+
+
+def hot_score(post: CommunityPost) -> float:
+    engagement = engagement_score(post)
+    order = math.log10(max(abs(engagement), 1))
+    sign = 1 if engagement > 0 else -1 if engagement < 0 else 0
+    created_at = post.created_at or datetime.now(timezone.utc)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return round(sign * order + (created_at.timestamp() - HOT_EPOCH) / HOT_DECAY_SECONDS, 7)
+
+
+class FeedService:
+    """
+    Maintains per-community sorted sets of post ids scored by hot and top rank.
+    Scores are recomputed for a single post whenever its counters change, so reading
+    a feed page is a ZREVRANGE instead of a full sort. Missing sets are rebuilt from
+    the database on first read.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return redis_manager.redis is not None
+
+    async def update_post(self, post: CommunityPost):
+        """Re-score one post in its community feeds. No-op for feeds that are not cached yet."""
+        if not self.enabled:
+            return
+        redis = redis_manager.redis
+        hot_key = _community_key(post.community_id, FeedSortEnum.hot)
+        top_key = _community_key(post.community_id, FeedSortEnum.top)
+        try:
+            if post.is_deleted:
+                await self.remove_post(post.community_id, post.id)
+                return
+            # Only touch sets that already exist: a partial set would hide older posts
+            # from the rebuild that happens on the next read.
+            if await redis.exists(hot_key, top_key) != 2:
+                return
+            limit = settings.FEED_MAX_POSTS_PER_COMMUNITY
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(hot_key, {post.id: hot_score(post)})
+                pipe.zadd(top_key, {post.id: engagement_score(post)})
+                pipe.zremrangebyrank(hot_key, 0, -limit - 1)
+                pipe.zremrangebyrank(top_key, 0, -limit - 1)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update feed score for post {post.id}: {e}")
+
+    async def update_posts(self, posts: Iterable[CommunityPost]):
+        for post in posts:
+            await self.update_post(post)
+
+    async def remove_post(self, community_id: int, post_id: int):
+        if not self.enabled:
+            return
+        async with redis_manager.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(_community_key(community_id, FeedSortEnum.hot), post_id)
+            pipe.zrem(_community_key(community_id, FeedSortEnum.top), post_id)
+            await pipe.execute()
+
+    async def drop_community(self, community_id: int):
+        if self.enabled:
+            await redis_manager.redis.delete(
+                _community_key(community_id, FeedSortEnum.hot),
+                _community_key(community_id, FeedSortEnum.top),
+            )
+
+    async def invalidate_home(self, user_id: int):
+        if self.enabled:
+            await redis_manager.redis.delete(
+                _home_key(user_id, FeedSortEnum.hot),
+                _home_key(user_id, FeedSortEnum.top),
+            )
+
+    async def _ensure_community(self, db: AsyncSession, community_id: int):
+        redis = redis_manager.redis
+        hot_key = _community_key(community_id, FeedSortEnum.hot)
+        top_key = _community_key(community_id, FeedSortEnum.top)
+        if await redis.exists(hot_key, top_key) == 2:
+            return
+
+        # Only the ranking columns of the best `limit` posts by engagement and by age:
+        # hot rank is recency plus log-engagement, so its top `limit` come from those two.
+        limit = settings.FEED_MAX_POSTS_PER_COMMUNITY
+        columns = select(
+            CommunityPost.id,
+            CommunityPost.created_at,
+            CommunityPost.like_count,
+            CommunityPost.dislike_count,
+            CommunityPost.comment_count,
+            CommunityPost.view_count,
+        ).where(
+            CommunityPost.community_id == community_id,
+            CommunityPost.is_deleted == False,
+        )
+        top = (await db.execute(columns.order_by(*self.fallback_order(FeedSortEnum.top)).limit(limit))).all()
+        if not top:
+            return
+        newest = (await db.execute(columns.order_by(desc(CommunityPost.created_at)).limit(limit))).all()
+        candidates = {post.id: post for post in [*top, *newest]}.values()
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(hot_key, top_key)
+            pipe.zadd(hot_key, {post.id: hot_score(post) for post in candidates})
+            pipe.zadd(top_key, {post.id: engagement_score(post) for post in top})
+            # Keep only the best `limit` entries of each ranking.
+            pipe.zremrangebyrank(hot_key, 0, -limit - 1)
+            await pipe.execute()
+        logger.info(f"Rebuilt feed for community {community_id} ({len(candidates)} candidate posts)")
+
+    def fallback_order(self, sort: FeedSortEnum) -> list:
+        """SQL ordering used when the feed cache is unavailable."""
+        if sort == FeedSortEnum.top:
+            engagement = (
+                CommunityPost.like_count
+                - CommunityPost.dislike_count
+                + COMMENT_WEIGHT * CommunityPost.comment_count
+                + VIEW_WEIGHT * CommunityPost.view_count
+            )
+            return [desc(engagement), desc(CommunityPost.created_at)]
+        return [desc(CommunityPost.created_at)]
+
+    async def fetch_posts(self, db: AsyncSession, post_ids: List[int]) -> List[CommunityPost]:
+        """Load posts by id, preserving the feed order and skipping deleted ones."""
+        if not post_ids:
+            return []
+        result = await db.execute(
+            select(CommunityPost)
+            .options(selectinload(CommunityPost.user))
+            .where(CommunityPost.id.in_(post_ids), CommunityPost.is_deleted == False)
+        )
+        posts = {post.id: post for post in result.scalars().all()}
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+    async def _page(self, key: str, skip: int, limit: int) -> List[int]:
+        ids = await redis_manager.redis.zrevrange(key, skip, skip + limit - 1)
+        return [int(post_id) for post_id in ids]
+
+    async def community_post_ids(
+        self, db: AsyncSession, community_id: int, sort: FeedSortEnum, skip: int, limit: int
+    ) -> Optional[List[int]]:
+        """Ranked post ids for one community, or None if the cache is unavailable."""
+        if not self.enabled or sort == FeedSortEnum.new:
+            return None
+        try:
+            await self._ensure_community(db, community_id)
+            return await self._page(_community_key(community_id, sort), skip, limit)
+        except Exception as e:
+            logger.warning(f"Feed cache unavailable for community {community_id}: {e}")
+            return None
+
+    async def home_post_ids(
+        self, db: AsyncSession, user_id: int, community_ids: List[int], sort: FeedSortEnum, skip: int, limit: int
+    ) -> Optional[List[int]]:
+        """
+        Ranked post ids merged across the user's subscriptions. The merged set is a
+        short-lived ZUNIONSTORE of the community sets.
+        """
+        if not self.enabled or sort == FeedSortEnum.new:
+            return None
+        if not community_ids:
+            return []
+        redis = redis_manager.redis
+        home_key = _home_key(user_id, sort)
+        try:
+            if not await redis.exists(home_key):
+                for community_id in community_ids:
+                    await self._ensure_community(db, community_id)
+                source_keys = [_community_key(community_id, sort) for community_id in community_ids]
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.zunionstore(home_key, source_keys)
+                    pipe.expire(home_key, settings.FEED_HOME_CACHE_SECONDS)
+                    await pipe.execute()
+            return await self._page(home_key, skip, limit)
+        except Exception as e:
+            logger.warning(f"Home feed cache unavailable for user {user_id}: {e}")
+            return None
+
+
+feed_service = FeedService()
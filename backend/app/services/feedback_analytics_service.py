@@ -0,0 +1,147 @@
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.models.feedback import AppFeedback, CourseFeedback, InstructorFeedback
+
+logger = logging.getLogger("app.services.feedback_analytics")
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+def _version_key(scope: str) -> str:
+    return f"feedback:analysis:version:{scope}"
+
+
+class FeedbackAnalyticsService:
+    """
+    Rating statistics for app, course and instructor feedback, computed with GROUP BY
+    aggregates instead of loading feedback rows. Results are cached in Redis under a
+    per-scope version number that every feedback write bumps.
+    """
+
+    async def _rating_buckets(self, db: AsyncSession, model, *filters) -> Dict[Optional[int], int]:
+        result = await db.execute(
+            select(model.rating, func.count())
+            .where(*filters)
+            .group_by(model.rating)
+        )
+        return {rating: count for rating, count in result.all()}
+
+    def _summarize(self, buckets: Dict[Optional[int], int]) -> Dict[str, Any]:
+        distribution = {rating: buckets.get(rating, 0) for rating in RATINGS}
+        rated = sum(distribution.values())
+        rating_sum = sum(rating * count for rating, count in distribution.items())
+        return {
+            "total_reviews": sum(buckets.values()),
+            "average_rating": round(rating_sum / rated, 1) if rated else 0,
+            "rating_distribution": distribution,
+            # Rule-based sentiment: 4-5 positive, 3 neutral, 1-2 negative
+            "sentiment_analysis": {
+                "positive": distribution[4] + distribution[5],
+                "neutral": distribution[3],
+                "negative": distribution[1] + distribution[2],
+            },
+        }
+
+    async def _trend(self, db: AsyncSession, model, days: int, *filters) -> Dict[str, Any]:
+        """Daily review counts/averages over the window, plus the change against the previous window."""
+        now = datetime.utcnow()
+        window_start = now - timedelta(days=days)
+        previous_start = window_start - timedelta(days=days)
+
+        day = func.date(model.created_at)
+        result = await db.execute(
+            select(day.label("day"), func.count(), func.avg(model.rating))
+            .where(model.created_at >= window_start, *filters)
+            .group_by(day)
+            .order_by(day)
+        )
+        series = [
+            {
+                "date": str(row_day),
+                "reviews": count,
+                "average_rating": round(float(avg), 2) if avg is not None else None,
+            }
+            for row_day, count, avg in result.all()
+        ]
+
+        result = await db.execute(
+            select(func.count(), func.avg(model.rating))
+            .where(model.created_at >= previous_start, model.created_at < window_start, *filters)
+        )
+        previous_count, previous_avg = result.one()
+        result = await db.execute(
+            select(func.count(), func.avg(model.rating))
+            .where(model.created_at >= window_start, *filters)
+        )
+        current_count, current_avg = result.one()
+
+        change = None
+        if current_avg is not None and previous_avg is not None:
+            change = round(float(current_avg) - float(previous_avg), 2)
+
+        return {
+            "window_days": days,
+            "reviews": current_count,
+            "average_rating": round(float(current_avg), 2) if current_avg is not None else None,
+            "previous_reviews": previous_count,
+            "previous_average_rating": round(float(previous_avg), 2) if previous_avg is not None else None,
+            "average_rating_change": change,
+            "daily": series,
+        }
+
+    async def _analyze(self, db: AsyncSession, scope: str, model, days: int, *filters) -> Dict[str, Any]:
+        cache_key = None
+        if redis_manager.redis is not None:
+            try:
+                version = await redis_manager.get(_version_key(scope)) or "0"
+                cache_key = f"feedback:analysis:{scope}:v{version}:d{days}"
+                cached = await redis_manager.get_json(cache_key)
+                if cached is not None:
+                    # JSON object keys are strings; restore the integer rating keys.
+                    cached["rating_distribution"] = {int(k): v for k, v in cached["rating_distribution"].items()}
+                    return cached
+            except Exception as e:
+                logger.warning(f"Feedback analysis cache read failed for {scope}: {e}")
+                cache_key = None
+
+        analysis = self._summarize(await self._rating_buckets(db, model, *filters))
+        analysis["trend"] = await self._trend(db, model, days, *filters)
+
+        if cache_key:
+            try:
+                await redis_manager.set_json(cache_key, analysis, expire=settings.FEEDBACK_ANALYSIS_CACHE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Feedback analysis cache write failed for {scope}: {e}")
+        return analysis
+
+    async def app_analysis(self, db: AsyncSession, days: int = 30) -> Dict[str, Any]:
+        return await self._analyze(db, "app", AppFeedback, days)
+
+    async def course_analysis(self, db: AsyncSession, course_id: int, days: int = 30) -> Dict[str, Any]:
+        return await self._analyze(
+            db, f"course:{course_id}", CourseFeedback, days, CourseFeedback.course_id == course_id
+        )
+
+    async def instructor_analysis(self, db: AsyncSession, instructor_id: int, days: int = 30) -> Dict[str, Any]:
+        return await self._analyze(
+            db, f"instructor:{instructor_id}", InstructorFeedback, days, InstructorFeedback.instructor_id == instructor_id
+        )
+
+    async def invalidate(self, scope: str):
+        """Bump the scope's version so cached analyses for it are no longer read."""
+        if redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.incr(_version_key(scope))
+        except Exception as e:
+            logger.warning(f"Failed to invalidate feedback analysis cache for {scope}: {e}")
+
+
+feedback_analytics_service = FeedbackAnalyticsService()
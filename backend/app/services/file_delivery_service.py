@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import hmac
+import math
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+# Only content-addressed blob keys (originals and their renditions, <sha>.thumb.jpg) can
+# be requested, which also rules out path traversal.
+BLOB_KEY_RE = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9-]{1,20})?(\.[a-z0-9]{1,10})?$")
+# Stored references to blobs: "/files/<key>", possibly with an old signature, or the
+# "/static/blobs/<key>" paths handed out before blobs moved out of the static mount.
+BLOB_URL_RE = re.compile(r"^/(?:files|static/blobs)/([^?]+)(?:\?.*)?$")
+
+
+class FileDeliveryService:
+    """
+    Signs and verifies /files URLs. A URL carries its expiry and an HMAC of
+    "<key>:<expiry>", so serving a request (or each of the many range requests of a
+    video) needs no database lookup. Expiries are rounded up to a bucket boundary so
+    every viewer in the same window gets an identical, cacheable URL.
+    """
+
+    def _key(self) -> bytes:
+        return (settings.FILE_URL_SIGNING_KEY or settings.SECRET_KEY).encode()
+
+    def _signature(self, key: str, expires: int) -> str:
+        digest = hmac.new(self._key(), f"{key}:{expires}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def parse_key(self, key: str) -> Optional[str]:
+        """The sha256 named by a blob key, or None if the key is not a blob key."""
+        match = BLOB_KEY_RE.match(key)
+        return match.group(1) if match else None
+
+    def reference(self, key: str) -> str:
+        """Stable, unsigned reference to a blob, for storing in the database."""
+        return f"/files/{key}"
+
+    def key_of(self, url: Optional[str]) -> Optional[str]:
+        """The blob key behind a stored reference or signed URL, None for other URLs."""
+        match = BLOB_URL_RE.match(url or "")
+        if not match or self.parse_key(match.group(1)) is None:
+            return None
+        return match.group(1)
+
+    def sign_url(self, url: Optional[str]) -> Optional[str]:
+        """A freshly signed URL for a stored blob reference; other URLs are returned as is."""
+        key = self.key_of(url)
+        return self.sign(key)[0] if key else url
+
+    def sign(self, key: str, ttl: Optional[int] = None) -> Tuple[str, datetime]:
+        ttl = ttl or settings.FILE_URL_TTL_SECONDS
+        bucket = max(settings.FILE_URL_TTL_BUCKET_SECONDS, 1)
+        expires = math.ceil((time.time() + ttl) / bucket) * bucket
+        url = f"/files/{key}?exp={expires}&sig={self._signature(key, expires)}"
+        return url, datetime.fromtimestamp(expires, tz=timezone.utc)
+
+    def verify(self, key: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(key, expires), signature)
+
+
+file_delivery_service = FileDeliveryService()
@@ -1,6 +1,7 @@
 import logging
 import google.generativeai as genai
 from typing import List, Optional
+from app.core import profiling
 from app.core.config import settings
 
 logger = logging.getLogger("app.services.llm")
@@ -21,7 +22,8 @@ class LLMService:
 
         try:
             chat = self.model.start_chat(history=history)
-            response = await chat.send_message_async(prompt)
+            with profiling.track("llm"):
+                response = await chat.send_message_async(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"LLM Generation Error: {e}")
@@ -33,7 +35,8 @@ class LLMService:
 
         try:
             prompt = f"Generate a short, concise title (max 5 words) for a chat session that starts with this message: '{first_message}'. Do not use quotes."
-            response = await self.model.generate_content_async(prompt)
+            with profiling.track("llm"):
+                response = await self.model.generate_content_async(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Title Generation Error: {e}")
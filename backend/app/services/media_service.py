@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import os
+import shutil
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from redis.exceptions import ResponseError
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import get_sessionmaker
+from app.models.blob import Blob
+from app.models.resource import Resource
+from app.models.user import User
+from app.services.blob_store import blob_store, variant_key
+from app.services.upload_service import upload_service
+from app.utils.media import media_kind, process_media
+
+logger = logging.getLogger("app.services.media")
+
+STREAM_KEY = "media:jobs"
+GROUP_NAME = "media-processors"
+REQUEUE_LOCK_KEY = "media:requeue:lock"
+REQUEUE_BATCH_SIZE = 500
+
+# Which rendition each denormalized column prefers, best first.
+RESOURCE_THUMBNAIL = ("thumb", "medium")
+PHOTO_THUMBNAIL = ("avatar-256", "avatar-128", "thumb")
+BANNER_THUMBNAIL = ("medium", "thumb")
+
+
+class MediaService:
+    """
+    Produces lightweight renditions of uploaded media: thumbnails and avatar sizes
+    for images, page counts and a first-page preview for PDFs, duration and a poster
+    frame for videos. New blobs are queued on a Redis stream; each API worker consumes
+    it and runs the CPU-heavy work in a small process pool so the event loop and the
+    GIL stay free for requests.
+    """
+
+    def __init__(self):
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=settings.MEDIA_PROCESSING_WORKERS)
+        return self._pool
+
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def enqueue(self, blob: Blob):
+        """Queue a freshly stored blob; a no-op for content that has nothing to render."""
+        if blob.processing_status != "pending" or redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.xadd(STREAM_KEY, {"sha256": blob.sha256})
+        except Exception as e:
+            # The upload itself succeeded; the blob stays pending until requeue_pending picks it up.
+            logger.error(f"Failed to queue media processing for {blob.sha256}: {e}")
+
+    def apply_to_resource(self, resource: Resource, blob: Optional[Blob]):
+        """Copy processed metadata onto a resource being created."""
+        if blob is None or blob.processing_status != "processed":
+            return
+        info = blob.media_info or {}
+        resource.thumbnail_url = blob_store.variant_reference(blob, *RESOURCE_THUMBNAIL)
+        resource.page_count = info.get("page_count")
+        resource.duration_seconds = info.get("duration_seconds")
+
+    async def apply_to_user(self, db, user: User, changed: Dict[str, Optional[str]]):
+        """Store a new photo/banner as a blob reference and point the thumbnails at its renditions."""
+        if "photo" in changed:
+            blob = await blob_store.resolve_url(db, changed["photo"])
+            if blob is not None:
+                user.photo = blob_store.reference(blob)  # the uploaded URL is signed and expires
+            user.photo_thumbnail = blob_store.variant_reference(blob, *PHOTO_THUMBNAIL)
+        if "banner_image" in changed:
+            blob = await blob_store.resolve_url(db, changed["banner_image"])
+            if blob is not None:
+                user.banner_image = blob_store.reference(blob)
+            user.banner_thumbnail = blob_store.variant_reference(blob, *BANNER_THUMBNAIL)
+
+    # --- Worker ---
+
+    async def run_worker(self):
+        redis = redis_manager.redis
+        if redis is None:
+            logger.warning("Redis not connected. Media processing worker disabled.")
+            return
+
+        try:
+            await redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        try:
+            # Re-deliver entries this consumer read but never acknowledged (e.g. before a restart).
+            read_from = "0"
+            while True:
+                response = await redis.xreadgroup(
+                    GROUP_NAME,
+                    self.consumer_name,
+                    {STREAM_KEY: read_from},
+                    count=settings.MEDIA_PROCESSING_WORKERS,
+                    block=None if read_from != ">" else settings.SUBMISSION_QUEUE_BLOCK_MS,
+                )
+                entries = response[0][1] if response else []
+
+                if read_from != ">" and not entries:
+                    read_from = ">"
+                    continue
+
+                if not entries and read_from == ">":
+                    entries = await self._claim_stale_entries()
+                    if not entries:
+                        await asyncio.sleep(0.1)
+                        continue
+
+                await asyncio.gather(*(self._handle(entry_id, fields) for entry_id, fields in entries))
+                if read_from != ">":
+                    # Walk the pending history once; entries that failed again are left to XAUTOCLAIM.
+                    read_from = entries[-1][0]
+        finally:
+            self._shutdown_pool()
+
+    async def _claim_stale_entries(self) -> List[Tuple[str, Dict[str, str]]]:
+        result = await redis_manager.redis.xautoclaim(
+            STREAM_KEY,
+            GROUP_NAME,
+            self.consumer_name,
+            min_idle_time=settings.MEDIA_PROCESSING_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=settings.MEDIA_PROCESSING_WORKERS,
+        )
+        return [entry for entry in result[1] if entry and entry[1]]
+
+    async def _handle(self, entry_id: str, fields: Dict[str, str]):
+        """
+        Process one queue entry. Media that cannot be rendered is marked inside
+        process(); anything raised from it (database, storage) is transient, so the
+        entry stays pending for XAUTOCLAIM until MEDIA_PROCESSING_MAX_DELIVERIES.
+        """
+        sha256 = fields.get("sha256")
+        try:
+            await self.process(sha256)
+        except Exception as e:
+            redis = redis_manager.redis
+            pending = await redis.xpending_range(STREAM_KEY, GROUP_NAME, min=entry_id, max=entry_id, count=1)
+            deliveries = pending[0]["times_delivered"] if pending else 0
+            if deliveries < settings.MEDIA_PROCESSING_MAX_DELIVERIES:
+                logger.error(
+                    f"Media processing of {sha256} failed (delivery {deliveries}), leaving it for a retry: {e}",
+                    exc_info=True,
+                )
+                return
+            logger.error(f"Media processing of {sha256} failed {deliveries} times, giving up: {e}", exc_info=True)
+            await self._mark_failed(sha256)
+        async with redis_manager.redis.pipeline(transaction=False) as pipe:
+            pipe.xack(STREAM_KEY, GROUP_NAME, entry_id)
+            pipe.xdel(STREAM_KEY, entry_id)
+            await pipe.execute()
+
+    async def _mark_failed(self, sha256: str):
+        try:
+            async_session = get_sessionmaker()
+            async with async_session() as db:
+                await db.execute(
+                    update(Blob)
+                    .where(Blob.sha256 == sha256, Blob.processing_status == "pending")
+                    .values(processing_status="failed")
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            # Still pending, so requeue_pending will try it again.
+            logger.error(f"Could not mark media {sha256} as failed: {e}")
+
+    async def requeue_pending(self):
+        """
+        Periodic job: queue again blobs that have been pending for longer than
+        MEDIA_REQUEUE_GRACE_SECONDS without an entry on the stream, i.e. whose enqueue
+        failed or whose entry was lost. One worker runs it per interval.
+        """
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        if not await redis_manager.acquire_lock(REQUEUE_LOCK_KEY, settings.MEDIA_REQUEUE_INTERVAL_SECONDS):
+            return
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.MEDIA_REQUEUE_GRACE_SECONDS)
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            result = await db.execute(
+                select(Blob.sha256)
+                .where(Blob.processing_status == "pending", Blob.created_at < cutoff)
+                .order_by(Blob.created_at)
+                .limit(REQUEUE_BATCH_SIZE)
+            )
+            stale = result.scalars().all()
+        if not stale:
+            return
+
+        # Entries are deleted once handled, so the stream only holds outstanding work.
+        queued = {fields.get("sha256") for _, fields in await redis.xrange(STREAM_KEY)}
+        missing = [sha256 for sha256 in stale if sha256 not in queued]
+        if missing:
+            async with redis.pipeline(transaction=False) as pipe:
+                for sha256 in missing:
+                    pipe.xadd(STREAM_KEY, {"sha256": sha256})
+                await pipe.execute()
+            logger.info(f"Re-queued {len(missing)} pending media blobs")
+
+    async def process(self, sha256: str):
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            blob = await db.get(Blob, sha256)
+            if blob is None or blob.processing_status != "pending":
+                return  # collected meanwhile, or a duplicate queue entry
+            if not media_kind(blob.content_type):
+                await self._finish(db, blob, "skipped")
+                return
+
+            backend = blob_store.backend
+            local_copy = None
+            if hasattr(backend, "path"):
+                source = backend.path(blob.storage_key)
+            else:
+                local_copy = source = os.path.join(upload_service.partial_dir, f"media-{uuid4().hex}")
+                await backend.download(blob.storage_key, local_copy)
+
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self.pool, process_media, source, blob.content_type, settings.MEDIA_PROCESSING_MAX_PIXELS
+                )
+            except ImportError as e:
+                logger.warning(f"Cannot process {sha256}, missing optional dependency: {e}")
+                await self._finish(db, blob, "skipped")
+                return
+            except Exception as e:
+                logger.warning(f"Cannot process {sha256} ({blob.content_type}): {e}")
+                await self._finish(db, blob, "failed")
+                return
+            finally:
+                if local_copy and os.path.exists(local_copy):
+                    await run_in_threadpool(os.remove, local_copy)
+
+            try:
+                variants = {}
+                for name, path in result["variants"].items():
+                    key = variant_key(blob.storage_key, name)
+                    await backend.put(path, key, "image/jpeg")
+                    variants[name] = key
+            finally:
+                await run_in_threadpool(shutil.rmtree, result["work_dir"], True)
+
+            await self._finish(db, blob, "processed", result["info"], variants)
+
+    async def _finish(self, db, blob: Blob, status: str, info: Optional[Dict] = None, variants: Optional[Dict] = None):
+        blob.processing_status = status
+        blob.media_info = info or None
+        blob.variants = variants or None
+        if status == "processed":
+            await self._denormalize(db, blob)
+        await db.commit()
+        logger.info(f"Media {blob.sha256} {status} ({len(variants or {})} variants)")
+
+    async def _denormalize(self, db, blob: Blob):
+        """Push rendition URLs and metadata to the rows that reference the blob."""
+        info = blob.media_info or {}
+        await db.execute(
+            update(Resource)
+            .where(Resource.blob_sha256 == blob.sha256)
+            .values(
+                thumbnail_url=blob_store.variant_reference(blob, *RESOURCE_THUMBNAIL),
+                page_count=info.get("page_count"),
+                duration_seconds=info.get("duration_seconds"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        reference = blob_store.reference(blob)
+        for column, thumbnail, names in (
+            (User.photo, User.photo_thumbnail, PHOTO_THUMBNAIL),
+            (User.banner_image, User.banner_thumbnail, BANNER_THUMBNAIL),
+        ):
+            variant = blob_store.variant_reference(blob, *names)
+            if variant:
+                await db.execute(
+                    update(User)
+                    .where(column == reference)
+                    .values({thumbnail: variant})
+                    .execution_options(synchronize_session=False)
+                )
+
+
+media_service = MediaService()
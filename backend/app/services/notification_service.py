@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.notification import Notification
 from app.db.database import get_sessionmaker
+from app.core import metrics
 import logging
 
 logger = logging.getLogger("app.services.notification")
@@ -26,6 +27,7 @@ class NotificationService:
             )
             db.add(notification)
             await db.commit()
+            metrics.NOTIFICATIONS_SENT.labels(notification_type).inc()
             logger.info(f"Notification created for user {user_id}: {title}")
     
     async def create_bulk_notifications(self, user_ids: list, title: str, message: str, notification_type: str = "info"):
@@ -43,14 +45,15 @@ class NotificationService:
             ]
             db.add_all(notifications)
             await db.commit()
+            metrics.NOTIFICATIONS_SENT.labels(notification_type).inc(len(notifications))
             logger.info(f"Bulk notifications created for {len(user_ids)} users: {title}")
             
-    async def notify_class_starting(self, classroom_id: int, classroom_title: str, user_ids: list):
+    async def notify_class_starting(self, classroom_id: int, classroom_title: str, user_ids: list, minutes: int = 10):
         """Notify students that a class is starting soon."""
         await self.create_bulk_notifications(
             user_ids=user_ids,
             title="Class Starting Soon",
-            message=f"Your class '{classroom_title}' is starting in 10 minutes!",
+            message=f"Your class '{classroom_title}' is starting in {minutes} minute{'s' if minutes != 1 else ''}!",
             notification_type="class"
         )
             
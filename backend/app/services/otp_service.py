@@ -0,0 +1,112 @@
+import hashlib
+import hmac
+from typing import Optional, Tuple
+
+from app.core import security
+from app.core.config import settings
+from app.core.exceptions import ExternalServiceError
+from app.core.redis import redis_manager
+
+
+def _email_id(email: str) -> str:
+    # Keys hold a digest rather than the address itself.
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+def _otp_key(email: str) -> str:
+    return f"otp:reset:{_email_id(email)}"
+
+
+def _rate_key(action: str, email: str) -> str:
+    return f"otp:rate:{action}:{_email_id(email)}"
+
+
+class OTPService:
+    """
+    Password-reset OTPs in Redis instead of the users table. Each email has one hash
+    {otp (HMAC), user_id, attempts, verified} that expires after OTP_EXPIRY_MINUTES.
+    Guesses are counted with HINCRBY before comparing, so concurrent guesses cannot
+    exceed OTP_MAX_ATTEMPTS, and per-email rate limits are checked before the caller
+    touches the database at all.
+    """
+
+    # verify()/consume() outcomes
+    VERIFIED = "verified"
+    UNVERIFIED = "unverified"
+    INVALID = "invalid"
+    EXPIRED = "expired"
+    LOCKED = "locked"
+
+    @property
+    def redis(self):
+        if redis_manager.redis is None:
+            raise ExternalServiceError("Redis", "OTP store unavailable")
+        return redis_manager.redis
+
+    def _digest(self, email: str, otp: str) -> str:
+        message = f"{_email_id(email)}:{otp}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    async def allow(self, action: str, email: str, limit: int) -> bool:
+        """Fixed-window counter per email and action; False once `limit` is exceeded."""
+        key = _rate_key(action, email)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, settings.OTP_RATE_WINDOW_SECONDS, nx=True)
+            count, _ = await pipe.execute()
+        return count <= limit
+
+    async def issue(self, email: str, user_id: int) -> str:
+        """Create a fresh OTP for `email`, replacing any outstanding one."""
+        otp = security.generate_otp()
+        key = _otp_key(email)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={
+                "otp": self._digest(email, otp),
+                "user_id": str(user_id),
+                "attempts": "0",
+                "verified": "0",
+            })
+            pipe.expire(key, settings.OTP_EXPIRY_MINUTES * 60)
+            await pipe.execute()
+        return otp
+
+    async def verify(self, email: str, otp: str) -> Tuple[str, int]:
+        """Check a guess. Returns (outcome, attempts remaining)."""
+        key = _otp_key(email)
+        if not await self.redis.exists(key):
+            return self.EXPIRED, 0
+        attempts = await self.redis.hincrby(key, "attempts", 1)
+        stored = await self.redis.hget(key, "otp")
+        if stored is None:
+            # Expired between the two calls, so HINCRBY created a stray hash; drop it.
+            await self.redis.delete(key)
+            return self.EXPIRED, 0
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            await self.redis.delete(key)
+            return self.LOCKED, 0
+        if not hmac.compare_digest(stored, self._digest(email, otp)):
+            return self.INVALID, settings.OTP_MAX_ATTEMPTS - attempts
+        await self.redis.hset(key, "verified", "1")
+        return self.VERIFIED, settings.OTP_MAX_ATTEMPTS - attempts
+
+    async def consume(self, email: str, otp: str) -> Tuple[str, Optional[int]]:
+        """
+        Use up a verified OTP. Returns (outcome, user id on success). The OTP is deleted
+        on success, so of several concurrent resets only one gets VERIFIED.
+        """
+        key = _otp_key(email)
+        data = await self.redis.hgetall(key)
+        if not data or "otp" not in data:
+            return self.EXPIRED, None
+        if data.get("verified") != "1":
+            return self.UNVERIFIED, None
+        if not hmac.compare_digest(data["otp"], self._digest(email, otp)):
+            return self.INVALID, None
+        if not await self.redis.delete(key):
+            return self.EXPIRED, None
+        return self.VERIFIED, int(data["user_id"])
+
+
+otp_service = OTPService()
@@ -10,6 +10,7 @@ from app.models.submission import Submission
 from app.models.test import Test
 from app.models.resource import Resource
 from app.models.resource_completion import ResourceCompletion
+from app.services.course_stats_service import course_stats_service
 
 class ProgressService:
     async def calculate_course_progress(self, db: AsyncSession, user_id: int, course_id: int) -> Dict[str, Any]:
@@ -27,6 +28,9 @@ class ProgressService:
         if not enrollment:
             return {"error": "Not enrolled in this course"}
         
+        # Totals are counted live, not read from the lagging course stats rollup: the
+        # progress stored below must match the course as it is now.
+
         # Get total subjects
         result = await db.execute(
             select(func.count()).select_from(Subject).where(Subject.course_id == course_id)
@@ -107,9 +111,12 @@ class ProgressService:
         overall_progress = sum(progress_factors) / len(progress_factors) if progress_factors else 0
         
         # Update enrollment progress
+        progress_changed = enrollment.progress_percent != overall_progress
         enrollment.progress_percent = overall_progress
         db.add(enrollment)
         await db.commit()
+        if progress_changed:
+            await course_stats_service.mark_dirty(course_id=course_id)
         
         return {
             "course_id": course_id,
@@ -0,0 +1,131 @@
+from typing import Dict, Optional
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, case
+
+from app.core.redis import redis_manager
+from app.db.database import dialect_insert, get_sessionmaker
+from app.models.feedback import (
+    CourseFeedback,
+    InstructorFeedback,
+    CourseRatingSummary,
+    InstructorRatingSummary,
+)
+
+logger = logging.getLogger("app.services.rating_summary")
+
+RATINGS = (1, 2, 3, 4, 5)
+
+
+class RatingSummaryService:
+    """
+    Keeps per-course and per-instructor rating summaries in step with feedback writes.
+    Every change is applied as a delta through INSERT ... ON CONFLICT DO UPDATE, so
+    concurrent reviews never overwrite each other and no feedback rows are read.
+    """
+
+    def _deltas(self, old_rating: Optional[int], new_rating: Optional[int]) -> Dict[str, int]:
+        deltas = {"rating_count": 0, "rating_sum": 0}
+        deltas.update({f"rating_{rating}": 0 for rating in RATINGS})
+        if old_rating is not None:
+            deltas["rating_count"] -= 1
+            deltas["rating_sum"] -= old_rating
+            deltas[f"rating_{old_rating}"] -= 1
+        if new_rating is not None:
+            deltas["rating_count"] += 1
+            deltas["rating_sum"] += new_rating
+            deltas[f"rating_{new_rating}"] += 1
+        return deltas
+
+    async def _apply(self, db: AsyncSession, summary_model, key_field: str, key: int, deltas: Dict[str, int]):
+        if not any(deltas.values()):
+            return
+        count = deltas["rating_count"]
+        stmt = dialect_insert(summary_model).values(
+            **{key_field: key},
+            **deltas,
+            rating_average=(deltas["rating_sum"] / count) if count > 0 else None,
+        )
+        new_count = getattr(summary_model, "rating_count") + stmt.excluded.rating_count
+        new_sum = getattr(summary_model, "rating_sum") + stmt.excluded.rating_sum
+        set_ = {
+            field: getattr(summary_model, field) + stmt.excluded[field]
+            for field in deltas
+        }
+        set_["rating_average"] = case((new_count > 0, new_sum * 1.0 / new_count), else_=None)
+        set_["updated_at"] = func.now()
+        await db.execute(stmt.on_conflict_do_update(index_elements=[key_field], set_=set_))
+
+    async def record_course_rating(
+        self, db: AsyncSession, course_id: int, old_rating: Optional[int] = None, new_rating: Optional[int] = None
+    ):
+        """Apply a create (new only), update (old and new) or delete (old only). The caller commits."""
+        await self._apply(db, CourseRatingSummary, "course_id", course_id, self._deltas(old_rating, new_rating))
+
+    async def record_instructor_rating(
+        self, db: AsyncSession, instructor_id: int, old_rating: Optional[int] = None, new_rating: Optional[int] = None
+    ):
+        await self._apply(
+            db, InstructorRatingSummary, "instructor_id", instructor_id, self._deltas(old_rating, new_rating)
+        )
+
+    async def get_instructor_summary(self, db: AsyncSession, instructor_id: int) -> Optional[InstructorRatingSummary]:
+        return await db.get(InstructorRatingSummary, instructor_id)
+
+    async def get_course_summary(self, db: AsyncSession, course_id: int) -> Optional[CourseRatingSummary]:
+        result = await db.execute(select(CourseRatingSummary).where(CourseRatingSummary.course_id == course_id))
+        return result.scalars().first()
+
+    async def _rebuild(self, db: AsyncSession, feedback_model, key_column, summary_model, key_field: str) -> int:
+        await db.execute(delete(summary_model))
+        result = await db.execute(
+            select(key_column, feedback_model.rating, func.count())
+            .where(feedback_model.rating.between(1, 5))
+            .group_by(key_column, feedback_model.rating)
+        )
+        rows: Dict[int, Dict[str, int]] = {}
+        for key, rating, count in result.all():
+            row = rows.setdefault(key, self._deltas(None, None))
+            row["rating_count"] += count
+            row["rating_sum"] += rating * count
+            row[f"rating_{rating}"] += count
+        for key, row in rows.items():
+            db.add(summary_model(
+                **{key_field: key},
+                **row,
+                rating_average=row["rating_sum"] / row["rating_count"],
+            ))
+        return len(rows)
+
+    async def rebuild(self, db: AsyncSession) -> Dict[str, int]:
+        """Recompute every summary from the feedback tables."""
+        courses = await self._rebuild(
+            db, CourseFeedback, CourseFeedback.course_id, CourseRatingSummary, "course_id"
+        )
+        instructors = await self._rebuild(
+            db, InstructorFeedback, InstructorFeedback.instructor_id, InstructorRatingSummary, "instructor_id"
+        )
+        await db.commit()
+        logger.info(f"Rebuilt rating summaries for {courses} courses and {instructors} instructors")
+        return {"courses": courses, "instructors": instructors}
+
+    async def ensure_summaries(self):
+        """One-shot backfill for databases that have feedback but no summaries yet."""
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            has_summaries = await db.scalar(select(func.count()).select_from(CourseRatingSummary)) or \
+                await db.scalar(select(func.count()).select_from(InstructorRatingSummary))
+            if has_summaries:
+                return
+            has_feedback = await db.scalar(select(func.count()).select_from(CourseFeedback)) or \
+                await db.scalar(select(func.count()).select_from(InstructorFeedback))
+            if not has_feedback:
+                return
+            if redis_manager.redis is not None:
+                if not await redis_manager.acquire_lock("rating_summaries:backfill:lock", 600):
+                    return
+            await self.rebuild(db)
+
+
+rating_summary_service = RatingSummaryService()
@@ -0,0 +1,88 @@
+import logging
+from typing import Dict, List
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import dialect_insert
+from app.models.community import CommunityPost, CommunityReaction, REACTION_COUNTER_FIELDS
+from app.models.enums import ReactionTypeEnum
+from app.services.community_service import community_service
+
+logger = logging.getLogger("app.services.reaction")
+
+# Reactions a user cannot hold at the same time on one post
+EXCLUSIVE_REACTIONS = {
+    ReactionTypeEnum.like.value: ReactionTypeEnum.dislike.value,
+    ReactionTypeEnum.dislike.value: ReactionTypeEnum.like.value,
+}
+
+
+class ReactionService:
+    """
+    Post reactions backed by the unique (post_id, user_id, reaction_type) constraint.
+    Adding is INSERT ... ON CONFLICT DO NOTHING and removing is DELETE ... RETURNING, so
+    the post counter only moves when a row really changed; repeated or concurrent
+    requests are no-ops instead of duplicates. The caller commits.
+    """
+
+    async def add(self, db: AsyncSession, post_id: int, user_id: int, reaction_type: str) -> bool:
+        """Returns True if the reaction was added, False if the user already had it."""
+        result = await db.execute(
+            dialect_insert(CommunityReaction)
+            .values(post_id=post_id, user_id=user_id, reaction_type=reaction_type)
+            .on_conflict_do_nothing(index_elements=["post_id", "user_id", "reaction_type"])
+            .returning(CommunityReaction.id)
+        )
+        if result.scalar_one_or_none() is None:
+            return False
+        await community_service.adjust_counter(
+            db, CommunityPost, post_id, REACTION_COUNTER_FIELDS[reaction_type], 1
+        )
+        opposite = EXCLUSIVE_REACTIONS.get(reaction_type)
+        if opposite:
+            await self.remove(db, post_id, user_id, opposite)
+        return True
+
+    async def remove(self, db: AsyncSession, post_id: int, user_id: int, reaction_type: str) -> bool:
+        """Returns True if the reaction was removed, False if the user did not have it."""
+        result = await db.execute(
+            delete(CommunityReaction)
+            .where(
+                CommunityReaction.post_id == post_id,
+                CommunityReaction.user_id == user_id,
+                CommunityReaction.reaction_type == reaction_type,
+            )
+            .returning(CommunityReaction.id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.scalar_one_or_none() is None:
+            return False
+        await community_service.adjust_counter(
+            db, CommunityPost, post_id, REACTION_COUNTER_FIELDS[reaction_type], -1
+        )
+        return True
+
+    async def toggle(self, db: AsyncSession, post_id: int, user_id: int, reaction_type: str) -> bool:
+        """Remove the reaction if present, otherwise add it. Returns True if it is now set."""
+        if await self.remove(db, post_id, user_id, reaction_type):
+            return False
+        await self.add(db, post_id, user_id, reaction_type)
+        return True
+
+    async def user_reactions(self, db: AsyncSession, user_id: int, post_ids: List[int]) -> Dict[int, List[str]]:
+        """The user's reactions on each of `post_ids`, in one query. Posts without any map to []."""
+        reactions: Dict[int, List[str]] = {pid: [] for pid in post_ids}
+        if not post_ids:
+            return reactions
+        result = await db.execute(
+            select(CommunityReaction.post_id, CommunityReaction.reaction_type)
+            .where(CommunityReaction.user_id == user_id, CommunityReaction.post_id.in_(post_ids))
+            .order_by(CommunityReaction.post_id, CommunityReaction.reaction_type)
+        )
+        for pid, reaction_type in result.all():
+            reactions[pid].append(reaction_type)
+        return reactions
+
+
+reaction_service = ReactionService()
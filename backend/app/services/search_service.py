@@ -0,0 +1,414 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, delete, update, insert, func, case, distinct, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis import redis_manager
+from app.db.database import dialect_insert, get_sessionmaker
+from app.models.community import Community, CommunityPost
+from app.models.course import Course
+from app.models.qa import QAQuestion
+from app.models.search import SearchDocument, SearchPosting
+from app.models.subject import Subject
+
+logger = logging.getLogger("app.services.search")
+
+ENTITY_TYPES = ("course", "subject", "community", "post", "question")
+
+TITLE_WEIGHT = 3.0
+TRIGRAM_THRESHOLD = 0.3
+MAX_FUZZY_EXPANSIONS = 3
+REINDEX_COMMIT_EVERY = 500
+
+_TS_CONFIG = literal_column("'english'::regconfig")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Lower-case, split on non-alphanumerics, drop stopwords and fold simple plurals.
+    Used for both indexing and querying so the two always agree.
+    """
+    tokens = []
+    for raw in _TOKEN_RE.findall((text or "").lower()):
+        if len(raw) < 2 or raw in _STOPWORDS:
+            continue
+        if len(raw) > 4 and raw.endswith("ies"):
+            raw = raw[:-3] + "y"
+        elif len(raw) > 3 and raw.endswith("s") and not raw.endswith("ss"):
+            raw = raw[:-1]
+        tokens.append(raw[:64])
+    return tokens
+
+
+def _trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    ta, tb = _trigrams(a), _trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+
+
+def _join(*parts: Optional[str]) -> str:
+    return "\n".join(p for p in parts if p)
+
+
+class SearchService:
+    """
+    Keeps `search_documents` in sync with searchable entities and answers ranked queries.
+    Postgres uses tsvector/GIN with a pg_trgm fallback; other databases (SQLite in dev)
+    use the embedded inverted index in `search_postings`.
+
+    Index calls are made inside the caller's transaction, so the document commits
+    (or rolls back) together with the entity it describes.
+    """
+
+    def _is_postgres(self, db: AsyncSession) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    def _vector_expression(self, title: str, body: str):
+        return func.setweight(func.to_tsvector(_TS_CONFIG, title), literal_column("'A'")).op("||")(
+            func.setweight(func.to_tsvector(_TS_CONFIG, body), literal_column("'B'"))
+        )
+
+    async def index(
+        self,
+        db: AsyncSession,
+        entity_type: str,
+        entity_id: int,
+        scope: str,
+        title: str,
+        body: Optional[str],
+        is_public: bool,
+    ):
+        postgres = self._is_postgres(db)
+        title = (title or "")[:500]
+        body = body or ""
+        values = {
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "scope": scope,
+            "title": title,
+            "body": body,
+            "is_public": is_public,
+        }
+        if postgres:
+            values["search_vector"] = self._vector_expression(title, body)
+
+        stmt = dialect_insert(SearchDocument).values(**values)
+        set_ = {key: stmt.excluded[key] for key in values if key not in ("entity_type", "entity_id")}
+        set_["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["entity_type", "entity_id"], set_=set_
+        ).returning(SearchDocument.id)
+        document_id = (await db.execute(stmt)).scalar_one()
+
+        if not postgres:
+            weights = Counter()
+            for term in tokenize(title):
+                weights[term] += TITLE_WEIGHT
+            for term in tokenize(body):
+                weights[term] += 1.0
+            await db.execute(delete(SearchPosting).where(SearchPosting.document_id == document_id))
+            if weights:
+                await db.execute(
+                    insert(SearchPosting),
+                    [{"term": term, "document_id": document_id, "weight": weight} for term, weight in weights.items()],
+                )
+
+    async def _course_published(self, db: AsyncSession, course_id: int) -> bool:
+        return bool(await db.scalar(select(Course.is_published).where(Course.id == course_id)))
+
+    async def index_course(self, db: AsyncSession, course: Course):
+        await self.index(
+            db, "course", course.id, f"course:{course.id}",
+            course.title, _join(course.description, " ".join(course.tags or [])),
+            course.is_published,
+        )
+
+    async def index_subject(self, db: AsyncSession, subject: Subject, course_published: Optional[bool] = None):
+        if course_published is None:
+            course_published = await self._course_published(db, subject.course_id)
+        await self.index(
+            db, "subject", subject.id, f"course:{subject.course_id}",
+            subject.title, subject.description, course_published,
+        )
+
+    async def index_question(
+        self, db: AsyncSession, question: QAQuestion, course_id: int, course_published: Optional[bool] = None
+    ):
+        if course_published is None:
+            course_published = await self._course_published(db, course_id)
+        await self.index(
+            db, "question", question.id, f"course:{course_id}",
+            question.title, question.question_text, course_published,
+        )
+
+    def _community_visible(self, community: Community) -> bool:
+        return bool(community.is_active and not community.is_private)
+
+    async def index_community(self, db: AsyncSession, community: Community):
+        await self.index(
+            db, "community", community.id, f"community:{community.id}",
+            community.name, community.description, self._community_visible(community),
+        )
+
+    async def index_post(self, db: AsyncSession, post: CommunityPost, community: Community):
+        await self.index(
+            db, "post", post.id, f"community:{community.id}",
+            post.title, post.content, self._community_visible(community) and not post.is_deleted,
+        )
+
+    async def set_scope_visibility(self, db: AsyncSession, scope: str, is_public: bool):
+        """Publish or hide a parent (course/community) together with everything under it."""
+        await db.execute(
+            update(SearchDocument).where(SearchDocument.scope == scope).values(is_public=is_public)
+        )
+
+    async def _delete_documents(self, db: AsyncSession, *criteria):
+        if not self._is_postgres(db):
+            # SQLite does not enforce ON DELETE CASCADE unless foreign keys are enabled.
+            await db.execute(
+                delete(SearchPosting).where(
+                    SearchPosting.document_id.in_(select(SearchDocument.id).where(*criteria))
+                )
+            )
+        await db.execute(delete(SearchDocument).where(*criteria))
+
+    async def remove(self, db: AsyncSession, entity_type: str, entity_ids: Sequence[int]):
+        if entity_ids:
+            await self._delete_documents(
+                db, SearchDocument.entity_type == entity_type, SearchDocument.entity_id.in_(list(entity_ids))
+            )
+
+    async def remove_scope(self, db: AsyncSession, scope: str):
+        await self._delete_documents(db, SearchDocument.scope == scope)
+
+    def _filters(self, entity_types: Optional[Sequence[str]], include_private: bool) -> list:
+        filters = []
+        if entity_types:
+            filters.append(SearchDocument.entity_type.in_(list(entity_types)))
+        if not include_private:
+            filters.append(SearchDocument.is_public == True)
+        return filters
+
+    async def search(
+        self,
+        db: AsyncSession,
+        q: str,
+        entity_types: Optional[Sequence[str]] = None,
+        skip: int = 0,
+        limit: int = 20,
+        include_private: bool = False,
+    ) -> Tuple[int, List[Tuple[SearchDocument, float]]]:
+        """
+        Return (total, [(document, score), ...]) ranked by relevance.
+        Falls back to trigram similarity when the exact terms match nothing.
+        """
+        q = (q or "").strip()
+        if not q:
+            return 0, []
+        filters = self._filters(entity_types, include_private)
+        if self._is_postgres(db):
+            return await self._search_postgres(db, q, filters, skip, limit)
+        return await self._search_index(db, q, filters, skip, limit)
+
+    async def search_ids(
+        self, db: AsyncSession, q: str, entity_type: str, skip: int = 0, limit: int = 100
+    ) -> List[int]:
+        _, hits = await self.search(db, q, [entity_type], skip=skip, limit=limit)
+        return [document.entity_id for document, _ in hits]
+
+    async def _search_postgres(self, db: AsyncSession, q: str, filters: list, skip: int, limit: int):
+        ts_query = func.websearch_to_tsquery(_TS_CONFIG, q)
+        match = SearchDocument.search_vector.op("@@")(ts_query)
+        rank = func.ts_rank_cd(SearchDocument.search_vector, ts_query)
+
+        rows = (await db.execute(
+            select(SearchDocument, rank.label("score"), func.count().over().label("total"))
+            .where(match, *filters)
+            .order_by(rank.desc(), SearchDocument.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        if rows:
+            return rows[0].total, [(row.SearchDocument, float(row.score)) for row in rows]
+
+        # An empty page past the end is not a reason to switch to fuzzy matching.
+        if skip:
+            total = await db.scalar(select(func.count()).select_from(SearchDocument).where(match, *filters))
+            if total:
+                return total, []
+
+        similarity = func.similarity(SearchDocument.title, q)
+        fuzzy = SearchDocument.title.op("%")(q)
+        rows = (await db.execute(
+            select(SearchDocument, similarity.label("score"), func.count().over().label("total"))
+            .where(fuzzy, *filters)
+            .order_by(similarity.desc(), SearchDocument.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        if not rows:
+            # The window count only comes back with a row; a page past the end needs its own count.
+            total = 0
+            if skip:
+                total = await db.scalar(select(func.count()).select_from(SearchDocument).where(fuzzy, *filters))
+            return total, []
+        return rows[0].total, [(row.SearchDocument, float(row.score)) for row in rows]
+
+    async def _resolve_terms(self, db: AsyncSession, terms: List[str]) -> Optional[List[Dict[str, float]]]:
+        """
+        Map each query term to the indexed terms it should match, with a similarity factor.
+        Unknown terms are expanded to the closest vocabulary terms by trigram similarity.
+        Returns None when some term matches nothing at all.
+        """
+        known = set((await db.execute(
+            select(distinct(SearchPosting.term)).where(SearchPosting.term.in_(terms))
+        )).scalars().all())
+
+        groups = []
+        for term in terms:
+            if term in known:
+                groups.append({term: 1.0})
+                continue
+            candidates = (await db.execute(
+                select(distinct(SearchPosting.term)).where(
+                    func.length(SearchPosting.term).between(len(term) - 2, len(term) + 2)
+                )
+            )).scalars().all()
+            scored = sorted(
+                ((trigram_similarity(term, candidate), candidate) for candidate in candidates),
+                reverse=True,
+            )
+            expansions = {
+                candidate: score for score, candidate in scored[:MAX_FUZZY_EXPANSIONS] if score >= TRIGRAM_THRESHOLD
+            }
+            if not expansions:
+                return None
+            groups.append(expansions)
+        return groups
+
+    async def _search_index(self, db: AsyncSession, q: str, filters: list, skip: int, limit: int):
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return 0, []
+        groups = await self._resolve_terms(db, terms)
+        if not groups:
+            return 0, []
+
+        all_terms = {term for group in groups for term in group}
+        document_count = await db.scalar(select(func.count(SearchDocument.id))) or 0
+        frequencies = dict((await db.execute(
+            select(SearchPosting.term, func.count())
+            .where(SearchPosting.term.in_(all_terms))
+            .group_by(SearchPosting.term)
+        )).all())
+
+        term_weights = {}
+        group_of = {}
+        for index, group in enumerate(groups):
+            for term, similarity in group.items():
+                idf = math.log(1 + document_count / max(frequencies.get(term, 1), 1))
+                term_weights[term] = max(term_weights.get(term, 0.0), idf * similarity)
+                group_of[term] = index
+
+        score = func.sum(SearchPosting.weight * case(term_weights, value=SearchPosting.term, else_=0.0))
+        matched = (
+            select(SearchPosting.document_id, score.label("score"))
+            .join(SearchDocument, SearchDocument.id == SearchPosting.document_id)
+            .where(SearchPosting.term.in_(all_terms), *filters)
+            .group_by(SearchPosting.document_id)
+            # Every query term (or one of its fuzzy expansions) must be present.
+            .having(func.count(distinct(case(group_of, value=SearchPosting.term))) == len(groups))
+            .subquery()
+        )
+        rows = (await db.execute(
+            select(SearchDocument, matched.c.score, func.count().over().label("total"))
+            .join(matched, matched.c.document_id == SearchDocument.id)
+            .order_by(matched.c.score.desc(), SearchDocument.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )).all()
+        if not rows:
+            # The window count only comes back with a row; a page past the end needs its own count.
+            total = await db.scalar(select(func.count()).select_from(matched)) if skip else 0
+            return total, []
+        return rows[0].total, [(row.SearchDocument, float(row.score)) for row in rows]
+
+    async def reindex(self, db: AsyncSession) -> int:
+        """Rebuild the whole index from the source tables. Commits as it goes."""
+        await db.execute(delete(SearchPosting))
+        await db.execute(delete(SearchDocument))
+        await db.commit()
+
+        indexed = 0
+
+        async def _tick():
+            nonlocal indexed
+            indexed += 1
+            if indexed % REINDEX_COMMIT_EVERY == 0:
+                await db.commit()
+
+        courses = (await db.execute(select(Course))).scalars().all()
+        published = {course.id: bool(course.is_published) for course in courses}
+        for course in courses:
+            await self.index_course(db, course)
+            await _tick()
+
+        for subject in (await db.execute(select(Subject))).scalars().all():
+            await self.index_subject(db, subject, published.get(subject.course_id, False))
+            await _tick()
+
+        rows = (await db.execute(
+            select(QAQuestion, Subject.course_id).join(Subject, Subject.id == QAQuestion.subject_id)
+        )).all()
+        for question, course_id in rows:
+            await self.index_question(db, question, course_id, published.get(course_id, False))
+            await _tick()
+
+        communities = {c.id: c for c in (await db.execute(select(Community))).scalars().all()}
+        for community in communities.values():
+            await self.index_community(db, community)
+            await _tick()
+
+        posts = (await db.execute(
+            select(CommunityPost).where(CommunityPost.is_deleted == False)
+        )).scalars().all()
+        for post in posts:
+            community = communities.get(post.community_id)
+            if community:
+                await self.index_post(db, post, community)
+                await _tick()
+
+        await db.commit()
+        logger.info(f"Search index rebuilt with {indexed} documents")
+        return indexed
+
+    async def ensure_index(self):
+        """
+        Build the index once for databases that predate it. Guarded by a Redis lock
+        so only one worker process does the work.
+        """
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            if await db.scalar(select(func.count(SearchDocument.id))):
+                return
+            if not await db.scalar(select(func.count(Course.id))) and not await db.scalar(select(func.count(Community.id))):
+                return
+            if redis_manager.redis is not None:
+                if not await redis_manager.acquire_lock("search:backfill:lock", 600):
+                    return
+            await self.reindex(db)
+
+
+search_service = SearchService()
@@ -9,6 +9,7 @@ from app.models.attendance import Attendance
 from app.models.submission import Submission
 from app.models.test import Test
 from app.models.subject import Subject
+from app.services.activity_service import activity_service, ATTENDANCE
 from app.services.llm_service import llm_service
 
 class StudentAnalyticsService:
@@ -111,33 +112,15 @@ class StudentAnalyticsService:
             for row in recent_attendance.all()
         ]
         
-        # Activity chart (Last 30 days)
+        # Activity chart (Last 30 days), from the daily activity buckets
         month_ago = datetime.utcnow() - timedelta(days=30)
-        daily_activity = await db.execute(
-            select(
-                func.date(Attendance.joined_at).label('date'),
-                func.count().label('count')
-            )
-            .where(
-                Attendance.user_id == user_id,
-                Attendance.joined_at >= month_ago
-            )
-            .group_by(func.date(Attendance.joined_at))
-            .order_by('date')
+        daily_activity = await activity_service.series(
+            db, "user", [user_id], month_ago, datetime.utcnow(), metrics=(ATTENDANCE,)
         )
-        
-        activity_data = {row.date.strftime('%Y-%m-%d'): row.count for row in daily_activity}
-        
-        # Fill in missing dates
-        chart_activity = []
-        current_date = month_ago
-        while current_date <= datetime.utcnow():
-            date_str = current_date.strftime('%Y-%m-%d')
-            chart_activity.append({
-                "date": date_str,
-                "count": activity_data.get(date_str, 0)
-            })
-            current_date += timedelta(days=1)
+        chart_activity = [
+            {"date": point["bucket"][:10], "count": point[ATTENDANCE]}
+            for point in daily_activity
+        ]
 
         # Performance Stats (Score distribution)
         score_stats = await db.execute(
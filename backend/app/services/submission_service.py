@@ -0,0 +1,357 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from redis.exceptions import ResponseError
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import selectinload
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import get_sessionmaker, dialect_insert
+from app.models.submission import Submission
+from app.models.test import Test
+from app.services.activity_service import activity_service, SUBMISSION
+
+logger = logging.getLogger("app.services.submission")
+
+STREAM_KEY = "submissions:ingest"
+GROUP_NAME = "submission-graders"
+DEAD_LETTER_KEY = "submissions:dead"
+DEAD_LETTER_MAXLEN = 10000
+
+
+def _receipt_key(receipt_id: str) -> str:
+    return f"submissions:receipt:{receipt_id}"
+
+
+def _idempotency_key(test_id: int, user_id: int) -> str:
+    return f"submissions:idempotency:{test_id}:{user_id}"
+
+
+def _utc(moment: datetime) -> datetime:
+    # Postgres hands timestamptz back aware; queued_at is naive UTC.
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class SubmissionService:
+    def __init__(self):
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+
+    def grade(self, test: Test, answers: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+        """
+        Auto-evaluate MCQ questions. Returns (evaluation, obtained_marks).
+        """
+        obtained_marks = 0.0
+        evaluation = {}
+
+        for question in test.questions:
+            q_id_str = str(question.id)
+            user_answer = answers.get(q_id_str)
+
+            is_correct = False
+            if question.question_type == "mcq" and user_answer:
+                if str(user_answer).lower().strip() == str(question.correct_answer).lower().strip():
+                    is_correct = True
+                    obtained_marks += question.marks
+
+            evaluation[q_id_str] = {
+                "is_correct": is_correct,
+                "marks": question.marks if is_correct else 0
+            }
+
+        return evaluation, obtained_marks
+
+    async def enqueue(self, test_id: int, user_id: int, answers: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Accept a submission into the ingestion stream and return its receipt.
+        Repeated calls for the same (test_id, user_id) return the original receipt.
+        """
+        redis = redis_manager.redis
+        ttl = settings.SUBMISSION_RECEIPT_TTL_SECONDS
+        receipt_id = uuid4().hex
+        receipt = {
+            "receipt_id": receipt_id,
+            "status": "queued",
+            "test_id": test_id,
+            "user_id": user_id,
+            "queued_at": datetime.utcnow().isoformat(),
+        }
+
+        # The receipt is written before the idempotency key so a winning key always
+        # points at a readable receipt.
+        await redis.hset(_receipt_key(receipt_id), mapping=receipt)
+        await redis.expire(_receipt_key(receipt_id), ttl)
+
+        claimed = await redis.set(_idempotency_key(test_id, user_id), receipt_id, nx=True, ex=ttl)
+        if not claimed:
+            await redis.delete(_receipt_key(receipt_id))
+            existing_id = await redis.get(_idempotency_key(test_id, user_id))
+            existing = await self.get_receipt(existing_id) if existing_id else None
+            if existing:
+                return existing
+            # The previous receipt expired between the two reads; take the key over.
+            await redis.hset(_receipt_key(receipt_id), mapping=receipt)
+            await redis.expire(_receipt_key(receipt_id), ttl)
+            await redis.set(_idempotency_key(test_id, user_id), receipt_id, ex=ttl)
+
+        try:
+            await redis.xadd(STREAM_KEY, {
+                "receipt_id": receipt_id,
+                "test_id": str(test_id),
+                "user_id": str(user_id),
+                "answers": json.dumps(answers),
+                "queued_at": receipt["queued_at"],
+            })
+        except Exception:
+            await redis.delete(_idempotency_key(test_id, user_id), _receipt_key(receipt_id))
+            raise
+
+        return receipt
+
+    async def get_receipt(self, receipt_id: str) -> Optional[Dict[str, Any]]:
+        data = await redis_manager.redis.hgetall(_receipt_key(receipt_id))
+        if not data:
+            return None
+        for field in ("test_id", "user_id", "submission_id"):
+            if data.get(field):
+                data[field] = int(data[field])
+        if data.get("obtained_marks"):
+            data["obtained_marks"] = float(data["obtained_marks"])
+        return data
+
+    async def run_worker(self):
+        """
+        Consume the ingestion stream and grade/persist submissions in batches.
+        Each API worker process runs one consumer in the shared consumer group.
+        """
+        redis = redis_manager.redis
+        if redis is None:
+            logger.warning("Redis not connected. Submission ingestion worker disabled.")
+            return
+
+        try:
+            await redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        # Re-deliver entries this consumer read but never acknowledged (e.g. before a restart).
+        read_from = "0"
+        while True:
+            response = await redis.xreadgroup(
+                GROUP_NAME,
+                self.consumer_name,
+                {STREAM_KEY: read_from},
+                count=settings.SUBMISSION_QUEUE_BATCH_SIZE,
+                block=None if read_from != ">" else settings.SUBMISSION_QUEUE_BLOCK_MS,
+            )
+            entries = response[0][1] if response else []
+
+            if read_from != ">" and not entries:
+                read_from = ">"
+                continue
+
+            if not entries and read_from == ">":
+                entries = await self._claim_stale_entries()
+                if not entries:
+                    # Yield to the event loop even if the server returned without blocking.
+                    await asyncio.sleep(0.1)
+                    continue
+
+            await self._process_entries(entries)
+            if read_from != ">":
+                # Walk the pending history once; entries that failed again are left to XAUTOCLAIM.
+                read_from = entries[-1][0]
+
+    async def _process_entries(self, entries: List[Tuple[str, Dict[str, str]]]):
+        """
+        Process a batch, falling back to one entry at a time when it fails so a bad
+        entry (e.g. its user was deleted meanwhile) does not hold up the others. Failed
+        entries stay pending and are retried through XAUTOCLAIM until they have been
+        delivered SUBMISSION_QUEUE_MAX_DELIVERIES times, then they are dead-lettered.
+        """
+        try:
+            await self._process_batch(entries)
+            return
+        except Exception as e:
+            if len(entries) == 1:
+                await self._handle_failure(*entries[0], e)
+                return
+            logger.warning(f"Submission batch of {len(entries)} failed, retrying entries one by one: {e}")
+        for entry_id, fields in entries:
+            try:
+                await self._process_batch([(entry_id, fields)])
+            except Exception as e:
+                await self._handle_failure(entry_id, fields, e)
+
+    async def _handle_failure(self, entry_id: str, fields: Dict[str, str], error: Exception):
+        redis = redis_manager.redis
+        pending = await redis.xpending_range(STREAM_KEY, GROUP_NAME, min=entry_id, max=entry_id, count=1)
+        deliveries = pending[0]["times_delivered"] if pending else 0
+        if deliveries < settings.SUBMISSION_QUEUE_MAX_DELIVERIES:
+            logger.error(
+                f"Submission entry {entry_id} failed (delivery {deliveries}), leaving it for a retry: {error}",
+                exc_info=error,
+            )
+            return
+
+        logger.error(f"Submission entry {entry_id} failed {deliveries} times, dead-lettering it: {error}", exc_info=error)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(
+                DEAD_LETTER_KEY,
+                {**fields, "entry_id": entry_id, "error": str(error)[:1000]},
+                maxlen=DEAD_LETTER_MAXLEN,
+                approximate=True,
+            )
+            if fields.get("receipt_id"):
+                pipe.hset(
+                    _receipt_key(fields["receipt_id"]),
+                    mapping={"status": "rejected", "detail": "Could not be processed"},
+                )
+            pipe.xack(STREAM_KEY, GROUP_NAME, entry_id)
+            pipe.xdel(STREAM_KEY, entry_id)
+            await pipe.execute()
+
+    async def _claim_stale_entries(self) -> List[Tuple[str, Dict[str, str]]]:
+        result = await redis_manager.redis.xautoclaim(
+            STREAM_KEY,
+            GROUP_NAME,
+            self.consumer_name,
+            min_idle_time=settings.SUBMISSION_QUEUE_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=settings.SUBMISSION_QUEUE_BATCH_SIZE,
+        )
+        return [entry for entry in result[1] if entry and entry[1]]
+
+    async def _process_batch(self, entries: List[Tuple[str, Dict[str, str]]]):
+        redis = redis_manager.redis
+        payloads = {}
+        for entry_id, fields in entries:
+            key = (int(fields["test_id"]), int(fields["user_id"]))
+            # Keep the first submission per (test, user) within a batch.
+            if key not in payloads:
+                payloads[key] = {
+                    "entry_id": entry_id,
+                    "receipt_id": fields["receipt_id"],
+                    "answers": json.loads(fields["answers"]),
+                    "queued_at": fields.get("queued_at"),
+                }
+
+        receipt_updates: Dict[str, Dict[str, Any]] = {}
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            test_ids = {test_id for test_id, _ in payloads}
+            result = await db.execute(
+                select(Test).options(selectinload(Test.questions)).where(Test.id.in_(test_ids))
+            )
+            tests = {test.id: test for test in result.scalars().all()}
+
+            rows = []
+            for (test_id, user_id), payload in payloads.items():
+                test = tests.get(test_id)
+                if not test:
+                    receipt_updates[payload["receipt_id"]] = {"status": "rejected", "detail": "Test not found"}
+                    continue
+
+                evaluation, obtained_marks = self.grade(test, payload["answers"])
+                payload["obtained_marks"] = obtained_marks
+                submitted_at = (
+                    datetime.fromisoformat(payload["queued_at"]) if payload["queued_at"] else datetime.utcnow()
+                )
+                payload["submitted_at"] = submitted_at
+                rows.append({
+                    "test_id": test_id,
+                    "user_id": user_id,
+                    "answers": payload["answers"],
+                    "evaluation": evaluation,
+                    "obtained_marks": obtained_marks,
+                    "submitted_at": submitted_at,
+                })
+
+            inserted = {}
+            if rows:
+                stmt = (
+                    dialect_insert(Submission)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["test_id", "user_id"])
+                    .returning(Submission.id, Submission.test_id, Submission.user_id)
+                )
+                result = await db.execute(stmt)
+                inserted = {(row.test_id, row.user_id): row.id for row in result.all()}
+                await db.commit()
+                metrics.SUBMISSIONS_GRADED.labels("queue").inc(len(inserted))
+                for row in rows:
+                    if (row["test_id"], row["user_id"]) in inserted:
+                        test = tests[row["test_id"]]
+                        await activity_service.record(
+                            SUBMISSION, row["user_id"], subject_id=test.subject_id,
+                            classroom_id=test.classroom_id, at=row["submitted_at"],
+                        )
+
+            duplicates = [(r["test_id"], r["user_id"]) for r in rows if (r["test_id"], r["user_id"]) not in inserted]
+            existing = {}
+            if duplicates:
+                result = await db.execute(
+                    select(
+                        Submission.id, Submission.test_id, Submission.user_id,
+                        Submission.obtained_marks, Submission.submitted_at,
+                    )
+                    .where(tuple_(Submission.test_id, Submission.user_id).in_(duplicates))
+                )
+                existing = {(row.test_id, row.user_id): row for row in result.all()}
+
+        # A redelivered entry whose insert committed before the worker died finds its own
+        # row: same queued_at, and the receipt was never updated. That is not a duplicate.
+        redelivered = set()
+        candidates = [key for key in existing if _utc(existing[key].submitted_at) == payloads[key]["submitted_at"]]
+        if candidates:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in candidates:
+                    pipe.hget(_receipt_key(payloads[key]["receipt_id"]), "status")
+                statuses = await pipe.execute()
+            redelivered = {key for key, status in zip(candidates, statuses) if status == "queued"}
+
+        for key, payload in payloads.items():
+            if payload["receipt_id"] in receipt_updates:
+                continue
+            if key in inserted:
+                receipt_updates[payload["receipt_id"]] = {
+                    "status": "graded",
+                    "submission_id": inserted[key],
+                    "obtained_marks": payload["obtained_marks"],
+                    "processed_at": datetime.utcnow().isoformat(),
+                }
+            elif key in redelivered:
+                receipt_updates[payload["receipt_id"]] = {
+                    "status": "graded",
+                    "submission_id": existing[key].id,
+                    "obtained_marks": existing[key].obtained_marks,
+                    "processed_at": datetime.utcnow().isoformat(),
+                }
+            else:
+                update = {"status": "duplicate", "detail": "Already submitted"}
+                if key in existing:
+                    update["submission_id"] = existing[key].id
+                receipt_updates[payload["receipt_id"]] = update
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for receipt_id, update in receipt_updates.items():
+                pipe.hset(_receipt_key(receipt_id), mapping=update)
+            entry_ids = [entry_id for entry_id, _ in entries]
+            pipe.xack(STREAM_KEY, GROUP_NAME, *entry_ids)
+            pipe.xdel(STREAM_KEY, *entry_ids)
+            await pipe.execute()
+
+        logger.info(f"Ingested {len(inserted)} submissions ({len(entries)} queue entries)")
+
+
+submission_service = SubmissionService()
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from jose import jwt
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.models.user import User
+
+logger = logging.getLogger("app.services.token")
+
+# Changing any of these ends every session of the user.
+SESSION_FIELDS = ("password", "role", "is_active")
+
+
+def _version_key(user_id: int) -> str:
+    return f"auth:sv:{user_id}"
+
+
+def _revoked_key(jti: str) -> str:
+    return f"auth:revoked:{jti}"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller as described by a verified token; no database row behind it."""
+    id: int
+    role: str
+    session_version: int = 0
+    jti: Optional[str] = None
+
+
+class TokenService:
+    """
+    Verifies access tokens and tracks their revocation.
+
+    Verified claims are kept in a bounded in-process LRU until the token expires, so a
+    token's signature is checked once per worker. Revocation is O(1) in Redis: every
+    token carries the user's session version (`sv`), and bumping the version in the
+    database and Redis (logout-all, deactivation, password or role change) invalidates
+    all older tokens at once; single tokens (logout) are revoked by `jti` until they
+    would have expired anyway. Redis mirrors `users.session_version`, so a missing key
+    only costs one small query to refill it.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verified claims of `token`; raises JWTError like `jwt.decode`."""
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self._cache.get(cache_key)
+        now = time.time()
+        if cached is not None:
+            expires, claims = cached
+            if expires > now:
+                self._cache.move_to_end(cache_key)
+                return claims
+            del self._cache[cache_key]
+
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        self._cache[cache_key] = (float(claims.get("exp") or now), claims)
+        if len(self._cache) > settings.AUTH_TOKEN_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return claims
+
+    async def check(self, claims: Dict[str, Any]) -> Optional[bool]:
+        """
+        False if the token is revoked, True if it is current, None if Redis cannot tell
+        (no cached session version, or Redis is down) and the database must decide.
+        """
+        if redis_manager.redis is None:
+            return None
+        jti = claims.get("jti")
+        try:
+            async with redis_manager.redis.pipeline(transaction=False) as pipe:
+                pipe.get(_version_key(int(claims["sub"])))
+                if jti:
+                    pipe.exists(_revoked_key(jti))
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Token revocation check unavailable: {e}")
+            return None
+        if jti and results[1]:
+            return False
+        if results[0] is None:
+            return None
+        return int(results[0]) == int(claims.get("sv", 0))
+
+    async def store_session_version(self, user_id: int, version: int, only_if_missing: bool = False):
+        """
+        Mirror a user's session version into Redis. Refills use `only_if_missing` so a
+        value read before a concurrent bump cannot overwrite the bumped one.
+        """
+        if redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.set(
+                _version_key(user_id), str(version),
+                ex=settings.AUTH_SESSION_VERSION_TTL_SECONDS, nx=only_if_missing,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache session version for user {user_id}: {e}")
+
+    def ends_sessions(self, user: User, changes: Dict[str, Any]) -> bool:
+        """Whether applying `changes` to `user` must invalidate the user's tokens."""
+        return any(field in changes and changes[field] != getattr(user, field) for field in SESSION_FIELDS)
+
+    def bump_session_version(self, user: User):
+        """Invalidate all tokens of `user` once committed; follow with `store_session_version`."""
+        user.session_version = (user.session_version or 0) + 1
+
+    async def revoke(self, claims: Dict[str, Any]) -> bool:
+        """Revoke a single token until its expiry. False if Redis failed and the token stays valid."""
+        jti = claims.get("jti")
+        if not jti or redis_manager.redis is None:
+            return True
+        ttl = int(claims.get("exp", 0) - time.time())
+        if ttl <= 0:
+            return True
+        try:
+            await redis_manager.redis.set(_revoked_key(jti), "1", ex=ttl)
+        except Exception as e:
+            logger.warning(f"Failed to revoke token {jti}: {e}")
+            return False
+        return True
+
+
+token_service = TokenService()
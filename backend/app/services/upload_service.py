@@ -0,0 +1,300 @@
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Tuple
+from uuid import uuid4
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.exceptions import PayloadTooLargeError, ResourceNotFoundError
+from app.core.redis import redis_manager
+
+logger = logging.getLogger("app.services.upload")
+
+# Guards against two requests appending to one upload; expires if a worker dies mid-PATCH.
+APPEND_LOCK_SECONDS = 15 * 60
+
+
+def _session_key(session_id: str) -> str:
+    return f"upload:session:{session_id}"
+
+
+def _lock_key(session_id: str) -> str:
+    return f"upload:session:{session_id}:lock"
+
+
+def _write_chunk(fh, hasher, chunk: bytes):
+    # Runs in a worker thread; hashlib releases the GIL on large buffers too.
+    fh.write(chunk)
+    hasher.update(chunk)
+
+
+def _touch(path: str):
+    with open(path, "wb"):
+        pass
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(settings.UPLOAD_CHUNK_SIZE_BYTES), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+@dataclass
+class StoredUpload:
+    """A fully received upload in a temp file, ready to be moved into the blob store."""
+    path: str
+    size: int
+    sha256: str
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+
+
+class UploadOffsetMismatch(Exception):
+    """The client resumed from a different offset than the server has stored."""
+    def __init__(self, offset: int):
+        self.offset = offset
+        super().__init__(f"Upload offset mismatch, server is at {offset}")
+
+
+class UploadSessionBusy(Exception):
+    """Another request is already appending to this upload."""
+
+
+class UploadService:
+    """
+    Streams uploads to disk in fixed-size chunks with file writes and hashing done in
+    worker threads, enforcing size limits as bytes arrive. Resumable uploads follow the
+    tus model: the client declares the total length, then PATCHes bytes at the current
+    offset; session state lives in Redis so any worker can continue an upload.
+    """
+
+    def __init__(self):
+        # Running sha256 per session at its current offset. Process-local: if a chunk
+        # lands on another worker the file is re-hashed once on completion instead.
+        self._hashers: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+
+    @property
+    def partial_dir(self) -> str:
+        path = os.path.join(str(settings.uploads_path), "partial")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _partial_path(self, session_id: str) -> str:
+        return os.path.join(self.partial_dir, session_id)
+
+    async def _stream(self, chunks: AsyncIterator[bytes], fh, hasher, written: int, limit: int) -> int:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            written += len(chunk)
+            if written > limit:
+                raise PayloadTooLargeError(limit)
+            await run_in_threadpool(_write_chunk, fh, hasher, chunk)
+        return written
+
+    async def _file_chunks(self, file: UploadFile) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+    async def save_upload(self, file: UploadFile, max_bytes: Optional[int] = None) -> StoredUpload:
+        """Stream a multipart upload into a temp file, hashing it on the way."""
+        limit = max_bytes or settings.MAX_UPLOAD_SIZE_BYTES
+        path = self._partial_path(uuid4().hex)
+
+        hasher = hashlib.sha256()
+        fh = await run_in_threadpool(open, path, "wb")
+        try:
+            size = await self._stream(self._file_chunks(file), fh, hasher, 0, limit)
+        except BaseException:
+            await run_in_threadpool(fh.close)
+            await run_in_threadpool(os.remove, path)
+            raise
+        await run_in_threadpool(fh.close)
+
+        return StoredUpload(
+            path=path,
+            size=size,
+            sha256=hasher.hexdigest(),
+            filename=file.filename,
+            content_type=file.content_type,
+        )
+
+    # --- Resumable uploads ---
+
+    def _decode(self, session_id: str, data: Dict[str, str]) -> Dict:
+        return {
+            "id": session_id,
+            "user_id": int(data["user_id"]),
+            "filename": data.get("filename") or None,
+            "content_type": data.get("content_type") or None,
+            "length": int(data["length"]),
+            "offset": int(data["offset"]),
+            "for_resource": data.get("for_resource") == "1",
+            "created_at": data["created_at"],
+        }
+
+    async def create_session(
+        self, user_id: int, length: int, filename: Optional[str], content_type: Optional[str],
+        for_resource: bool = False,
+    ) -> Dict:
+        if length > settings.MAX_RESUMABLE_UPLOAD_SIZE_BYTES:
+            raise PayloadTooLargeError(settings.MAX_RESUMABLE_UPLOAD_SIZE_BYTES)
+        session_id = uuid4().hex
+        data = {
+            "user_id": str(user_id),
+            "filename": filename or "",
+            "content_type": content_type or "",
+            "length": str(length),
+            "offset": "0",
+            "for_resource": "1" if for_resource else "0",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        await run_in_threadpool(_touch, self._partial_path(session_id))
+        key = _session_key(session_id)
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=data)
+            pipe.expire(key, settings.UPLOAD_SESSION_TTL_SECONDS)
+            await pipe.execute()
+        self._hashers[session_id] = (0, hashlib.sha256())
+        return self._decode(session_id, data)
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        data = await redis_manager.redis.hgetall(_session_key(session_id))
+        if not data:
+            return None
+        return self._decode(session_id, data)
+
+    async def append(self, session: Dict, offset: int, chunks: AsyncIterator[bytes]) -> Dict:
+        """
+        Write bytes at `offset`, which must match the stored offset. On a dropped
+        connection the bytes already written are kept and the offset advanced, so the
+        client resumes from there.
+        """
+        session_id = session["id"]
+        if not await redis_manager.acquire_lock(_lock_key(session_id), APPEND_LOCK_SECONDS):
+            raise UploadSessionBusy()
+        try:
+            # Re-read under the lock; the caller's copy may be stale.
+            session = await self.get_session(session_id)
+            if session is None:
+                raise ResourceNotFoundError("Upload session", session_id)
+            if offset != session["offset"]:
+                raise UploadOffsetMismatch(session["offset"])
+
+            cached = self._hashers.get(session_id)
+            hasher = cached[1] if cached and cached[0] == offset else None
+            if hasher is None:
+                self._hashers.pop(session_id, None)
+
+            path = self._partial_path(session_id)
+            fh = await run_in_threadpool(open, path, "r+b")
+            written = offset
+            try:
+                await run_in_threadpool(fh.seek, offset)
+                await run_in_threadpool(fh.truncate)
+                counter = _WrittenCounter(fh, hasher or _NullHasher())
+                try:
+                    written = await self._stream(chunks, counter, counter, offset, session["length"])
+                except Exception:
+                    written = offset + counter.count
+                    raise
+                finally:
+                    await self._save_offset(session_id, written)
+                    if hasher is not None:
+                        self._hashers[session_id] = (written, hasher)
+            finally:
+                await run_in_threadpool(fh.close)
+            session["offset"] = written
+            return session
+        finally:
+            await redis_manager.release_lock(_lock_key(session_id))
+
+    async def _save_offset(self, session_id: str, offset: int):
+        key = _session_key(session_id)
+        async with redis_manager.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "offset", str(offset))
+            pipe.expire(key, settings.UPLOAD_SESSION_TTL_SECONDS)
+            await pipe.execute()
+
+    async def complete(self, session: Dict) -> StoredUpload:
+        """Close a fully received upload and hand over its temp file."""
+        session_id = session["id"]
+        cached = self._hashers.pop(session_id, None)
+        partial = self._partial_path(session_id)
+        if cached and cached[0] == session["length"]:
+            sha256 = cached[1].hexdigest()
+        else:
+            sha256 = await run_in_threadpool(_hash_file, partial)
+        # Without the session key the cleanup job removes the file if it is never ingested.
+        await redis_manager.delete(_session_key(session_id))
+
+        return StoredUpload(
+            path=partial,
+            size=session["length"],
+            sha256=sha256,
+            filename=session["filename"],
+            content_type=session["content_type"],
+        )
+
+    async def abort(self, session: Dict):
+        session_id = session["id"]
+        self._hashers.pop(session_id, None)
+        await redis_manager.delete(_session_key(session_id))
+        partial = self._partial_path(session_id)
+        if os.path.exists(partial):
+            await run_in_threadpool(os.remove, partial)
+
+    async def cleanup_partials(self):
+        """Periodic job: delete partial files whose session has expired or that were never ingested."""
+        if redis_manager.redis is None:
+            return
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL_SECONDS
+        removed = 0
+        for name in await run_in_threadpool(os.listdir, self.partial_dir):
+            path = self._partial_path(name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if await redis_manager.redis.exists(_session_key(name)):
+                continue
+            self._hashers.pop(name, None)
+            await run_in_threadpool(os.remove, path)
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired partial uploads")
+
+
+class _NullHasher:
+    def update(self, chunk: bytes):
+        pass
+
+
+class _WrittenCounter:
+    """File/hasher adapter for `_stream` that remembers how many bytes reached the file."""
+    def __init__(self, fh, hasher):
+        self.fh = fh
+        self.hasher = hasher
+        self.count = 0
+
+    def write(self, chunk: bytes):
+        self.fh.write(chunk)
+        self.count += len(chunk)
+
+    def update(self, chunk: bytes):
+        self.hasher.update(chunk)
+
+
+upload_service = UploadService()
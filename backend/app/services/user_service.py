@@ -11,6 +11,7 @@ from app.models.user import User
 from app.models.enums import RoleEnum
 from app.schemas.user import UserCreateInstructor, UserCreateAdmin
 from app.services.email import email_service
+from app.services.token_service import token_service
 
 class UserService:
     async def create_instructor(self, db: AsyncSession, user_in: UserCreateInstructor) -> User:
@@ -21,7 +22,7 @@ class UserService:
 
         # 2. Create user with temporary random password
         temp_password = str(uuid.uuid4())
-        hashed_password = security.get_password_hash(temp_password)
+        hashed_password = await security.get_password_hash_async(temp_password)
         
         user = User(
             email=user_in.email,
@@ -60,7 +61,7 @@ class UserService:
 
         # 2. Create user with temporary random password
         temp_password = str(uuid.uuid4())
-        hashed_password = security.get_password_hash(temp_password)
+        hashed_password = await security.get_password_hash_async(temp_password)
         
         user = User(
             email=user_in.email,
@@ -95,10 +96,12 @@ class UserService:
         if not user:
             raise ValueError("User not found")
         
-        user.password = security.get_password_hash(new_password)
+        user.password = await security.get_password_hash_async(new_password)
+        token_service.bump_session_version(user)
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        await token_service.store_session_version(user.id, user.session_version)
         return user
 
 user_service = UserService()
@@ -0,0 +1,120 @@
+import logging
+from typing import Dict
+
+from sqlalchemy import select, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.db.database import get_sessionmaker
+from app.models.community import CommunityPost
+from app.services.feed_service import feed_service
+
+logger = logging.getLogger("app.services.view_counter")
+
+PENDING_KEY = "post_views:pending"
+FLUSHING_KEY = "post_views:flushing"
+FLUSH_LOCK_KEY = "post_views:flush:lock"
+
+
+def _unique_key(post_id: int) -> str:
+    return f"post_views:unique:{post_id}"
+
+
+class ViewCounterService:
+    """
+    Buffers post views in Redis (a hash of pending deltas plus one HyperLogLog of
+    viewers per post) and writes them to `community_posts` in periodic batched UPDATEs,
+    so reading a post never writes to the database.
+    """
+
+    async def record_view(self, db: AsyncSession, post_id: int, viewer_id: str) -> int:
+        """Count one view. Returns the number of views not yet flushed for this post."""
+        redis = redis_manager.redis
+        if redis is None:
+            # No buffer available: fall back to a single atomic increment.
+            await db.execute(
+                update(CommunityPost)
+                .where(CommunityPost.id == post_id)
+                .values(view_count=CommunityPost.view_count + 1)
+            )
+            await db.commit()
+            return 0
+
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hincrby(PENDING_KEY, post_id, 1)
+                pipe.pfadd(_unique_key(post_id), viewer_id)
+                pending, _ = await pipe.execute()
+            return int(pending)
+        except Exception as e:
+            logger.warning(f"Failed to record view for post {post_id}: {e}")
+            return 0
+
+    async def flush(self):
+        """
+        Move pending deltas into the database. The pending hash is renamed first so
+        new views keep accumulating in a fresh key while this batch is written.
+        """
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        # One flusher at a time across worker processes.
+        if not await redis_manager.acquire_lock(FLUSH_LOCK_KEY, max(settings.VIEW_COUNT_FLUSH_INTERVAL_SECONDS * 6, 60)):
+            return
+
+        try:
+            # A leftover flushing key means the previous flush died midway; finish it first
+            # (it only holds the batches that were not committed).
+            if not await redis.exists(FLUSHING_KEY):
+                if not await redis.exists(PENDING_KEY):
+                    return
+                await redis.rename(PENDING_KEY, FLUSHING_KEY)
+
+            deltas = {int(post_id): int(count) for post_id, count in (await redis.hgetall(FLUSHING_KEY)).items()}
+            if deltas:
+                await self._apply(deltas)
+            await redis.delete(FLUSHING_KEY)
+        finally:
+            await redis_manager.release_lock(FLUSH_LOCK_KEY)
+
+    async def _apply(self, deltas: Dict[int, int]):
+        redis = redis_manager.redis
+        post_ids = list(deltas)
+        batch_size = settings.VIEW_COUNT_FLUSH_BATCH_SIZE
+
+        async_session = get_sessionmaker()
+        async with async_session() as db:
+            for start in range(0, len(post_ids), batch_size):
+                batch = post_ids[start:start + batch_size]
+
+                async with redis.pipeline(transaction=False) as pipe:
+                    for post_id in batch:
+                        pipe.pfcount(_unique_key(post_id))
+                    unique_counts = dict(zip(batch, await pipe.execute()))
+
+                await db.execute(
+                    update(CommunityPost)
+                    .where(CommunityPost.id.in_(batch))
+                    .values(
+                        view_count=CommunityPost.view_count + case(
+                            {post_id: deltas[post_id] for post_id in batch}, value=CommunityPost.id, else_=0
+                        ),
+                        unique_view_count=case(
+                            unique_counts, value=CommunityPost.id, else_=CommunityPost.unique_view_count
+                        ),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                # Committed: a flush resumed after a later failure must not apply these again.
+                await redis.hdel(FLUSHING_KEY, *batch)
+
+                # View counts feed into hot/top ranking.
+                result = await db.execute(select(CommunityPost).where(CommunityPost.id.in_(batch)))
+                await feed_service.update_posts(result.scalars().all())
+
+        logger.info(f"Flushed {sum(deltas.values())} views for {len(deltas)} posts")
+
+
+view_counter_service = ViewCounterService()
@@ -0,0 +1,148 @@
+"""
+CPU-bound media processing, run in worker processes by the media service.
+Everything here is a plain module-level function so it can be pickled into a
+ProcessPoolExecutor. Optional tools are used when available: Pillow for images,
+pypdf for page counts, poppler's pdftoppm for PDF previews and ffprobe/ffmpeg
+for video metadata and poster frames.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+# name -> (max edge in px, square crop)
+IMAGE_VARIANTS = {
+    "thumb": (320, False),
+    "medium": (1280, False),
+    "avatar-128": (128, True),
+    "avatar-256": (256, True),
+}
+PREVIEW_VARIANTS = ("thumb", "medium")  # renditions made from PDF pages and video frames
+JPEG_QUALITY = 82
+TOOL_TIMEOUT_SECONDS = 120
+
+
+def _resize(image, max_edge: int, square: bool):
+    from PIL import ImageOps
+
+    if square:
+        return ImageOps.fit(image, (max_edge, max_edge))
+    image = image.copy()
+    image.thumbnail((max_edge, max_edge))
+    return image
+
+
+def _to_rgb(image):
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert("RGB")
+
+
+def _render_variants(source_path: str, out_dir: str, names, max_pixels: int) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    variants = {}
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        info = {"width": original.width, "height": original.height}
+        image = _to_rgb(original)
+        for name in names:
+            max_edge, square = IMAGE_VARIANTS[name]
+            if not square and max(image.size) <= max_edge:
+                continue  # never upscale; the original is already small enough
+            path = os.path.join(out_dir, f"{name}.jpg")
+            _resize(image, max_edge, square).save(path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            variants[name] = path
+    return info, variants
+
+
+def _process_image(path: str, out_dir: str, max_pixels: int):
+    return _render_variants(path, out_dir, IMAGE_VARIANTS, max_pixels)
+
+
+def _process_pdf(path: str, out_dir: str, max_pixels: int):
+    info: Dict[str, Any] = {}
+    variants: Dict[str, str] = {}
+    try:
+        from pypdf import PdfReader
+
+        info["page_count"] = len(PdfReader(path).pages)
+    except ImportError:
+        pass
+
+    pdftoppm = shutil.which("pdftoppm")
+    if pdftoppm:
+        prefix = os.path.join(out_dir, "page")
+        subprocess.run(
+            [pdftoppm, "-f", "1", "-l", "1", "-png", "-singlefile", "-scale-to", "1280", path, prefix],
+            check=True, capture_output=True, timeout=TOOL_TIMEOUT_SECONDS,
+        )
+        _, variants = _render_variants(prefix + ".png", out_dir, PREVIEW_VARIANTS, max_pixels)
+    return info, variants
+
+
+def _process_video(path: str, out_dir: str, max_pixels: int):
+    info: Dict[str, Any] = {}
+    variants: Dict[str, str] = {}
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+            check=True, capture_output=True, timeout=TOOL_TIMEOUT_SECONDS,
+        )
+        probe = json.loads(result.stdout or b"{}")
+        duration = probe.get("format", {}).get("duration")
+        if duration:
+            info["duration_seconds"] = round(float(duration), 2)
+        for stream in probe.get("streams", []):
+            if stream.get("codec_type") == "video":
+                info["width"], info["height"] = stream.get("width"), stream.get("height")
+                break
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        frame = os.path.join(out_dir, "frame.png")
+        seek = min(1.0, info.get("duration_seconds", 0) / 2)
+        subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-ss", str(seek), "-i", path, "-frames:v", "1", frame],
+            check=True, capture_output=True, timeout=TOOL_TIMEOUT_SECONDS,
+        )
+        if os.path.exists(frame):
+            _, variants = _render_variants(frame, out_dir, PREVIEW_VARIANTS, max_pixels)
+    return info, variants
+
+
+def media_kind(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    if content_type.startswith("image/") and content_type != "image/svg+xml":
+        return "image"
+    if content_type == "application/pdf":
+        return "pdf"
+    if content_type.startswith("video/"):
+        return "video"
+    return None
+
+
+def process_media(path: str, content_type: str, max_pixels: int) -> Dict[str, Any]:
+    """
+    Extract metadata and render variants for one file. Variants are written to a
+    fresh temp directory; the caller stores and then removes them.
+    Returns {"info": {...}, "variants": {name: path}, "work_dir": dir}.
+    """
+    processors = {"image": _process_image, "pdf": _process_pdf, "video": _process_video}
+    work_dir = tempfile.mkdtemp(prefix="media-")
+    try:
+        info, variants = processors[media_kind(content_type)](path, work_dir, max_pixels)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return {"info": info, "variants": variants, "work_dir": work_dir}
@@ -3,6 +3,7 @@ import logging
 from typing import Dict, Set
 
 from fastapi import WebSocket, WebSocketDisconnect
+from app.core import metrics
 from app.core.redis import redis_manager
 
 logger = logging.getLogger("app.ws")
@@ -13,18 +14,24 @@ class ConnectionManager:
         self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
 
     async def connect(self, websocket: WebSocket, classroom_id: str, user_id: str):
-        await websocket.accept()
+        """Register an already accepted socket (the endpoint accepts it to read the join message)."""
         if classroom_id not in self.active_connections:
             self.active_connections[classroom_id] = {}
         self.active_connections[classroom_id][user_id] = websocket
+        metrics.WS_CONNECTIONS.labels(classroom_id).set(len(self.active_connections[classroom_id]))
         logger.info(f"User {user_id} connected to classroom {classroom_id}")
 
     def disconnect(self, classroom_id: str, user_id: str):
         if classroom_id in self.active_connections:
             if user_id in self.active_connections[classroom_id]:
                 del self.active_connections[classroom_id][user_id]
+            metrics.WS_CONNECTIONS.labels(classroom_id).set(len(self.active_connections[classroom_id]))
             if not self.active_connections[classroom_id]:
                 del self.active_connections[classroom_id]
+                # One series per classroom ever joined would pile up otherwise. Multiprocess
+                # mode cannot remove labels (the mmap file keeps the 0 just written).
+                if not metrics.multiprocess_enabled():
+                    metrics.WS_CONNECTIONS.remove(classroom_id)
         logger.info(f"User {user_id} disconnected from classroom {classroom_id}")
 
     async def broadcast_to_room(self, classroom_id: str, message: dict, exclude_user: str = None):
@@ -32,7 +39,8 @@ class ConnectionManager:
         Broadcast message to all users in a specific classroom.
         """
         if classroom_id in self.active_connections:
-            for user_id, connection in self.active_connections[classroom_id].items():
+            # Copied: sends yield, and users may join or leave the room meanwhile.
+            for user_id, connection in list(self.active_connections[classroom_id].items()):
                 if user_id != exclude_user:
                     try:
                         await connection.send_json(message)
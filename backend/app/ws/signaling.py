@@ -54,8 +54,8 @@ async def websocket_endpoint(
             if message_type in ["offer", "answer", "candidate"]:
                 target_user_id = data.get("target_user_id")
                 if target_user_id:
-                    # Relay to specific user
-                    await manager.send_personal_message(data, classroom_id, target_user_id)
+                    # Relay to specific user (connections are keyed by the string id)
+                    await manager.send_personal_message(data, classroom_id, str(target_user_id))
             
             # Chat or System Events
             elif message_type == "chat":
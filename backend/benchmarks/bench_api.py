@@ -0,0 +1,230 @@
+"""
+Load test for the hot API paths, against the dataset written by benchmarks.seed.
+
+Each scenario sends --requests requests, --concurrency at a time, as students from
+the manifest (logged in once up front, not measured), and reports throughput and
+p50/p95/p99 latency. Every run is stored as JSON under benchmarks/results (see
+compare.py to diff two runs). submit_test uses up the seeded unsubmitted tests, so
+reseed with --reset before every run that is meant to be compared.
+
+In-process (default) the app runs on the current DATABASE_URL / REDIS_URL through
+httpx's ASGI transport, with its background workers and the rate limit raised;
+--fakeredis swaps Redis for fakeredis so only a database is needed:
+
+    cd backend && python -m benchmarks.bench_api --fakeredis --requests 500 --concurrency 20
+
+Against a running server (start it with RATE_LIMIT_MAX_REQUESTS raised, or most
+requests are answered 429); only this mode runs the WebSocket join storm, which
+needs the `websockets` package:
+
+    python -m benchmarks.bench_api --url http://localhost:8000 --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.common import DEFAULT_MANIFEST, RESULTS_DIR, format_summary, summarize, write_results
+
+SCENARIOS = (
+    "login",
+    "users_me",
+    "course_list",
+    "student_dashboard",
+    "submit_test",
+    "notifications",
+    "post_feed",
+    "ws_join",
+)
+
+
+class Student:
+    def __init__(self, index: int, user_id: int, token: str):
+        self.index = index
+        self.user_id = user_id
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+class Runner:
+    def __init__(self, client, manifest: Dict[str, Any], students: List[Student], url: Optional[str], rng: random.Random):
+        self.client = client
+        self.manifest = manifest
+        self.students = students
+        self.url = url
+        self.rng = rng
+        by_index = {student.index: student for student in students}
+        # Unsubmitted tests of the logged-in students; each is submitted at most once.
+        self.open_submissions = [
+            (by_index[index], test_id) for index, test_id in manifest["open_submissions"] if index in by_index
+        ]
+        rng.shuffle(self.open_submissions)
+
+    def student(self) -> Student:
+        return self.rng.choice(self.students)
+
+    async def login(self) -> int:
+        email = self.manifest["student_email"].format(index=self.student().index)
+        response = await self.client.post("/auth/login", data={"username": email, "password": self.manifest["password"]})
+        return response.status_code
+
+    async def users_me(self) -> int:
+        return (await self.client.get("/users/me", headers=self.student().headers)).status_code
+
+    async def course_list(self) -> int:
+        return (await self.client.get("/courses/", params={"limit": 20})).status_code
+
+    async def student_dashboard(self) -> int:
+        return (await self.client.get("/dashboard/student/overview", headers=self.student().headers)).status_code
+
+    async def submit_test(self) -> int:
+        if not self.open_submissions:
+            raise RuntimeError("no unsubmitted tests left; reseed or lower --requests")
+        student, test_id = self.open_submissions.pop()
+        questions = self.manifest["test_questions"].get(str(test_id), [])
+        answers = {str(question_id): self.rng.choice("abcd") for question_id in questions}
+        response = await self.client.post(
+            "/submissions/", json={"test_id": test_id, "answers": answers}, headers=student.headers
+        )
+        return response.status_code
+
+    async def notifications(self) -> int:
+        return (await self.client.get("/notifications/", headers=self.student().headers)).status_code
+
+    async def post_feed(self) -> int:
+        return (await self.client.get("/posts/feed/home", headers=self.student().headers)).status_code
+
+    async def ws_join(self) -> int:
+        import websockets
+
+        student = self.student()
+        classroom_id = self.rng.choice(self.manifest["classroom_ids"])
+        url = self.url.replace("http", "ws", 1).rstrip("/") + f"/ws/classroom/{classroom_id}"
+        async with websockets.connect(url, open_timeout=30) as ws:
+            await ws.send(json.dumps({"type": "join", "user_id": student.user_id, "user_info": {}}))
+        return 101
+
+
+async def run_scenario(call: Callable[[], Awaitable[int]], requests: int, concurrency: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status = await call()
+            except Exception as e:
+                errors += 1
+                statuses[type(e).__name__] += 1
+                return
+            samples.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] += 1
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return summarize(samples, time.perf_counter() - started, statuses, errors)
+
+
+async def log_in(client, manifest: Dict[str, Any], count: int, concurrency: int) -> List[Student]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> Optional[Student]:
+        async with semaphore:
+            email = manifest["student_email"].format(index=index)
+            response = await client.post("/auth/login", data={"username": email, "password": manifest["password"]})
+        if response.status_code != 200:
+            print(f"Login failed for {email}: {response.status_code} {response.text[:200]}")
+            return None
+        return Student(index, manifest["student_ids"][index], response.json()["access_token"])
+
+    count = min(count, len(manifest["student_ids"]))
+    students = await asyncio.gather(*(one(index) for index in range(count)))
+    return [student for student in students if student is not None]
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    scenarios = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if "ws_join" in scenarios and not args.url:
+        if args.scenarios:
+            raise SystemExit("ws_join needs a running server (--url)")
+        scenarios.remove("ws_join")
+
+    meta: Dict[str, Any] = {
+        "target": args.url or "in-process",
+        "scale": manifest["scale"],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+    }
+
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        # Must be set before the app (and its settings) are imported.
+        os.environ.setdefault("RATE_LIMIT_MAX_REQUESTS", str(10 ** 9))
+        if args.fakeredis:
+            import fakeredis
+            from app.core.redis import redis_manager
+
+            redis_manager.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        from app.db.database import get_engine
+        from app.main import app
+
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        meta["database"] = get_engine().dialect.name
+        meta["redis"] = "fakeredis" if args.fakeredis else "redis"
+
+    results: Dict[str, Any] = {}
+    try:
+        students = await log_in(client, manifest, args.users, args.concurrency)
+        if not students:
+            raise SystemExit("No student could log in; was the database seeded with benchmarks.seed?")
+        runner = Runner(client, manifest, students, args.url, random.Random(args.seed))
+        for name in scenarios:
+            results[name] = await run_scenario(getattr(runner, name), args.requests, args.concurrency)
+            print(format_summary(name, results[name]))
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    path = write_results("api", meta, results, args.out)
+    print(f"Results: {path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; default runs the app in-process")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="students to log in and spread requests over")
+    parser.add_argument("--scenarios", help=f"comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--fakeredis", action="store_true", help="in-process only: use fakeredis instead of REDIS_URL")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the JSON results")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Login-storm benchmark: how much does password hashing delay unrelated requests?
+
+In-process (default) it fires a burst of bcrypt verifications while a probe task
+measures how late the event loop runs a trivial 5ms timer, once with bcrypt called
+inline on the loop (the old behaviour) and once through the bounded password pool:
+
+    cd backend && python -m benchmarks.bench_password_hashing --logins 200
+
+Against a running server (requires httpx) it sends failed logins for a real account
+and probes GET /health at the same time:
+
+    python -m benchmarks.bench_password_hashing --url http://localhost:8000 \\
+        --email student@mindporium.ai --logins 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+
+def _percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+    return (
+        f"n={len(ordered)} p50={statistics.median(ordered):.1f}ms "
+        f"p95={pick(0.95):.1f}ms p99={pick(0.99):.1f}ms max={ordered[-1]:.1f}ms"
+    )
+
+
+async def _probe_loop(stop: asyncio.Event, interval: float, samples: List[float]):
+    """Record how late a timer of `interval` seconds fires, i.e. event loop stall time."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run_in_process(logins: int, concurrency: int):
+    from app.core import security
+
+    hashed = security.get_password_hash("correct horse battery staple")
+    gate = asyncio.Semaphore(concurrency)
+
+    async def inline_login():
+        async with gate:
+            security.verify_password("wrong password", hashed)
+            await asyncio.sleep(0)
+
+    async def pooled_login():
+        async with gate:
+            await security.verify_password_async("wrong password", hashed)
+
+    for label, login in (("inline on event loop", inline_login), ("bounded pool", pooled_login)):
+        stop = asyncio.Event()
+        samples: List[float] = []
+        probe = asyncio.create_task(_probe_loop(stop, 0.005, samples))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+        print(f"{label:>22}: {logins / elapsed:6.1f} logins/s | loop lag {_percentiles(samples)}")
+
+    print(f"pool stats: {security.password_executor.stats()}")
+    security.password_executor.shutdown()
+
+
+async def run_against_server(url: str, email: str, logins: int, concurrency: int):
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("--url mode requires httpx (pip install httpx)")
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        baseline: List[float] = []
+        for _ in range(50):
+            started = time.perf_counter()
+            await client.get("/health")
+            baseline.append((time.perf_counter() - started) * 1000)
+        print(f"/health idle:        {_percentiles(baseline)}")
+
+        gate = asyncio.Semaphore(concurrency)
+        statuses = {}
+
+        async def login():
+            async with gate:
+                response = await client.post("/auth/login", data={"username": email, "password": "wrong password"})
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe(stop: asyncio.Event, samples: List[float]):
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                samples.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        stop = asyncio.Event()
+        samples: List[float] = []
+        probe_task = asyncio.create_task(probe(stop, samples))
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe_task
+        print(f"/health under storm: {_percentiles(samples)}")
+        print(f"logins: {logins / elapsed:.1f}/s, statuses {statuses}")
+        print(f"server pool stats: {(await client.get('/health')).json().get('password_hashing')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--url", help="benchmark a running server instead of in-process")
+    parser.add_argument("--email", default="student@mindporium.ai", help="existing account for --url mode")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_against_server(args.url, args.email, args.logins, args.concurrency))
+    else:
+        asyncio.run(run_in_process(args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
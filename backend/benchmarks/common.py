@@ -0,0 +1,76 @@
+"""Helpers shared by the benchmark scripts: latency summaries and JSON result files."""
+import json
+import os
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_MANIFEST = os.path.join(RESULTS_DIR, "manifest.json")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(samples_ms: List[float], elapsed_seconds: float, statuses: Dict[str, int], errors: int) -> Dict[str, Any]:
+    """Latency distribution and throughput of one scenario."""
+    ordered = sorted(samples_ms)
+    summary: Dict[str, Any] = {
+        "requests": len(ordered),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed_seconds, 3),
+        "throughput_rps": round(len(ordered) / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0,
+    }
+    if ordered:
+        summary.update({
+            "mean_ms": round(statistics.fmean(ordered), 2),
+            "p50_ms": round(statistics.median(ordered), 2),
+            "p95_ms": round(percentile(ordered, 0.95), 2),
+            "p99_ms": round(percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2),
+        })
+    return summary
+
+
+def format_summary(name: str, summary: Dict[str, Any]) -> str:
+    if not summary.get("requests"):
+        return f"{name:>20}: no samples"
+    return (
+        f"{name:>20}: {summary['throughput_rps']:8.1f} req/s | p50 {summary['p50_ms']:7.1f}ms "
+        f"p95 {summary['p95_ms']:7.1f}ms p99 {summary['p99_ms']:7.1f}ms | "
+        f"errors {summary['errors']} {summary['statuses']}"
+    )
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit the results belong to, so runs can be compared across commits."""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def write_results(kind: str, meta: Dict[str, Any], results: Dict[str, Any], out_dir: str = RESULTS_DIR) -> str:
+    """Store one run as <out_dir>/<kind>-<UTC timestamp>-<commit>.json and return the path."""
+    revision = git_revision()
+    started = datetime.now(timezone.utc)
+    payload = {
+        "kind": kind,
+        "meta": {**revision, "timestamp": started.isoformat(), **meta},
+        "results": results,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{kind}-{started.strftime('%Y%m%dT%H%M%SZ')}-{revision['commit'] or 'nogit'}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
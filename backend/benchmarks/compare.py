@@ -0,0 +1,75 @@
+"""
+Compare two benchmark result files (bench_api.py, ws_load.py) scenario by scenario.
+
+    cd backend && python -m benchmarks.compare benchmarks/results/api-old.json benchmarks/results/api-new.json
+
+A scenario regresses when its p95 or p99 latency grows, or its throughput drops, by
+more than --threshold percent; the exit status is 1 if any did, so this can gate CI.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+# metric -> True when bigger is better
+METRICS = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "throughput_rps": True, "per_connection_kb": False}
+GATING = ("p95_ms", "p99_ms", "throughput_rps", "per_connection_kb")
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> bool:
+    """Print the comparison table and return whether anything regressed."""
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('timestamp')}")
+    print(f"new: {new['meta'].get('commit')} {new['meta'].get('timestamp')}")
+    runs = list(old["results"].values()) + list(new["results"].values())
+    metrics = {name: higher for name, higher in METRICS.items() if any(name in result for result in runs)}
+    header = f"{'scenario':>20} " + " ".join(f"{name:>24}" for name in metrics)
+    print(header)
+    print("-" * len(header))
+
+    regressed = False
+    for scenario in sorted(set(old["results"]) | set(new["results"])):
+        before, after = old["results"].get(scenario), new["results"].get(scenario)
+        if before is None or after is None:
+            print(f"{scenario:>20} only in {'new' if before is None else 'old'}")
+            continue
+        cells, flags = [], []
+        for name, higher_is_better in metrics.items():
+            change = _change(before.get(name), after.get(name))
+            cell = f"{before.get(name, '-')} -> {after.get(name, '-')}"
+            if change is not None:
+                cell += f" ({change:+.0f}%)"
+                worse = -change if higher_is_better else change
+                if name in GATING and worse > threshold:
+                    flags.append(name)
+            cells.append(f"{cell:>24}")
+        if after.get("errors", 0) > before.get("errors", 0):
+            flags.append("errors")
+        regressed = regressed or bool(flags)
+        print(f"{scenario:>20} " + " ".join(cells) + (f"  REGRESSED: {', '.join(flags)}" if flags else ""))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old.get("kind") != new.get("kind"):
+        raise SystemExit(f"Cannot compare a {old.get('kind')} run with a {new.get('kind')} run")
+    sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
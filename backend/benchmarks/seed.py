@@ -0,0 +1,310 @@
+"""
+Seed a synthetic dataset for the API benchmarks (see bench_api.py).
+
+Builds on the same models and password hashing as init_db.py, but inserts rows in
+bulk and at a configurable scale: instructors, students, published courses with
+subjects, classrooms and MCQ tests, enrollments, attendance, submissions,
+notifications and communities with posts and subscriptions. Generation is
+deterministic for a given --seed. Every student's password is the same, so it is
+hashed once.
+
+Use a dedicated database: --reset drops and recreates every table.
+
+    cd backend
+    export DATABASE_URL=sqlite+aiosqlite:///./bench.sqlite REDIS_URL=redis://localhost:6379/0 SECRET_KEY=bench
+    python -m benchmarks.seed --scale small --reset
+    python -m benchmarks.seed --scale medium --students 20000 --reset
+
+A manifest (accounts, ids, unsubmitted test/student pairs) is written for the runner.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, select, update
+
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.db.database import close_db, get_engine, get_sessionmaker, init_db
+from app.models.attendance import Attendance
+from app.models.classroom import Classroom
+from app.models.community import Community, CommunityPost, CommunitySubscription
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.enums import CategoryEnum, ClassroomStatusEnum, LevelEnum, RoleEnum, TestStatusEnum
+from app.models.notification import Notification
+from app.models.subject import Subject
+from app.models.submission import Submission
+from app.models.test import Test, TestQuestion
+from app.models.user import User
+from benchmarks.common import DEFAULT_MANIFEST
+
+EMAIL_DOMAIN = "bench.mindporium.ai"
+PASSWORD = "bench-password"
+CHUNK_SIZE = 1000
+OPEN_SUBMISSIONS_LIMIT = 50000  # unsubmitted (student, test) pairs kept in the manifest
+
+
+def student_email(index: int) -> str:
+    return f"student{index}@{EMAIL_DOMAIN}"
+
+
+def instructor_email(index: int) -> str:
+    return f"instructor{index}@{EMAIL_DOMAIN}"
+
+
+@dataclass
+class Scale:
+    students: int
+    instructors: int
+    courses: int
+    subjects_per_course: int = 4
+    classrooms_per_subject: int = 3
+    tests_per_subject: int = 2
+    questions_per_test: int = 10
+    enrollments_per_student: int = 3
+    submitted_ratio: float = 0.5  # of the tests a student could take
+    attended_ratio: float = 0.5  # of the classrooms a student could attend
+    notifications_per_student: int = 20
+    communities: int = 10
+    posts_per_community: int = 50
+    subscriptions_per_student: int = 3
+
+
+SCALES = {
+    "small": Scale(students=500, instructors=10, courses=20),
+    "medium": Scale(students=5000, instructors=50, courses=100, notifications_per_student=50,
+                    communities=50, posts_per_community=200),
+    "large": Scale(students=50000, instructors=200, courses=500, notifications_per_student=50,
+                   communities=200, posts_per_community=500),
+}
+
+
+async def _insert(db, model, rows: List[Dict[str, Any]], returning: bool = False) -> List[int]:
+    """Bulk insert in chunks; with `returning`, the new ids in the order of `rows`."""
+    ids: List[int] = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        if returning:
+            result = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), chunk)
+            ids.extend(result.scalars().all())
+        else:
+            await db.execute(insert(model), chunk)
+    await db.commit()
+    return ids
+
+
+async def seed(scale: Scale, rng: random.Random, reset: bool) -> Dict[str, Any]:
+    if reset:
+        async with get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    await init_db()
+
+    now = datetime.utcnow()
+    counts: Dict[str, int] = {}
+    async_session = get_sessionmaker()
+    async with async_session() as db:
+        if await db.scalar(select(User.id).where(User.email == student_email(0))):
+            raise SystemExit("The database already holds a benchmark dataset; pass --reset to replace it.")
+
+        password = get_password_hash(PASSWORD)
+        instructor_ids = await _insert(db, User, [
+            {"email": instructor_email(i), "full_name": f"Instructor {i}", "password": password,
+             "role": RoleEnum.instructor.value, "is_active": True, "is_verified": True}
+            for i in range(scale.instructors)
+        ], returning=True)
+        student_ids = await _insert(db, User, [
+            {"email": student_email(i), "full_name": f"Student {i}", "password": password,
+             "role": RoleEnum.student.value, "is_active": True, "is_verified": True}
+            for i in range(scale.students)
+        ], returning=True)
+
+        course_rows = []
+        for i in range(scale.courses):
+            price = float(rng.choice((0, 499, 1999, 4999)))
+            course_rows.append({
+                "title": f"Benchmark Course {i}", "description": "Synthetic course for load tests",
+                "level": rng.choice(list(LevelEnum)).value, "price": price,
+                "category": (CategoryEnum.free if price == 0 else CategoryEnum.paid).value,
+                "duration_weeks": rng.randint(4, 16), "created_by": instructor_ids[i % len(instructor_ids)],
+                "is_published": True, "tags": ["benchmark"],
+            })
+        course_ids = await _insert(db, Course, course_rows, returning=True)
+
+        subject_rows, subject_courses = [], []
+        for course_id in course_ids:
+            for order in range(scale.subjects_per_course):
+                subject_rows.append({"title": f"Subject {order}", "course_id": course_id, "order_index": order})
+                subject_courses.append(course_id)
+        subject_ids = await _insert(db, Subject, subject_rows, returning=True)
+
+        classroom_rows, classroom_courses = [], []
+        test_rows, test_courses = [], []
+        course_instructor = dict(zip(course_ids, (instructor_ids[i % len(instructor_ids)] for i in range(len(course_ids)))))
+        for subject_id, course_id in zip(subject_ids, subject_courses):
+            for n in range(scale.classrooms_per_subject):
+                start = now + timedelta(hours=rng.randint(-24 * 30, 24 * 30))
+                classroom_rows.append({
+                    "title": f"Class {n}", "subject_id": subject_id, "instructor_id": course_instructor[course_id],
+                    "start_time": start, "end_time": start + timedelta(hours=1),
+                    "status": (ClassroomStatusEnum.completed if start < now else ClassroomStatusEnum.not_started).value,
+                })
+                classroom_courses.append(course_id)
+            for n in range(scale.tests_per_subject):
+                test_rows.append({
+                    "title": f"Test {n}", "subject_id": subject_id, "status": TestStatusEnum.published.value,
+                    "total_marks": float(scale.questions_per_test), "passing_marks": scale.questions_per_test / 2,
+                })
+                test_courses.append(course_id)
+        classroom_ids = await _insert(db, Classroom, classroom_rows, returning=True)
+        test_ids = await _insert(db, Test, test_rows, returning=True)
+
+        question_rows = [
+            {"test_id": test_id, "question_text": f"Question {n}?", "question_type": "mcq",
+             "options": ["a", "b", "c", "d"], "correct_answer": rng.choice("abcd"), "marks": 1.0, "order_index": n}
+            for test_id in test_ids for n in range(scale.questions_per_test)
+        ]
+        question_ids = await _insert(db, TestQuestion, question_rows, returning=True)
+        test_questions: Dict[int, List[int]] = {}
+        for row, question_id in zip(question_rows, question_ids):
+            test_questions.setdefault(row["test_id"], []).append(question_id)
+
+        classrooms_by_course: Dict[int, List[int]] = {}
+        for classroom_id, course_id in zip(classroom_ids, classroom_courses):
+            classrooms_by_course.setdefault(course_id, []).append(classroom_id)
+        tests_by_course: Dict[int, List[int]] = {}
+        for test_id, course_id in zip(test_ids, test_courses):
+            tests_by_course.setdefault(course_id, []).append(test_id)
+
+        enrollment_rows, attendance_rows, submission_rows = [], [], []
+        open_submissions: List[List[int]] = []
+        per_student = min(scale.enrollments_per_student, len(course_ids))
+        for index, student_id in enumerate(student_ids):
+            for course_id in rng.sample(course_ids, per_student):
+                enrolled_at = now - timedelta(days=rng.randint(1, 120))
+                enrollment_rows.append({
+                    "user_id": student_id, "course_id": course_id, "enrolled_at": enrolled_at,
+                    "progress_percent": float(rng.randint(0, 100)),
+                })
+                for classroom_id in classrooms_by_course.get(course_id, []):
+                    if rng.random() < scale.attended_ratio:
+                        joined = now - timedelta(hours=rng.randint(1, 24 * 60))
+                        attendance_rows.append({
+                            "classroom_id": classroom_id, "user_id": student_id, "joined_at": joined,
+                            "left_at": joined + timedelta(minutes=50), "duration_minutes": 50,
+                        })
+                for test_id in tests_by_course.get(course_id, []):
+                    if rng.random() < scale.submitted_ratio:
+                        answers = {str(q): rng.choice("abcd") for q in test_questions.get(test_id, [])}
+                        submission_rows.append({
+                            "test_id": test_id, "user_id": student_id, "answers": answers, "evaluation": {},
+                            "obtained_marks": float(rng.randint(0, scale.questions_per_test)),
+                            "submitted_at": now - timedelta(hours=rng.randint(1, 24 * 60)),
+                        })
+                    elif len(open_submissions) < OPEN_SUBMISSIONS_LIMIT:
+                        open_submissions.append([index, test_id])
+        await _insert(db, Enrollment, enrollment_rows)
+        await _insert(db, Attendance, attendance_rows)
+        await _insert(db, Submission, submission_rows)
+
+        await _insert(db, Notification, [
+            {"user_id": student_id, "title": "Benchmark notification", "message": f"Notification {n}",
+             "notification_type": rng.choice(("info", "class", "test", "announcement")), "is_read": rng.random() < 0.5}
+            for student_id in student_ids for n in range(scale.notifications_per_student)
+        ])
+
+        community_ids = await _insert(db, Community, [
+            {"name": f"Benchmark Community {i}", "created_by": instructor_ids[i % len(instructor_ids)],
+             "post_count": scale.posts_per_community}
+            for i in range(scale.communities)
+        ], returning=True)
+        if community_ids:
+            subscription_rows = []
+            for student_id in student_ids:
+                for community_id in rng.sample(community_ids, min(scale.subscriptions_per_student, len(community_ids))):
+                    subscription_rows.append({"community_id": community_id, "user_id": student_id})
+            await _insert(db, CommunitySubscription, subscription_rows)
+            await _insert(db, CommunityPost, [
+                {"community_id": community_id, "user_id": rng.choice(student_ids),
+                 "title": f"Post {n}", "content": "Synthetic post body " * rng.randint(1, 20),
+                 "view_count": rng.randint(0, 5000), "like_count": rng.randint(0, 500),
+                 "comment_count": 0}
+                for community_id in community_ids for n in range(scale.posts_per_community)
+            ])
+            members = Counter(row["community_id"] for row in subscription_rows)
+            for community_id in community_ids:
+                await db.execute(
+                    update(Community).where(Community.id == community_id).values(member_count=members[community_id])
+                )
+            await db.commit()
+        else:
+            subscription_rows = []
+
+        counts = {
+            "users": len(instructor_ids) + len(student_ids),
+            "courses": len(course_ids),
+            "subjects": len(subject_ids),
+            "classrooms": len(classroom_ids),
+            "tests": len(test_ids),
+            "questions": len(question_ids),
+            "enrollments": len(enrollment_rows),
+            "attendance": len(attendance_rows),
+            "submissions": len(submission_rows),
+            "notifications": len(student_ids) * scale.notifications_per_student,
+            "communities": len(community_ids),
+            "posts": len(community_ids) * scale.posts_per_community,
+            "subscriptions": len(subscription_rows),
+        }
+
+    return {
+        "scale": asdict(scale),
+        "counts": counts,
+        "password": PASSWORD,
+        "student_email": f"student{{index}}@{EMAIL_DOMAIN}",
+        "student_ids": student_ids,
+        "instructor_ids": instructor_ids,
+        "course_ids": course_ids,
+        "classroom_ids": classroom_ids,
+        "open_submissions": open_submissions,
+        "test_questions": {str(test_id): ids for test_id, ids in test_questions.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for f in fields(Scale):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(getattr(SCALES["small"], f.name)),
+                            help=f"override the preset's {f.name}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+
+    overrides = {f.name: getattr(args, f.name) for f in fields(Scale) if getattr(args, f.name) is not None}
+    scale = Scale(**{**asdict(SCALES[args.scale]), **overrides})
+
+    async def run():
+        try:
+            return await seed(scale, random.Random(args.seed), args.reset)
+        finally:
+            await close_db()
+
+    started = time.perf_counter()
+    manifest = asyncio.run(run())
+    os.makedirs(os.path.dirname(os.path.abspath(args.manifest)), exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s: {manifest['counts']}")
+    print(f"Manifest: {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
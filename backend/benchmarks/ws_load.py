@@ -0,0 +1,315 @@
+"""
+Load generator for the classroom WebSocket (/ws/classroom/{id}), against a running server.
+
+Opens --connections sockets spread over --rooms classrooms of the dataset written by
+benchmarks.seed, joining at most --join-concurrency at a time, then per room relays
+offer/answer/candidate messages between random pairs, sends chat bursts and hand
+raises, and finally disconnects everyone. It measures:
+
+  handshake           WebSocket upgrade time
+  join                connect -> the room's first participant sees `user_joined`
+                      (includes the attendance insert, which happens before it)
+  relay               offer/answer/candidate: send -> the target receives it
+  chat_fanout         chat: send -> each participant receives it (one sample per delivery)
+  hand_raise_fanout   the same for hand raises
+  attendance          joins acknowledged per second over the join phase
+  memory              server RSS growth per connection, with --server-pid (Linux)
+
+Results are stored as JSON under benchmarks/results like bench_api.py, so runs can be
+compared with compare.py. Needs the `websockets` package and enough file descriptors
+(ulimit -n) on both sides for --connections:
+
+    cd backend && python -m benchmarks.ws_load --url http://localhost:8000 \\
+        --connections 2000 --rooms 10 --server-pid $(pgrep -f "uvicorn app.main")
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import DEFAULT_MANIFEST, RESULTS_DIR, format_summary, summarize, write_results
+
+def _rss_bytes(pids: List[int]) -> Optional[int]:
+    """Resident memory of the server processes, from /proc (Linux only)."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            return None
+    return total
+
+
+class Delivery:
+    """A message being waited for: when it was sent and how many recipients are expected."""
+    def __init__(self, expected: int):
+        self.sent_at = time.perf_counter()
+        self.expected = expected
+        self.latencies: List[float] = []
+        self.done = asyncio.Event()
+        if expected <= 0:
+            self.done.set()
+
+    def received(self):
+        self.latencies.append((time.perf_counter() - self.sent_at) * 1000)
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+class Participant:
+    def __init__(self, load: "Load", classroom_id: int, user_id: int):
+        self.load = load
+        self.classroom_id = classroom_id
+        self.user_id = user_id
+        self.ws = None
+        self.reader: Optional[asyncio.Task] = None
+
+    async def join(self, url: str):
+        import websockets
+
+        # Join latency counts from here, handshake included.
+        self.load.joins[(self.classroom_id, str(self.user_id))] = Delivery(expected=1)
+        started = time.perf_counter()
+        self.ws = await websockets.connect(f"{url}/ws/classroom/{self.classroom_id}", open_timeout=60, max_queue=None)
+        self.load.handshake_ms.append((time.perf_counter() - started) * 1000)
+        self.reader = asyncio.create_task(self._read())
+        await self.send({"type": "join", "user_id": self.user_id, "user_info": {"bench": True}})
+
+    async def send(self, message: Dict[str, Any]):
+        await self.ws.send(json.dumps(message))
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                self.load.on_message(self, json.loads(raw))
+        except Exception:
+            pass  # closed; anything still expected is reported as missing
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.reader is not None:
+            await self.reader
+
+
+class Load:
+    def __init__(self, args, manifest: Dict[str, Any]):
+        self.args = args
+        self.url = args.url.replace("http", "ws", 1).rstrip("/")
+        self.rng = random.Random(args.seed)
+        self.ids = itertools.count()
+        self.handshake_ms: List[float] = []
+        self.joins: Dict[tuple, Delivery] = {}
+        self.pending: Dict[int, Delivery] = {}  # bench message id -> delivery
+        self.results: Dict[str, List[Delivery]] = {"relay": [], "chat_fanout": [], "hand_raise_fanout": []}
+
+        classroom_ids = manifest["classroom_ids"][:args.rooms]
+        per_room = args.connections // len(classroom_ids)
+        if per_room > len(manifest["student_ids"]):
+            raise SystemExit(f"Only {len(manifest['student_ids'])} students seeded; use more rooms or reseed")
+        self.rooms: Dict[int, List[Participant]] = {
+            classroom_id: [Participant(self, classroom_id, user_id) for user_id in manifest["student_ids"][:per_room]]
+            for classroom_id in classroom_ids
+        }
+
+    def on_message(self, participant: Participant, message: Dict[str, Any]):
+        if message.get("type") == "user_joined":
+            # Only each room's first participant reports joins, so each is counted once.
+            if participant is self.rooms[participant.classroom_id][0]:
+                delivery = self.joins.get((participant.classroom_id, str(message.get("user_id"))))
+                if delivery is not None:
+                    delivery.received()
+            return
+        delivery = self.pending.get(message.get("bench_id"))
+        if delivery is not None:
+            delivery.received()
+
+    async def _settle(self, deliveries: List[Delivery]):
+        try:
+            await asyncio.wait_for(asyncio.gather(*(d.done.wait() for d in deliveries)), self.args.settle)
+        except asyncio.TimeoutError:
+            pass
+
+    def _track(self, kind: str, expected: int) -> Dict[str, Any]:
+        delivery = Delivery(expected)
+        bench_id = next(self.ids)
+        self.pending[bench_id] = delivery
+        self.results[kind].append(delivery)
+        return {"bench_id": bench_id}
+
+    async def join_all(self) -> float:
+        semaphore = asyncio.Semaphore(self.args.join_concurrency)
+
+        async def join(participant: Participant):
+            async with semaphore:
+                try:
+                    await participant.join(self.url)
+                except Exception as e:
+                    print(f"Join failed for user {participant.user_id} in {participant.classroom_id}: {e!r}")
+                    participant.ws = None
+
+        # Each room's first participant is in before anyone else, to observe their joins;
+        # a chat message echoed back to it shows the server has registered it.
+        await asyncio.gather(*(join(room[0]) for room in self.rooms.values()))
+        ready = []
+        for participant in self._first():
+            ready.append(Delivery(expected=1))
+            bench_id = next(self.ids)
+            self.pending[bench_id] = ready[-1]
+            await participant.send({"type": "chat", "message": "ready", "bench_id": bench_id})
+        await self._settle(ready)
+        started = time.perf_counter()
+        await asyncio.gather(*(join(p) for room in self.rooms.values() for p in room[1:]))
+        await self._settle([self.joins[key] for key in self._joined_keys()])
+        return time.perf_counter() - started
+
+    def _first(self) -> List[Participant]:
+        return [room[0] for room in self.rooms.values() if room[0].ws is not None]
+
+    def _joined_keys(self) -> List[tuple]:
+        return [(p.classroom_id, str(p.user_id)) for room in self.rooms.values() for p in room[1:] if p.ws is not None]
+
+    def _connected(self, classroom_id: int) -> List[Participant]:
+        return [p for p in self.rooms[classroom_id] if p.ws is not None]
+
+    async def relay(self, classroom_id: int):
+        participants = self._connected(classroom_id)
+        if len(participants) < 2:
+            return
+        for _ in range(self.args.relays):
+            caller, callee = self.rng.sample(participants, 2)
+            exchange = [("offer", caller, callee), ("answer", callee, caller)]
+            exchange += [("candidate", *self.rng.sample((caller, callee), 2)) for _ in range(self.args.candidates)]
+            for kind, sender, target in exchange:
+                payload = {"candidate": "candidate:1 1 udp 2122260223 10.0.0.1 50000 typ host"} if kind == "candidate" \
+                    else {"sdp": "v=0 " + "a=benchmark " * 150}
+                await sender.send({"type": kind, "target_user_id": target.user_id, **payload, **self._track("relay", 1)})
+
+    async def broadcast(self, classroom_id: int, kind: str, count: int):
+        participants = self._connected(classroom_id)
+        if not participants:
+            return
+        for _ in range(count):
+            sender = self.rng.choice(participants)
+            # Chat and hand raises go to everyone in the room, the sender included.
+            message = {"type": kind, "user_id": sender.user_id, "message": "benchmark " * 8,
+                       **self._track(f"{kind}_fanout", len(participants))}
+            await sender.send(message)
+
+    async def run(self) -> Dict[str, Any]:
+        pids = self.args.server_pid or []
+        rss_before = _rss_bytes(pids) if pids else None
+
+        join_seconds = await self.join_all()
+        connected = sum(len(self._connected(classroom_id)) for classroom_id in self.rooms)
+        rss_after = _rss_bytes(pids) if pids else None
+        print(f"Connected {connected}/{self.args.connections} in {join_seconds:.1f}s")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self.relay(classroom_id) for classroom_id in self.rooms))
+        await self._settle(self.results["relay"])
+        relay_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(self.args.chat_bursts):
+            await asyncio.gather(*(self.broadcast(c, "chat", self.args.burst_size) for c in self.rooms))
+            await self._settle(self.results["chat_fanout"])
+        chat_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self.broadcast(c, "hand_raise", self.args.hand_raises) for c in self.rooms))
+        await self._settle(self.results["hand_raise_fanout"])
+        hand_raise_seconds = time.perf_counter() - started
+
+        await asyncio.gather(*(p.close() for room in self.rooms.values() for p in room if p.ws is not None))
+
+        joins = [self.joins[key] for key in self._joined_keys()]
+        results = {
+            "handshake": summarize(self.handshake_ms, join_seconds, Counter(connected=len(self.handshake_ms)),
+                                   self.args.connections - len(self.handshake_ms)),
+            "join": self._summary(joins, join_seconds),
+            "relay": self._summary(self.results["relay"], relay_seconds),
+            "chat_fanout": self._summary(self.results["chat_fanout"], chat_seconds),
+            "hand_raise_fanout": self._summary(self.results["hand_raise_fanout"], hand_raise_seconds),
+        }
+        acknowledged = sum(1 for d in joins if d.latencies)
+        results["attendance"] = {
+            "writes": acknowledged,
+            "elapsed_s": round(join_seconds, 3),
+            "throughput_rps": round(acknowledged / join_seconds, 2) if join_seconds > 0 else 0.0,
+        }
+        if rss_before is not None and rss_after is not None and connected:
+            results["memory"] = {
+                "connections": connected,
+                "server_rss_before_mb": round(rss_before / 2 ** 20, 1),
+                "server_rss_after_mb": round(rss_after / 2 ** 20, 1),
+                "per_connection_kb": round((rss_after - rss_before) / connected / 1024, 1),
+            }
+        return results
+
+    @staticmethod
+    def _summary(deliveries: List[Delivery], elapsed: float) -> Dict[str, Any]:
+        samples = [latency for d in deliveries for latency in d.latencies]
+        expected = sum(d.expected for d in deliveries)
+        statuses = Counter(delivered=len(samples), missing=expected - len(samples))
+        return summarize(samples, elapsed, statuses, expected - len(samples))
+
+
+async def run(args) -> Dict[str, Any]:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    load = Load(args, manifest)
+    results = await load.run()
+    for name, summary in results.items():
+        if "requests" in summary:
+            print(format_summary(name, summary))
+    print(f"{'attendance':>20}: {results['attendance']['throughput_rps']:8.1f} writes/s")
+    if "memory" in results:
+        print(f"{'memory':>20}: {results['memory']['per_connection_kb']:8.1f} KB per connection")
+
+    meta = {
+        "target": args.url,
+        "scale": manifest["scale"],
+        "connections": args.connections,
+        "rooms": len(load.rooms),
+        "join_concurrency": args.join_concurrency,
+        "relays": args.relays,
+        "chat_bursts": args.chat_bursts,
+        "burst_size": args.burst_size,
+        "hand_raises": args.hand_raises,
+    }
+    path = write_results("ws", meta, results, args.out)
+    print(f"Results: {path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="base URL of the server, e.g. http://localhost:8000")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--connections", type=int, default=1000, help="total, spread evenly over the rooms")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--join-concurrency", type=int, default=100)
+    parser.add_argument("--relays", type=int, default=20, help="offer/answer exchanges per room")
+    parser.add_argument("--candidates", type=int, default=4, help="ICE candidates per exchange")
+    parser.add_argument("--chat-bursts", type=int, default=3)
+    parser.add_argument("--burst-size", type=int, default=20, help="chat messages per room per burst")
+    parser.add_argument("--hand-raises", type=int, default=10, help="per room")
+    parser.add_argument("--settle", type=float, default=30.0, help="seconds to wait for outstanding deliveries")
+    parser.add_argument("--server-pid", type=int, action="append", help="server process to measure (repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the JSON results")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()